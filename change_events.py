@@ -0,0 +1,164 @@
+"""
+数据变更事件模块
+DataManager在每次修改后发出带类型的变更事件；同一帧内的多次变更合并为一批，
+通过dispatch在主线程中统一发送给订阅者
+"""
+import threading
+
+# 事件类型
+RECORD_ADDED = 'record_added'
+RECORD_UPDATED = 'record_updated'
+RECORD_DELETED = 'record_deleted'
+# 大批量修改或重新加载：受影响的日期未逐条记录，订阅者需要全部刷新
+BULK_CHANGED = 'bulk_changed'
+EVENT_TYPES = (RECORD_ADDED, RECORD_UPDATED, RECORD_DELETED, BULK_CHANGED)
+
+
+class ChangeEvent:
+    """一批同类型的数据变更"""
+    
+    def __init__(self, event_type, dates, records, total_delta, count_delta):
+        """
+        :param event_type: 事件类型
+        :param dates: 受影响的日期序号列表（升序），bulk_changed时为None
+        :param records: 字典，key为日期序号，value为新记录（删除时为None），bulk_changed时为空字典
+        :param total_delta: 总分的变化
+        :param count_delta: 记录数的变化
+        """
+        self.type = event_type
+        self.dates = dates
+        self.records = records
+        self.total_delta = total_delta
+        self.count_delta = count_delta
+    
+    def __contains__(self, ordinal):
+        """某一天是否受影响（bulk_changed时总是True）"""
+        return self.dates is None or ordinal in self.records
+    
+    def __repr__(self):
+        return f'ChangeEvent({self.type}, dates={self.dates}, total_delta={self.total_delta}, ' \
+               f'count_delta={self.count_delta})'
+
+
+def _score(record):
+    """记录的分数，记录不存在时为0"""
+    return record['score'] if record is not None else 0
+
+
+class ChangeEventBus:
+    """
+    变更事件总线
+    emit可以在任意线程中调用；变更先合并到待发送的批次中，每批只通过dispatch投递一次，
+    同一天在一批中的多次修改合并为一次（只比较最初和最终的记录）
+    """
+    
+    def __init__(self, dispatch=None):
+        """
+        :param dispatch: 投递函数，参数为无参函数（在Kivy中通过Clock.schedule_once在下一帧的主线程中执行），
+                         为None时在emit的线程中立即发送
+        """
+        self.dispatch = dispatch
+        self._subscribers = {event_type: [] for event_type in EVENT_TYPES}
+        self._lock = threading.Lock()
+        # 待发送的变更：key为日期序号，value为(最初的记录, 最终的记录)
+        self._pending = {}
+        # 待发送的大批量变更的(总分变化, 记录数变化)，没有时为None
+        self._bulk = None
+        self._scheduled = False
+    
+    def subscribe(self, callback, *event_types):
+        """
+        订阅变更事件
+        :param callback: 回调函数，参数为ChangeEvent
+        :param event_types: 订阅的事件类型，不指定时订阅全部类型
+        """
+        for event_type in event_types or EVENT_TYPES:
+            if event_type not in self._subscribers:
+                raise ValueError(f'未知的事件类型: {event_type}')
+            if callback not in self._subscribers[event_type]:
+                self._subscribers[event_type].append(callback)
+    
+    def unsubscribe(self, callback, *event_types):
+        """取消订阅（不指定类型时取消全部类型）"""
+        for event_type in event_types or EVENT_TYPES:
+            subscribers = self._subscribers.get(event_type, [])
+            if callback in subscribers:
+                subscribers.remove(callback)
+    
+    def emit(self, changes):
+        """
+        发出逐条的记录变更
+        :param changes: 字典，key为日期序号，value为(原记录, 新记录)，不存在的一方为None
+        """
+        if not changes:
+            return
+        with self._lock:
+            for ordinal, (old, new) in changes.items():
+                pending = self._pending.get(ordinal)
+                self._pending[ordinal] = (pending[0] if pending is not None else old, new)
+        self._schedule()
+    
+    def emit_bulk(self, total_delta, count_delta):
+        """
+        发出大批量变更
+        :param total_delta: 总分的变化
+        :param count_delta: 记录数的变化
+        """
+        with self._lock:
+            total, count = self._bulk or (0, 0)
+            self._bulk = (total + total_delta, count + count_delta)
+        self._schedule()
+    
+    def _schedule(self):
+        """安排发送待发送的变更（已安排时不重复安排，实现按帧合并）"""
+        if self.dispatch is None:
+            self.flush()
+            return
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.dispatch(self.flush)
+    
+    def flush(self):
+        """立即发送所有待发送的变更"""
+        with self._lock:
+            pending, bulk = self._pending, self._bulk
+            self._pending, self._bulk = {}, None
+            self._scheduled = False
+        for event in self._build_events(pending, bulk):
+            for callback in list(self._subscribers[event.type]):
+                callback(event)
+    
+    @staticmethod
+    def _build_events(pending, bulk):
+        """
+        将待发送的变更分组为事件
+        :return: ChangeEvent列表；有大批量变更时只有一个bulk_changed事件（包含逐条变更的增量）
+        """
+        groups = {RECORD_ADDED: {}, RECORD_UPDATED: {}, RECORD_DELETED: {}}
+        deltas = {event_type: [0, 0] for event_type in groups}
+        for ordinal in sorted(pending):
+            old, new = pending[ordinal]
+            if old is None and new is None:
+                continue
+            if old is None:
+                event_type = RECORD_ADDED
+            elif new is None:
+                event_type = RECORD_DELETED
+            elif old == new:
+                # 在同一批中改回了原记录
+                continue
+            else:
+                event_type = RECORD_UPDATED
+            groups[event_type][ordinal] = new
+            deltas[event_type][0] += _score(new) - _score(old)
+            deltas[event_type][1] += (new is not None) - (old is not None)
+        if bulk is not None:
+            total = bulk[0] + sum(delta[0] for delta in deltas.values())
+            count = bulk[1] + sum(delta[1] for delta in deltas.values())
+            return [ChangeEvent(BULK_CHANGED, None, {}, total, count)]
+        return [
+            ChangeEvent(event_type, list(records), records, *deltas[event_type])
+            for event_type, records in groups.items() if records
+        ]
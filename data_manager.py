@@ -1,97 +1,956 @@
-import json
-import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from storage import (
+    ColumnarStore, StorageBackend, WriteBehindQueue, create_storage, iter_json_records,
+    read_sidecar, sidecar_file, write_sidecar
+)
+from storage.csv_io import iter_csv_records, write_csv
+from storage.json_storage import atomic_write_json, date_ordinal, encode_records
+from change_events import ChangeEventBus
+from indexes import (
+    DateIndex, MonthlyStats, ScoreIndex, ScoreStats, TextIndex, from_ordinal, is_valid_score, safe_ordinal,
+    to_ordinal
+)
+
+# 批量导入时遇到已有日期的处理方式
+DUPLICATE_POLICIES = ('overwrite', 'skip', 'max', 'error')
+
+
+def _same_record(a, b):
+    """两条记录（字典或记录视图，可为None）的分数和描述是否相同"""
+    if a is None or b is None:
+        return a is b
+    return a['score'] == b['score'] and (a.get('desc') or '') == (b.get('desc') or '')
+
+
+def _check_score(score):
+    """校验要保存的分数（与页面输入和批量导入的规则相同）"""
+    if not is_valid_score(score):
+        raise ValueError(f'分数必须是0-100之间的整数: {score!r}')
 
 
 class DataManager:
     """数据管理类，负责分数的存储和读取"""
     
-    def __init__(self, data_file='scores.json'):
+    def __init__(self, data_file=None, backend='json', write_behind=False, write_delay=0.5,
+                 on_save_complete=None, compact=False, lazy=False, dispatch=None, defer_load=False,
+                 stats_cache=True, **backend_options):
         """
         初始化数据管理器
-        :param data_file: 数据文件路径
+        :param data_file: 数据文件路径，为None时使用存储后端的默认文件名
+        :param backend: 存储后端名称（json / journal / sqlite / binary / sharded）或StorageBackend实例
+        :param write_behind: 是否延迟写入（修改只标记为脏，由后台线程合并写入）
+        :param write_delay: 延迟写入的防抖时间（秒）
+        :param on_save_complete: 每次后台写入完成后的回调，参数为是否成功（在工作线程中调用）
+        :param compact: 是否使用列式内存存储（数组 + 去重字符串表），适合很长的历史记录
+        :param lazy: 是否按需加载（binary和sharded后端支持）：启动时只读取文件头或分片清单中的统计，
+                     记录在访问时才从内存映射的快照或对应年份的分片中读取，其他索引在首次使用时构建
+        :param dispatch: 异步接口（*_async）投递回调的函数，参数为无参函数；
+                         在Kivy中传入通过Clock.schedule_once在主线程执行的函数，为None时在工作线程中直接调用
+        :param defer_load: 为True时不在构造时读取数据文件，由load_async在工作线程中加载
+        :param stats_cache: 是否使用统计缓存文件（数据文件名 + .stats）：与数据文件指纹一致时
+                            启动即恢复总分、直方图和月度统计，不再全量计算
+        :param backend_options: 传给存储后端的其他参数（如journal的compact_threshold）
         """
-        self.data_file = data_file
-        self.data = self.load_data()
+        if isinstance(backend, StorageBackend):
+            self.storage = backend
+        else:
+            self.storage = create_storage(backend, data_file, **backend_options)
+        self.data_file = self.storage.data_file
+        self.compact = compact
+        self.lazy = lazy
+        self.dispatch = dispatch
+        # 执行异步接口的单个工作线程（保证各操作按提交顺序执行），首次使用时创建
+        self._executor = None
+        # 是否正在等待load_async完成
+        self.loading = defer_load
+        self.data = {} if defer_load else self.load_data()
+        
+        # 当前批量事务中被修改日期的原记录（用于回滚），不在事务中时为None
+        self._batch = None
+        # 大批量事务中暂停增量维护索引，事务结束后统一重建
+        self._bulk = False
+        # 数据变更事件：同一帧内的变更合并后通过dispatch发送
+        self.events = ChangeEventBus(dispatch)
+        # 尚未发出的变更：key为日期，value为(原记录, 新记录)
+        self._changes = {}
+        # 发生大批量变更前的(总分, 记录数)，没有大批量变更时为None
+        self._bulk_base = None
+        
+        self.writer = None
+        if write_behind:
+            self.writer = WriteBehindQueue(
+                self.storage,
+                lambda: self.data.copy(),
+                delay=write_delay,
+                on_complete=on_save_complete
+            )
+            self._lock = self.writer.lock
+        else:
+            self._lock = threading.RLock()
+        
+        # 随每次增删增量维护的内存索引
+        self.score_stats = ScoreStats()
+        self.indexes = [self.score_stats]
+        # 按需构建的索引：按需加载模式下首次使用时才构建，否则立即构建
+        self._index_factories = {
+            'date_index': DateIndex,
+            'month_stats': MonthlyStats,
+            'text_index': TextIndex,
+            'score_index': ScoreIndex,
+        }
+        # 只在首次使用时构建的索引（全文索引和分数索引只在历史记录搜索、排序时需要，不拖慢启动）
+        self._on_demand_indexes = {'text_index', 'score_index'}
+        self._built_indexes = {}
+        # 最后一次修改数据的时间
+        self.last_modified = None
+        # 同步写入失败、内存数据与数据文件不一致的日期（下次写入时一并重试）
+        self._unsaved = set()
+        # 统计缓存有效时直接恢复统计（记录恢复时数据文件的指纹），否则全量计算
+        self.stats_cache = stats_cache
+        self._cached_stamp = self._restore_stats_cache()
+        # 统计缓存是否需要重新写入（启动后有修改，或启动时没有有效的缓存）
+        self._stats_stale = self._cached_stamp is None
+        # 统计缓存中记录的数据文件指纹
+        self._sidecar_stamp = self._cached_stamp
+        if self._cached_stamp is None:
+            self._rebuild_indexes()
+        if not self.lazy:
+            for name in self._index_factories:
+                if name not in self._on_demand_indexes:
+                    self._get_index(name)
     
-    def load_data(self):
-        """加载数据文件"""
-        if os.path.exists(self.data_file):
+    def load_data(self, progress=None):
+        """
+        加载数据文件
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)（按需加载时不报告）
+        """
+        if self.lazy and hasattr(self.storage, 'load_lazy'):
+            data = self.storage.load_lazy()
+        elif self.compact and hasattr(self.storage, 'load_columnar'):
+            # 二进制快照直接解码、JSON文件流式解析为列式存储，不构建完整的字典
+            try:
+                data = self.storage.load_columnar(progress=progress)
+            except ValueError:
+                data = self.storage.load(progress=progress)
+        else:
+            data = self.storage.load(progress=progress)
+        if self.compact and isinstance(data, dict):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return {}
-        return {}
-    
-    def save_data(self):
-        """保存数据到文件"""
+                return ColumnarStore(data)
+            except ValueError:
+                # 含有无法紧凑保存的历史数据（如超出0-255的分数），退回普通字典
+                self.compact = False
+        return data
+    
+    def _rebuild_indexes(self, skip=()):
+        """
+        根据全部数据重建所有索引
+        :param skip: 不需要重建的索引
+        """
+        for index in self.indexes:
+            if not any(index is skipped for skipped in skip):
+                index.rebuild(self.data)
+    
+    def _restore_stats_cache(self):
+        """
+        从统计缓存恢复分数统计和月度统计
+        :return: 缓存有效时为恢复时数据文件的指纹，否则为None
+        """
+        if not self.stats_cache:
+            return None
+        stamp = self.storage.file_fingerprint()
+        payload = read_sidecar(sidecar_file(self.data_file), stamp)
+        if payload is None:
+            return None
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-            return True
-        except IOError:
+            stats = payload['stats']
+            month_stats = MonthlyStats()
+            month_stats.restore(payload['months'])
+            self.score_stats.restore(stats['total'], stats['count'], stats['min'], stats['max'], stats['histogram'])
+        except (KeyError, TypeError, ValueError):
+            self.score_stats.clear()
+            return None
+        self._built_indexes['month_stats'] = month_stats
+        self.indexes.append(month_stats)
+        self.last_modified = payload.get('modified')
+        return stamp
+    
+    def _write_stats_cache(self):
+        """写入统计缓存（调用时内存数据需与数据文件一致）"""
+        month_stats = self._built_indexes.get('month_stats')
+        if month_stats is None:
+            # 按需加载模式下尚未构建月度统计，不为写缓存而读取全部记录
             return False
+        stats = self.score_stats
+        payload = {
+            'stats': {
+                'total': stats.total,
+                'count': stats.count,
+                'min': stats.min,
+                'max': stats.max,
+                'histogram': stats.histogram,
+            },
+            'months': month_stats.as_dict(),
+            'modified': self.last_modified,
+        }
+        stamp = self.storage.file_fingerprint()
+        written = write_sidecar(sidecar_file(self.data_file), stamp, payload)
+        if written:
+            self._stats_stale = False
+            self._sidecar_stamp = stamp
+        return written
     
-    def save_score(self, date, score, desc=''):
+    def save_stats_cache(self):
         """
-        保存某一天的分数
-        :param date: 日期字符串，格式：YYYY-MM-DD
-        :param score: 分数（整数）
-        :param desc: 描述（字符串）
+        写入统计缓存（只在统计有变化、所有修改都已写入、且数据文件未被其他进程修改时写入）
+        :return: 是否写入
+        """
+        if not self.stats_cache or self.loading:
+            return False
+        with self._lock:
+            if not self._stats_stale or self._unsaved_dates() or self.storage.changed():
+                return False
+            return self._write_stats_cache()
+    
+    @property
+    def stats_ready(self):
+        """统计是否可用（加载完成，或启动时已从统计缓存恢复）"""
+        return not self.loading or self._cached_stamp is not None
+    
+    def _get_index(self, name):
+        """
+        获取按需构建的索引，首次访问时根据全部数据构建
+        :param name: 索引名称
+        """
+        index = self._built_indexes.get(name)
+        if index is None:
+            with self._lock:
+                # 等待锁期间其他线程可能已经构建好了
+                index = self._built_indexes.get(name)
+                if index is not None:
+                    return index
+                index = self._index_factories[name]()
+                index.rebuild(self.data)
+                self._built_indexes[name] = index
+                self.indexes.append(index)
+        return index
+    
+    @property
+    def date_index(self):
+        """日期索引（有序日期序号 + 前缀和）"""
+        return self._get_index('date_index')
+    
+    @property
+    def month_stats(self):
+        """月度统计（每月总分和记录数）"""
+        return self._get_index('month_stats')
+    
+    @property
+    def text_index(self):
+        """全文索引（描述中的索引词 -> 日期序号）"""
+        return self._get_index('text_index')
+    
+    @property
+    def score_index(self):
+        """分数索引（每个分数的有序日期序号）"""
+        return self._get_index('score_index')
+    
+    def _apply(self, ordinal, record):
+        """
+        修改内存数据并同步更新索引（调用时需持有锁）
+        :param ordinal: 日期序号
+        :param record: 新记录，为None时删除
+        """
+        old = self.data.get(ordinal)
+        if self._bulk:
+            # 大批量修改只发出bulk_changed事件，不逐条记录（此时分数统计尚未更新，记下修改前的值）
+            self._mark_bulk()
+        try:
+            # 先更新索引再修改数据：索引无法接受这条记录时数据保持不变
+            if not self._bulk:
+                if old is not None:
+                    for index in self.indexes:
+                        index.remove(ordinal, old)
+                if record is not None:
+                    for index in self.indexes:
+                        index.add(ordinal, record)
+            if record is None:
+                self.data.pop(ordinal, None)
+            else:
+                # 整体替换记录而不是原地修改，保证后台写入拿到的快照一致
+                # （列式存储会把记录拆分保存到各列中）
+                self.data[ordinal] = record
+        except Exception:
+            # 索引或数据只更新了一部分：恢复原记录，按数据重建索引后再抛出
+            if old is None:
+                self.data.pop(ordinal, None)
+            else:
+                self.data[ordinal] = old
+            if not self._bulk:
+                self._rebuild_indexes()
+            raise
+        if self._batch is not None and ordinal not in self._batch:
+            self._batch[ordinal] = old
+        self.last_modified = datetime.now().isoformat(timespec='seconds')
+        self._stats_stale = True
+        if not self._bulk:
+            first = self._changes.get(ordinal)
+            self._changes[ordinal] = (first[0] if first is not None else old, record)
+    
+    def subscribe(self, callback, *event_types):
         """
-        if date not in self.data:
-            self.data[date] = {}
+        订阅数据变更事件（增删改、合并其他进程的修改、重新加载）
+        :param callback: 回调函数，参数为change_events.ChangeEvent，通过dispatch调用（同一帧内的变更合并为一次）
+        :param event_types: record_added / record_updated / record_deleted / bulk_changed，不指定时订阅全部
+        """
+        self.events.subscribe(callback, *event_types)
+    
+    def unsubscribe(self, callback, *event_types):
+        """取消订阅数据变更事件"""
+        self.events.unsubscribe(callback, *event_types)
+    
+    def _mark_bulk(self):
+        """记录发生了大批量变更（调用时需持有锁，且分数统计尚未更新）"""
+        if self._bulk_base is None:
+            self._bulk_base = (self.score_stats.total, self.score_stats.count)
+    
+    def _notify(self):
+        """发出尚未发出的变更事件（批量事务中等事务结束后再发出）"""
+        with self._lock:
+            if self._batch is not None:
+                return
+            changes, base = self._changes, self._bulk_base
+            if not changes and base is None:
+                return
+            self._changes, self._bulk_base = {}, None
+            stats = (self.score_stats.total, self.score_stats.count)
+        if base is not None:
+            self.events.emit_bulk(stats[0] - base[0], stats[1] - base[1])
+        self.events.emit(changes)
+    
+    def _unsaved_dates(self):
+        """尚未写入数据文件的日期（延迟写入队列中的修改和同步写入失败的修改，调用时需持有锁）"""
+        unsaved = set(self._unsaved)
+        if self.writer:
+            unsaved |= self.writer.unsaved_dates()
+        return unsaved
+    
+    def reload_if_changed(self):
+        """
+        检查数据文件是否被其他进程修改（只比较文件大小和修改时间，不读取内容），
+        修改过时重新读取，只把有差异的记录合并进内存数据和索引；本进程尚未写入的修改优先
+        :return: 是否合并了其他进程的修改
+        """
+        if self.loading or not self.storage.changed():
+            return False
+        with self._lock:
+            if self._batch is not None:
+                # 批量事务进行中，等事务结束后再合并
+                return False
+            fresh = self.storage.load()
+            unsaved = self._unsaved_dates()
+            delta = {}
+            for ordinal, record in fresh.items():
+                current = self.data.get(ordinal)
+                if ordinal not in unsaved and not _same_record(current, record):
+                    delta[ordinal] = record
+            for ordinal in self.data:
+                if ordinal not in fresh and ordinal not in unsaved:
+                    delta[ordinal] = None
+            if not delta:
+                return False
+            # 差异较多时暂停增量维护索引，合并后统一重建
+            bulk = not self._bulk and len(delta) > len(self.data) // 10
+            self._bulk = self._bulk or bulk
+            try:
+                for ordinal, record in delta.items():
+                    # 直接修改内存数据：这些修改已经在文件中，不需要再写入
+                    self._apply(ordinal, record)
+            finally:
+                if bulk:
+                    self._bulk = False
+                    self._rebuild_indexes()
+        self._notify()
+        return True
+    
+    def export_json(self, path):
+        """
+        导出全部数据为JSON文件（与scores.json格式相同）
+        :param path: 导出文件路径
+        :return: 是否导出成功
+        """
+        with self._lock:
+            snapshot = encode_records(self.data)
+        return atomic_write_json(path, snapshot, indent=2)
+    
+    def import_json(self, path, progress=None):
+        """
+        从JSON文件流式导入数据，文件中的记录覆盖同一天的已有记录
+        逐条解析并写入，不需要先把整个文件解析为对象树
+        :param path: 导入文件路径（与scores.json格式相同）
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        :return: 导入的记录数
+        :raises ValueError: 文件格式无效，或包含无法识别的日期、不是0-100之间整数的分数（已导入的记录会被回滚）
+        """
+        def records():
+            for date, score, desc in iter_json_records(path, progress=progress):
+                ordinal = date_ordinal(date)
+                if ordinal is None:
+                    raise ValueError(f'无效的日期: {date!r}')
+                # 与CSV导入和页面输入使用同样的校验
+                if not is_valid_score(score):
+                    raise ValueError(f'{date}的分数无效: {score!r}')
+                yield ordinal, score, desc
+        
+        return self.save_many(records(), bulk=True)
+    
+    def import_csv(self, path, on_duplicate='overwrite', on_error=None):
+        """
+        从CSV文件流式导入数据（列为date,score,desc，表头可选）
+        :param path: 导入文件路径
+        :param on_duplicate: 日期已有记录时的处理方式：
+                             overwrite覆盖、skip保留原记录、max保留分数较高者、error中止并回滚
+        :param on_error: 无效行的回调，参数为(行号, 字段列表, 错误信息)
+        :return: 字典，包含imported（导入数）、skipped（因重复跳过数）、invalid（无效行数）
+        :raises ValueError: on_duplicate为error且遇到重复日期时（已导入的记录会被回滚）
+        """
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f'未知的重复处理方式: {on_duplicate}')
+        result = {'imported': 0, 'skipped': 0, 'invalid': 0}
+        
+        def count_invalid(line_no, row, message):
+            result['invalid'] += 1
+            if on_error:
+                on_error(line_no, row, message)
         
-        self.data[date]['score'] = score
-        if desc:
-            self.data[date]['desc'] = desc
+        with self.batch(bulk=True):
+            for ordinal, score, desc in iter_csv_records(path, on_error=count_invalid):
+                existing = self.data.get(ordinal)
+                if existing is not None and on_duplicate != 'overwrite':
+                    if on_duplicate == 'error':
+                        raise ValueError(f'重复的日期: {from_ordinal(ordinal)}')
+                    if on_duplicate == 'skip' or existing['score'] >= score:
+                        result['skipped'] += 1
+                        continue
+                self._apply(ordinal, {'score': score, 'desc': desc})
+                result['imported'] += 1
+        return result
+    
+    def export_csv(self, path):
+        """
+        按日期升序流式导出为CSV文件（沿日期索引逐条读取，不复制数据，也不排序日期）
+        :param path: 导出文件路径
+        :return: 导出的记录数
+        """
+        return write_csv(path, self.query(order='asc'))
+    
+    def _persist(self, ordinal):
+        """
+        持久化某一天的修改（批量事务中推迟到事务提交时一起写入）
+        :param ordinal: 被修改的日期序号
+        """
+        if self._batch is not None:
+            return True
+        return self._persist_many([ordinal])
+    
+    def _persist_many(self, dates):
+        """
+        一次性持久化多天的修改（同步写入时连同之前写入失败的修改一起重试）
+        :param dates: 被修改的日期序号
+        :return: 是否写入成功（延迟写入时总是True）
+        """
+        if self.writer:
+            for date in dates:
+                self.writer.mark_dirty(date, self.data.get(date))
+            return True
+        dates = self._unsaved | set(dates)
+        result = self.storage.save(self.data, {date: self.data.get(date) for date in dates})
+        # 写入失败时记下这些日期：统计缓存不能再按内存中的统计写入，直到之后的写入成功
+        self._unsaved = set() if result else dates
+        return result
+    
+    @contextmanager
+    def batch(self, bulk=False):
+        """
+        批量事务：事务中的所有修改只在内存中进行，结束时一次性写入
+        事务中抛出异常时回滚全部修改；嵌套使用时并入最外层事务
+        :param bulk: 大批量修改时暂停增量维护索引，事务结束后统一重建
+        
+        用法：
+            with data_manager.batch():
+                data_manager.save_score(...)
+                data_manager.delete_score(...)
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield self
+                return
+            self._batch = {}
+            self._bulk = bulk
+            bulk_base = self._bulk_base
+            try:
+                yield self
+                if self._bulk:
+                    # 重建失败（如导入了无法统计的分数）时同样回滚，重建成功后才结束大批量模式
+                    self._rebuild_indexes()
+                    self._bulk = False
+            except BaseException:
+                originals = self._batch
+                self._batch = None
+                for date, record in originals.items():
+                    self._apply(date, record)
+                if self._bulk:
+                    self._bulk = False
+                    self._rebuild_indexes()
+                # 回滚后数据与事务开始前相同，不发出事件（事务中和回滚时标记的大批量变更一并撤销）
+                for date in originals:
+                    self._changes.pop(date, None)
+                self._bulk_base = bulk_base
+                raise
+            changed = self._batch
+            self._batch = None
+            if changed:
+                self._persist_many(changed)
+        self._notify()
+    
+    def save_many(self, records, bulk=False):
+        """
+        批量保存分数（一次写入）
+        :param records: 字典（key为日期序号、date对象或日期字符串，value为包含score和desc的记录），
+                        或(日期, 分数[, 描述])元组的可迭代对象
+        :param bulk: 暂停增量维护索引，结束后统一重建（适合大量记录）
+        :return: 保存的记录数
+        """
+        if hasattr(records, 'items'):
+            records = ((date, record['score'], record.get('desc', '')) for date, record in records.items())
+        count = 0
+        with self.batch(bulk=bulk):
+            for date, score, *desc in records:
+                self.save_score(date, score, desc[0] if desc else '')
+                count += 1
+        return count
+    
+    def delete_many(self, dates):
+        """
+        批量删除分数（一次写入）
+        :param dates: 日期（日期序号、date对象或日期字符串）的可迭代对象
+        :return: 实际删除的记录数
+        """
+        count = 0
+        with self.batch():
+            for date in dates:
+                if self.delete_score(date):
+                    count += 1
+        return count
+    
+    def _write_pending(self):
+        """
+        阻塞写入所有尚未写入的修改（不更新统计缓存）
+        :return: 是否写入成功（没有待写入的修改时为上次写入的结果）
+        """
+        if self.writer:
+            return self.writer.flush()
+        with self._lock:
+            return self._persist_many(()) if self._unsaved else True
+    
+    def flush(self, callback=None):
+        """
+        立即写入所有延迟写入的修改（同步写入模式下重试之前写入失败的修改），
+        阻塞模式下写入成功、且统计自上次写入缓存后有变化时同时更新统计缓存
+        :param callback: 为None时阻塞直到写入完成；否则写入完成后以是否成功为参数调用（在工作线程中）
+        :return: 阻塞模式下返回是否写入成功
+        """
+        if self.writer and callback is not None:
+            self.writer.flush(callback)
+            return None
+        result = self._write_pending()
+        if callback is not None:
+            callback(result)
+            return None
+        if result:
+            self.save_stats_cache()
+        return result
+    
+    def _deliver(self, func, *args):
+        """通过dispatch投递回调（未设置dispatch时直接调用）"""
+        if self.dispatch is None:
+            func(*args)
         else:
-            self.data[date]['desc'] = ''
+            self.dispatch(lambda: func(*args))
+    
+    def run_async(self, func, *args, callback=None, on_error=None, **kwargs):
+        """
+        在工作线程中执行func，完成后通过dispatch投递结果
+        :param func: 要执行的函数
+        :param callback: 成功时的回调，参数为func的返回值
+        :param on_error: 失败时的回调，参数为异常对象
+        :return: concurrent.futures.Future
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='data-io')
+        future = self._executor.submit(func, *args, **kwargs)
+        
+        def done(future):
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    self._deliver(on_error, error)
+            elif callback:
+                self._deliver(callback, future.result())
         
-        self.save_data()
+        future.add_done_callback(done)
+        return future
+    
+    def _reload(self, progress=None):
+        """写入剩余修改后重新加载数据文件并重建索引（在工作线程中执行）"""
+        try:
+            self.flush()
+            data = self.load_data(progress)
+            with self._lock:
+                self._mark_bulk()
+                self.data = data
+                self._unsaved.clear()
+                skip = ()
+                if self._cached_stamp is not None and self.storage.file_fingerprint() == self._cached_stamp:
+                    # 启动时恢复的统计缓存与刚读取的数据文件一致，只需构建其他索引
+                    skip = (self.score_stats, self._built_indexes.get('month_stats'))
+                else:
+                    self._stats_stale = True
+                self._rebuild_indexes(skip)
+                self._cached_stamp = None
+        finally:
+            self.loading = False
+        self._notify()
+        return len(data)
+    
+    def load_async(self, callback=None, progress=None, on_error=None):
+        """
+        在工作线程中加载数据文件
+        :param callback: 加载完成后的回调，参数为记录数
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        :param on_error: 加载失败时的回调，参数为异常对象
+        """
+        self.loading = True
+        if progress:
+            report = progress
+            progress = lambda done, total: self._deliver(report, done, total)
+        return self.run_async(self._reload, progress, callback=callback, on_error=on_error)
+    
+    def save_score_async(self, date, score, desc='', callback=None, on_error=None):
+        """
+        在工作线程中保存某一天的分数（参数同save_score）
+        :param callback: 保存完成后的回调，参数为None
+        """
+        return self.run_async(self.save_score, date, score, desc, callback=callback, on_error=on_error)
+    
+    def update_score_async(self, date, score, desc='', callback=None, on_error=None):
+        """
+        在工作线程中更新某一天的分数（参数同update_score）
+        :param callback: 完成后的回调，参数为日期是否存在
+        """
+        return self.run_async(self.update_score, date, score, desc, callback=callback, on_error=on_error)
+    
+    def delete_score_async(self, date, callback=None, on_error=None):
+        """
+        在工作线程中删除某一天的分数
+        :param callback: 完成后的回调，参数为是否删除成功
+        """
+        return self.run_async(self.delete_score, date, callback=callback, on_error=on_error)
+    
+    def get_all_scores_async(self, callback, on_error=None):
+        """
+        在工作线程中复制所有日期的分数
+        :param callback: 完成后的回调，参数为get_all_scores的结果
+        """
+        return self.run_async(self.get_all_scores, callback=callback, on_error=on_error)
+    
+    def close(self):
+        """等待异步操作完成，写入剩余修改，关闭存储后端并在统计有变化时更新统计缓存"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.writer:
+            self.writer.close()
+        with self._lock:
+            consistent = self.stats_cache and not self.loading and not self.storage.changed() \
+                and not self._unsaved_dates()
+        self.storage.close()
+        # 在关闭后端之后写入，此时数据文件已不再变化（日志压缩已完成）；
+        # 统计没有变化、且关闭后端没有改动数据文件时，已有的缓存仍然有效
+        if consistent and (self._stats_stale or self.storage.file_fingerprint() != self._sidecar_stamp):
+            self._write_stats_cache()
+    
+    def save_score(self, date, score, desc=''):
+        """
+        保存某一天的分数
+        :param date: 日期序号（date.toordinal()）、date对象或日期字符串（YYYY-MM-DD）
+        :param score: 分数（0-100的整数）
+        :param desc: 描述（字符串）
+        :raises ValueError: 日期格式无效或分数无效
+        """
+        ordinal = to_ordinal(date)
+        _check_score(score)
+        with self._lock:
+            self._apply(ordinal, {'score': score, 'desc': desc if desc else ''})
+            self._persist(ordinal)
+        self._notify()
     
     def get_score(self, date):
         """
         获取某一天的分数
-        :param date: 日期字符串，格式：YYYY-MM-DD
+        :param date: 日期序号（date.toordinal()）、date对象或日期字符串（YYYY-MM-DD）
         :return: 包含score和desc的字典，如果不存在返回None
         """
-        return self.data.get(date)
+        # 日期格式无效时按不存在处理
+        ordinal = safe_ordinal(date)
+        # 读取也需持有锁：工作线程中的修改可能正在逐列更新列式存储
+        with self._lock:
+            return self.data.get(ordinal)
     
     def get_all_scores(self):
         """
         获取所有日期的分数
-        :return: 字典，key为日期，value为包含score和desc的字典
+        :return: 字典，key为日期序号，value为包含score和desc的字典
+        """
+        with self._lock:
+            return self.data.copy()
+    
+    def query(self, start=None, end=None, min_score=None, max_score=None, text=None,
+              order='desc', limit=None, offset=0, sort='date'):
+        """
+        按条件惰性遍历记录：沿日期索引或分数索引逐条读取，不复制数据
+        :param start: 开始日期（包含；日期序号、date对象或YYYY-MM-DD字符串），为None时不限
+        :param end: 结束日期（包含），为None时不限
+        :param min_score: 最低分（包含），为None时不限
+        :param max_score: 最高分（包含），为None时不限
+        :param text: 搜索描述（不区分大小写），多个词用空格分隔且须全部匹配，英文和数字按单词前缀匹配，
+                     中文须连续出现；由全文索引得到候选日期，为空时不限
+        :param order: desc为从新到旧（或从高分到低分），asc为从旧到新（或从低分到高分）
+        :param limit: 最多返回的条数，为None时不限
+        :param offset: 跳过前offset条符合条件的记录（用于分页）
+        :param sort: date为按日期排序，score为按分数排序（同分时按日期）
+        :return: 生成器，逐条产生(日期序号, 记录)
+        """
+        if order not in ('asc', 'desc'):
+            raise ValueError(f'未知的排序方式: {order}')
+        if sort not in ('date', 'score'):
+            raise ValueError(f'未知的排序字段: {sort}')
+        if limit is not None and limit <= 0:
+            return
+        reverse = order == 'desc'
+        phrases = ()
+        if text and text.strip():
+            # 只遍历全文索引给出的候选日期
+            phrases = TextIndex.phrases(text)
+            low = to_ordinal(start) if start is not None else None
+            high = to_ordinal(end) if end is not None else None
+            with self._lock:
+                ordinals = [
+                    ordinal for ordinal in self.text_index.search(text)
+                    if (low is None or ordinal >= low) and (high is None or ordinal <= high)
+                ]
+                if sort == 'score':
+                    scores = self.date_index.scores
+                    ordinals.sort(key=lambda ordinal: (scores.get(ordinal, 0), ordinal), reverse=reverse)
+                else:
+                    ordinals.sort(reverse=reverse)
+            ordinals = iter(ordinals)
+        elif sort == 'score':
+            ordinals = self.score_index.iter_by_score(min_score, max_score, start, end, reverse=reverse)
+        elif min_score is not None or max_score is not None:
+            # 按分数段筛选：合并分数段内各分数的有序日期列表，不遍历其他记录
+            ordinals = self.score_index.iter_by_date(min_score, max_score, start, end, reverse=reverse)
+        else:
+            ordinals = self.date_index.iter_range(start, end, reverse=reverse)
+        while True:
+            # 下一个日期和它的记录在同一次加锁中读取（索引的有序列表可能正被工作线程修改）
+            with self._lock:
+                ordinal = next(ordinals, None)
+                if ordinal is None:
+                    return
+                record = self.data.get(ordinal)
+            if record is None:
+                continue
+            score = record['score']
+            if min_score is not None and score < min_score:
+                continue
+            if max_score is not None and score > max_score:
+                continue
+            if phrases:
+                # 相邻两字都出现不代表整个短语连续出现，用原文校验
+                desc = (record.get('desc') or '').casefold()
+                if not all(phrase in desc for phrase in phrases):
+                    continue
+            if offset > 0:
+                offset -= 1
+                continue
+            yield ordinal, record
+            if limit is not None:
+                limit -= 1
+                if limit == 0:
+                    return
+    
+    def exists(self, date):
+        """
+        某一天是否有记录
+        :param date: 日期序号（date.toordinal()）、date对象或日期字符串（YYYY-MM-DD）
+        """
+        ordinal = safe_ordinal(date)
+        with self._lock:
+            return ordinal in self.data
+    
+    def count(self, start=None, end=None):
+        """
+        获取记录数
+        :param start: 开始日期（包含），与end都为None时返回全部记录数
+        :param end: 结束日期（包含）
+        :return: 记录数（指定范围时由日期索引在对数时间内得到）
         """
-        return self.data.copy()
+        with self._lock:
+            if start is None and end is None:
+                return len(self.data)
+            return self.date_index.range_count(
+                start if start is not None else 1,
+                end if end is not None else datetime.max.toordinal()
+            )
+    
+    def stats(self):
+        """
+        获取分数统计（增量维护，与历史记录数量无关）
+        :return: 包含total、count、average、min、max、median的字典
+        """
+        with self._lock:
+            return self.score_stats.as_dict()
+    
+    def percentile(self, p):
+        """
+        获取分数的百分位数（基于直方图，无需排序）
+        :param p: 百分位（0-100）
+        :return: 百分位数，没有记录时为None
+        """
+        with self._lock:
+            return self.score_stats.percentile(p)
+    
+    def median(self):
+        """获取分数中位数，没有记录时为None"""
+        with self._lock:
+            return self.score_stats.median()
+    
+    def quartiles(self):
+        """
+        获取分数四分位数
+        :return: (Q1, 中位数, Q3)，没有记录时均为None
+        """
+        with self._lock:
+            return self.score_stats.quartiles()
+    
+    def distribution(self, bucket_size=10):
+        """
+        获取分数分布
+        :param bucket_size: 每个区间包含的分数个数
+        :return: 列表，每项为(区间最低分, 区间最高分, 记录数)
+        """
+        with self._lock:
+            return self.score_stats.distribution(bucket_size)
+    
+    def month_summary(self, month):
+        """
+        获取某个月的统计
+        :param month: 月份字符串，格式：YYYY-MM
+        :return: 包含total、count、average的字典
+        """
+        with self._lock:
+            return self.month_stats.month(month)
+    
+    def monthly_totals(self):
+        """
+        获取每个月的总分和记录数
+        :return: 字典，key为月份（升序），value为(总分, 记录数)
+        """
+        with self._lock:
+            return self.month_stats.as_dict()
+    
+    def get_scores_in_range(self, start, end):
+        """
+        获取日期范围内的分数（包含两端）
+        :param start: 开始日期（日期序号、date对象或YYYY-MM-DD字符串）
+        :param end: 结束日期
+        :return: 字典，key为日期序号，value为包含score和desc的字典
+        """
+        if self.storage.indexed_range:
+            # 先写入延迟写入的修改，保证从存储后端读到的是最新数据（读取接口不更新统计缓存）
+            self._write_pending()
+            return self.storage.load_range(to_ordinal(start), to_ordinal(end))
+        result = {}
+        with self._lock:
+            if hasattr(self.data, 'items_range'):
+                # 按需加载时直接在映射的日期序号列上二分查找，不构建日期索引
+                return dict(self.data.items_range(to_ordinal(start), to_ordinal(end)))
+            for ordinal in self.date_index.dates_between(start, end):
+                record = self.data.get(ordinal)
+                if record is not None:
+                    result[ordinal] = record
+        return result
+    
+    def range_sum(self, start, end):
+        """
+        获取日期范围内的总分（包含两端，对数时间）
+        :param start: 开始日期（日期序号、date对象或YYYY-MM-DD字符串）
+        :param end: 结束日期
+        """
+        with self._lock:
+            return self.date_index.range_sum(start, end)
+    
+    def range_count(self, start, end):
+        """
+        获取日期范围内的记录数（包含两端，对数时间）
+        :param start: 开始日期（日期序号、date对象或YYYY-MM-DD字符串）
+        :param end: 结束日期
+        """
+        with self._lock:
+            return self.date_index.range_count(start, end)
+    
+    def range_avg(self, start, end):
+        """
+        获取日期范围内的平均分（包含两端，对数时间），没有记录时为0
+        :param start: 开始日期（日期序号、date对象或YYYY-MM-DD字符串）
+        :param end: 结束日期
+        """
+        with self._lock:
+            return self.date_index.range_avg(start, end)
     
     def delete_score(self, date):
         """
         删除某一天的分数
-        :param date: 日期字符串
+        :param date: 日期序号（date.toordinal()）、date对象或日期字符串（YYYY-MM-DD）
         """
-        if date in self.data:
-            del self.data[date]
-            self.save_data()
-            return True
-        return False
+        ordinal = safe_ordinal(date)
+        with self._lock:
+            if ordinal not in self.data:
+                return False
+            self._apply(ordinal, None)
+            self._persist(ordinal)
+        self._notify()
+        return True
     
     def update_score(self, date, score, desc=''):
         """
         更新某一天的分数和描述
-        :param date: 日期字符串，格式：YYYY-MM-DD
-        :param score: 分数（整数）
+        :param date: 日期序号（date.toordinal()）、date对象或日期字符串（YYYY-MM-DD）
+        :param score: 分数（0-100的整数）
         :param desc: 描述（字符串）
         :return: 如果日期存在返回True，否则返回False
+        :raises ValueError: 分数无效
         """
-        if date in self.data:
-            self.data[date]['score'] = score
-            if desc:
-                self.data[date]['desc'] = desc
-            else:
-                self.data[date]['desc'] = ''
-            self.save_data()
-            return True
-        return False
-
+        ordinal = safe_ordinal(date)
+        _check_score(score)
+        with self._lock:
+            if ordinal not in self.data:
+                return False
+            self._apply(ordinal, {'score': score, 'desc': desc if desc else ''})
+            self._persist(ordinal)
+        self._notify()
+        return True
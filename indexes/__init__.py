@@ -0,0 +1,25 @@
+# Indexes package
+from .base import RecordIndex
+from .score_stats import MAX_SCORE, MIN_SCORE, ScoreStats, is_valid_score
+from .date_index import DateIndex, FenwickTree, from_ordinal, safe_ordinal, to_ordinal
+from .monthly_stats import MonthlyStats, month_key
+from .text_index import TextIndex, tokenize
+from .score_index import ScoreIndex
+
+__all__ = [
+    'RecordIndex',
+    'ScoreStats',
+    'MIN_SCORE',
+    'MAX_SCORE',
+    'is_valid_score',
+    'DateIndex',
+    'FenwickTree',
+    'from_ordinal',
+    'to_ordinal',
+    'safe_ordinal',
+    'MonthlyStats',
+    'month_key',
+    'TextIndex',
+    'tokenize',
+    'ScoreIndex',
+]
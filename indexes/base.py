@@ -0,0 +1,66 @@
+"""
+内存索引基类模块
+索引随DataManager中每条记录的增删增量维护
+"""
+from bisect import bisect_left, bisect_right
+
+
+def iter_sorted(seq, low=None, high=None, reverse=False):
+    """
+    按顺序遍历有序列表中[low, high]范围内的元素，不复制列表
+    每一步都用二分查找定位下一个元素，两步之间列表被修改也不会跳过或重复
+    （每一步本身不加锁：与修改索引的线程并发时，调用方须在锁内推进生成器）
+    :param seq: 升序列表
+    :param low: 下限（包含），为None时不限
+    :param high: 上限（包含），为None时不限
+    :param reverse: 是否从大到小遍历
+    """
+    if reverse:
+        i = bisect_right(seq, high) if high is not None else len(seq)
+        while i > 0:
+            item = seq[i - 1]
+            if low is not None and item < low:
+                return
+            yield item
+            i = bisect_left(seq, item)
+    else:
+        i = bisect_left(seq, low) if low is not None else 0
+        while i < len(seq):
+            item = seq[i]
+            if high is not None and item > high:
+                return
+            yield item
+            i = bisect_right(seq, item)
+
+
+class RecordIndex:
+    """内存索引基类"""
+    
+    def add(self, ordinal, record):
+        """
+        记录被加入时调用
+        :param ordinal: 日期序号（date.toordinal()）
+        :param record: 包含score和desc的记录
+        """
+        raise NotImplementedError
+    
+    def remove(self, ordinal, record):
+        """
+        记录被移除时调用（更新记录时先remove旧记录再add新记录）
+        :param ordinal: 日期序号
+        :param record: 被移除的旧记录
+        """
+        raise NotImplementedError
+    
+    def clear(self):
+        """清空索引"""
+        raise NotImplementedError
+    
+    def rebuild(self, data):
+        """
+        根据全部数据重建索引
+        :param data: 字典，key为日期序号，value为记录
+        """
+        self.clear()
+        for ordinal, record in data.items():
+            self.add(ordinal, record)
@@ -0,0 +1,195 @@
+"""
+日期索引模块
+按日期序号（date.toordinal()）维护有序日期列表和按列表位置建立的前缀和树，
+在对数时间内回答任意日期范围的总分、记录数和平均分（占用空间与记录数成正比，与日期跨度无关）
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import date as date_type
+from .base import RecordIndex, iter_sorted
+
+
+def to_ordinal(value):
+    """
+    将日期转换为日期序号
+    :param value: 日期字符串（YYYY-MM-DD）、date对象或整数序号
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, date_type):
+        return value.toordinal()
+    return date_type.fromisoformat(value).toordinal()
+
+
+def safe_ordinal(value):
+    """将日期转换为日期序号，格式无效时返回None"""
+    try:
+        return to_ordinal(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def from_ordinal(ordinal):
+    """将日期序号转换为日期字符串（YYYY-MM-DD）"""
+    return date_type.fromordinal(ordinal).isoformat()
+
+
+class FenwickTree:
+    """树状数组：单点增加与前缀求和均为O(log n)"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+    
+    @classmethod
+    def from_values(cls, values):
+        """
+        由初始值线性时间建树
+        :param values: 各位置（从0开始）的初始值列表
+        """
+        tree = cls(len(values))
+        data = tree.tree
+        data[1:] = values
+        for i in range(1, tree.size + 1):
+            j = i + (i & -i)
+            if j <= tree.size:
+                data[j] += data[i]
+        return tree
+    
+    def add(self, i, delta):
+        """第i个位置（从0开始）增加delta"""
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+    
+    def append(self, value):
+        """在末尾追加一个位置（O(log n)）"""
+        self.size += 1
+        i = self.size
+        total = value
+        # 新节点覆盖(i - lowbit(i), i]，其余部分由已有的子节点求和
+        j = i - 1
+        low = i - (i & -i)
+        while j > low:
+            total += self.tree[j]
+            j -= j & -j
+        self.tree.append(total)
+    
+    def pop(self):
+        """移除末尾的位置（没有其他节点包含最后一个节点）"""
+        self.size -= 1
+        self.tree.pop()
+    
+    def prefix(self, i):
+        """前i个位置（即[0, i)）的和"""
+        total = 0
+        i = min(i, self.size)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class DateIndex(RecordIndex):
+    """
+    日期索引：有序日期序号 + 按列表位置的分数前缀和
+    修改已有日期和在末尾追加、删除最新日期为O(log n)；在中间插入或删除日期时线性重建前缀和树
+    """
+    
+    def __init__(self):
+        self.ordinals = []
+        self.scores = {}
+        self._sum = FenwickTree(0)
+    
+    def clear(self):
+        """清空索引"""
+        self.__init__()
+    
+    def rebuild(self, data):
+        """根据全部数据重建索引（线性时间建树）"""
+        self.clear()
+        if hasattr(data, 'columns'):
+            # 列式存储的日期序号列本身已有序
+            ordinals, scores = data.columns()
+            self.scores = dict(zip(ordinals, scores))
+            self.ordinals = list(ordinals)
+        else:
+            self.scores = {ordinal: record['score'] for ordinal, record in data.items()}
+            self.ordinals = sorted(self.scores)
+        self._rebuild_tree()
+    
+    def _rebuild_tree(self):
+        """按当前的有序日期列表重建前缀和树"""
+        self._sum = FenwickTree.from_values([self.scores[ordinal] for ordinal in self.ordinals])
+    
+    def add(self, ordinal, record):
+        """加入一条记录"""
+        score = record['score']
+        old = self.scores.get(ordinal)
+        self.scores[ordinal] = score
+        if old is not None:
+            self._sum.add(bisect_left(self.ordinals, ordinal), score - old)
+        elif not self.ordinals or ordinal > self.ordinals[-1]:
+            self.ordinals.append(ordinal)
+            self._sum.append(score)
+        else:
+            insort(self.ordinals, ordinal)
+            self._rebuild_tree()
+    
+    def remove(self, ordinal, record):
+        """移除一条记录"""
+        if ordinal not in self.scores:
+            return
+        del self.scores[ordinal]
+        if ordinal == self.ordinals[-1]:
+            self.ordinals.pop()
+            self._sum.pop()
+            return
+        del self.ordinals[bisect_left(self.ordinals, ordinal)]
+        self._rebuild_tree()
+    
+    def _positions(self, start, end):
+        """日期范围[start, end]在有序日期列表中的位置区间[low, high)"""
+        return bisect_left(self.ordinals, to_ordinal(start)), bisect_right(self.ordinals, to_ordinal(end))
+    
+    def range_sum(self, start, end):
+        """
+        日期范围内的总分（包含两端）
+        :param start: 开始日期（字符串、date对象或日期序号）
+        :param end: 结束日期
+        """
+        low, high = self._positions(start, end)
+        if high <= low:
+            return 0
+        return self._sum.prefix(high) - self._sum.prefix(low)
+    
+    def range_count(self, start, end):
+        """日期范围内的记录数（包含两端）"""
+        low, high = self._positions(start, end)
+        return max(high - low, 0)
+    
+    def range_avg(self, start, end):
+        """日期范围内的平均分（包含两端），没有记录时为0"""
+        count = self.range_count(start, end)
+        return self.range_sum(start, end) / count if count > 0 else 0
+    
+    def iter_range(self, start=None, end=None, reverse=False):
+        """
+        按顺序遍历日期范围内有记录的日期序号，不复制有序列表（见iter_sorted）
+        :param start: 开始日期（包含），为None时不限
+        :param end: 结束日期（包含），为None时不限
+        :param reverse: 是否从新到旧遍历
+        :return: 生成器，逐个产生日期序号
+        """
+        low = to_ordinal(start) if start is not None else None
+        high = to_ordinal(end) if end is not None else None
+        return iter_sorted(self.ordinals, low, high, reverse)
+    
+    def dates_between(self, start, end):
+        """
+        日期范围内有记录的日期序号（升序）
+        :return: 有序日期序号列表
+        """
+        low = bisect_left(self.ordinals, to_ordinal(start))
+        high = bisect_right(self.ordinals, to_ordinal(end))
+        return self.ordinals[low:high]
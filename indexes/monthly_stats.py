@@ -0,0 +1,80 @@
+"""
+月度统计模块
+按月（YYYY-MM）维护总分和记录数
+"""
+from datetime import date as date_type
+from .base import RecordIndex
+
+
+def month_key(ordinal):
+    """
+    获取日期所属的月份
+    :param ordinal: 日期序号
+    :return: 月份字符串（YYYY-MM）
+    """
+    day = date_type.fromordinal(ordinal)
+    return f'{day.year:04d}-{day.month:02d}'
+
+
+class MonthlyStats(RecordIndex):
+    """月度统计：每个月的总分和记录数，增删的代价为O(1)"""
+    
+    def __init__(self):
+        # key为月份（YYYY-MM），value为[总分, 记录数]
+        self.months = {}
+    
+    def clear(self):
+        """清空统计"""
+        self.months = {}
+    
+    def restore(self, months):
+        """
+        直接恢复已保存的统计结果
+        :param months: 字典，key为月份，value为(总分, 记录数)
+        """
+        self.months = {month: [total, count] for month, (total, count) in months.items()}
+    
+    def rebuild(self, data):
+        """根据全部数据重建统计（列式存储直接读取日期序号列和分数列）"""
+        if not hasattr(data, 'columns'):
+            super().rebuild(data)
+            return
+        self.clear()
+        ordinals, scores = data.columns()
+        for ordinal, score in zip(ordinals, scores):
+            entry = self.months.setdefault(month_key(ordinal), [0, 0])
+            entry[0] += score
+            entry[1] += 1
+    
+    def add(self, ordinal, record):
+        """加入一条记录"""
+        entry = self.months.setdefault(month_key(ordinal), [0, 0])
+        entry[0] += record['score']
+        entry[1] += 1
+    
+    def remove(self, ordinal, record):
+        """移除一条记录"""
+        month = month_key(ordinal)
+        entry = self.months.get(month)
+        if entry is None:
+            return
+        entry[0] -= record['score']
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.months[month]
+    
+    def month(self, month):
+        """
+        获取某个月的统计
+        :param month: 月份字符串（YYYY-MM）
+        :return: 包含total、count、average的字典
+        """
+        total, count = self.months.get(month, (0, 0))
+        return {'total': total, 'count': count, 'average': total / count if count > 0 else 0}
+    
+    def as_dict(self):
+        """
+        导出全部月份的统计
+        :return: 字典，key为月份（升序），value为(总分, 记录数)
+        """
+        return {month: tuple(self.months[month]) for month in sorted(self.months)}
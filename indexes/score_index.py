@@ -0,0 +1,80 @@
+"""
+分数索引模块
+0-100分每个分数一个有序的日期序号列表，按分数排序和按分数段筛选时只读取需要的记录
+"""
+import heapq
+from bisect import bisect_left, insort
+from .base import RecordIndex, iter_sorted
+from .date_index import to_ordinal
+from .score_stats import MAX_SCORE, MIN_SCORE, score_bucket
+
+
+class ScoreIndex(RecordIndex):
+    """分数索引：分数 -> 有序的日期序号列表（超出范围的历史数据归入两端）"""
+    
+    def __init__(self):
+        self.buckets = [[] for _ in range(MAX_SCORE - MIN_SCORE + 1)]
+    
+    def clear(self):
+        """清空索引"""
+        self.__init__()
+    
+    def rebuild(self, data):
+        """根据全部数据重建索引（列式存储的日期序号列已有序，无需排序）"""
+        self.clear()
+        if hasattr(data, 'columns'):
+            ordinals, scores = data.columns()
+            for ordinal, score in zip(ordinals, scores):
+                self.buckets[score_bucket(score) - MIN_SCORE].append(ordinal)
+            return
+        for ordinal, record in data.items():
+            self.buckets[score_bucket(record['score']) - MIN_SCORE].append(ordinal)
+        for bucket in self.buckets:
+            bucket.sort()
+    
+    def add(self, ordinal, record):
+        """加入一条记录"""
+        insort(self.buckets[score_bucket(record['score']) - MIN_SCORE], ordinal)
+    
+    def remove(self, ordinal, record):
+        """移除一条记录"""
+        bucket = self.buckets[score_bucket(record['score']) - MIN_SCORE]
+        i = bisect_left(bucket, ordinal)
+        if i < len(bucket) and bucket[i] == ordinal:
+            del bucket[i]
+    
+    def _bucket_range(self, min_score, max_score):
+        """分数段对应的桶下标范围"""
+        low = score_bucket(min_score) if min_score is not None else MIN_SCORE
+        high = score_bucket(max_score) if max_score is not None else MAX_SCORE
+        return range(low - MIN_SCORE, high - MIN_SCORE + 1)
+    
+    def iter_by_score(self, min_score=None, max_score=None, start=None, end=None, reverse=False):
+        """
+        按分数顺序遍历，同分的记录按日期顺序
+        :param min_score: 最低分（包含），为None时不限
+        :param max_score: 最高分（包含），为None时不限
+        :param start: 开始日期（包含），为None时不限
+        :param end: 结束日期（包含），为None时不限
+        :param reverse: 是否从高分到低分（同分时从新到旧）遍历
+        :return: 生成器，逐个产生日期序号（超出范围的历史数据只按所在的桶筛选，调用方需再次校验分数）
+        """
+        low = to_ordinal(start) if start is not None else None
+        high = to_ordinal(end) if end is not None else None
+        indices = self._bucket_range(min_score, max_score)
+        for i in (reversed(indices) if reverse else indices):
+            yield from iter_sorted(self.buckets[i], low, high, reverse)
+    
+    def iter_by_date(self, min_score=None, max_score=None, start=None, end=None, reverse=False):
+        """
+        按日期顺序遍历分数段内的记录（合并各分数桶的有序列表，代价与结果数成正比）
+        参数同iter_by_score，reverse为是否从新到旧遍历
+        :return: 生成器，逐个产生日期序号
+        """
+        low = to_ordinal(start) if start is not None else None
+        high = to_ordinal(end) if end is not None else None
+        return heapq.merge(
+            *(iter_sorted(self.buckets[i], low, high, reverse)
+              for i in self._bucket_range(min_score, max_score)),
+            reverse=reverse
+        )
@@ -0,0 +1,163 @@
+"""
+分数统计模块
+增量维护总分、记录数、最高分、最低分和0-100分的直方图
+"""
+from .base import RecordIndex
+
+# 分数范围（与页面中的0-100校验一致）
+MIN_SCORE = 0
+MAX_SCORE = 100
+
+
+def is_valid_score(score):
+    """分数是否为0-100之间的整数（页面输入与批量导入共用的校验规则）"""
+    return isinstance(score, int) and not isinstance(score, bool) and MIN_SCORE <= score <= MAX_SCORE
+
+
+def score_bucket(score):
+    """获取分数对应的直方图桶（超出范围的历史数据归入两端）"""
+    return min(max(int(score), MIN_SCORE), MAX_SCORE)
+
+
+class ScoreStats(RecordIndex):
+    """分数统计：每次增删的代价为O(1)，查询为O(1)"""
+    
+    def __init__(self):
+        self.histogram = [0] * (MAX_SCORE - MIN_SCORE + 1)
+        self.total = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+    
+    def clear(self):
+        """清空统计"""
+        self.__init__()
+    
+    def restore(self, total, count, minimum, maximum, histogram):
+        """
+        直接恢复已保存的统计结果（如二进制快照文件头中的统计）
+        :param histogram: 0-100分各分数的记录数
+        """
+        self.total = total
+        self.count = count
+        self.min = minimum if count else None
+        self.max = maximum if count else None
+        self.histogram = list(histogram)
+    
+    def rebuild(self, data):
+        """根据全部数据重建统计（优先使用数据自带的统计摘要，其次直接读取分数列）"""
+        summary = data.summary() if hasattr(data, 'summary') else None
+        if summary is not None:
+            self.restore(*summary)
+            return
+        if not hasattr(data, 'columns'):
+            super().rebuild(data)
+            return
+        self.clear()
+        _, scores = data.columns()
+        for score in scores:
+            self.histogram[score_bucket(score) - MIN_SCORE] += 1
+        self.count = len(scores)
+        self.total = sum(scores)
+        if self.count:
+            self.min = min(scores)
+            self.max = max(scores)
+    
+    def add(self, ordinal, record):
+        """加入一条记录"""
+        score = record['score']
+        self.histogram[score_bucket(score) - MIN_SCORE] += 1
+        self.total += score
+        self.count += 1
+        if self.min is None or score < self.min:
+            self.min = score
+        if self.max is None or score > self.max:
+            self.max = score
+    
+    def remove(self, ordinal, record):
+        """移除一条记录"""
+        score = record['score']
+        self.histogram[score_bucket(score) - MIN_SCORE] -= 1
+        self.total -= score
+        self.count -= 1
+        if self.count == 0:
+            self.min = None
+            self.max = None
+            return
+        # 移除的是最值时，从直方图中找到新的最值（最多扫描101个桶）
+        if score == self.min:
+            self.min = next(i for i, n in enumerate(self.histogram) if n) + MIN_SCORE
+        if score == self.max:
+            self.max = MAX_SCORE - next(i for i, n in enumerate(reversed(self.histogram)) if n)
+    
+    @property
+    def average(self):
+        """平均分，没有记录时为0"""
+        return self.total / self.count if self.count > 0 else 0
+    
+    def _kth(self, k):
+        """
+        获取从小到大第k个（从0开始）分数，通过累加直方图得到，最多扫描101个桶
+        :param k: 排名
+        """
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen > k:
+                return i + MIN_SCORE
+        return MAX_SCORE
+    
+    def percentile(self, p):
+        """
+        获取百分位数（在相邻排名之间线性插值）
+        :param p: 百分位（0-100）
+        :return: 百分位数，没有记录时为None
+        """
+        if self.count == 0:
+            return None
+        p = min(max(p, 0), 100)
+        rank = p / 100 * (self.count - 1)
+        lower = int(rank)
+        low_value = self._kth(lower)
+        if rank == lower:
+            return low_value
+        high_value = self._kth(lower + 1)
+        return low_value + (high_value - low_value) * (rank - lower)
+    
+    def median(self):
+        """中位数，没有记录时为None"""
+        return self.percentile(50)
+    
+    def quartiles(self):
+        """
+        四分位数
+        :return: (Q1, 中位数, Q3)，没有记录时均为None
+        """
+        return self.percentile(25), self.percentile(50), self.percentile(75)
+    
+    def distribution(self, bucket_size=10):
+        """
+        分数分布
+        :param bucket_size: 每个区间包含的分数个数
+        :return: 列表，每项为(区间最低分, 区间最高分, 记录数)
+        """
+        result = []
+        for low in range(MIN_SCORE, MAX_SCORE + 1, bucket_size):
+            high = min(low + bucket_size - 1, MAX_SCORE)
+            count = sum(self.histogram[low - MIN_SCORE:high - MIN_SCORE + 1])
+            result.append((low, high, count))
+        return result
+    
+    def as_dict(self):
+        """
+        导出统计结果
+        :return: 包含total、count、average、min、max、median的字典
+        """
+        return {
+            'total': self.total,
+            'count': self.count,
+            'average': self.average,
+            'min': self.min,
+            'max': self.max,
+            'median': self.median(),
+        }
@@ -0,0 +1,119 @@
+"""
+全文索引模块
+对记录描述建立倒排索引：英文和数字按单词切分，中日韩文字按单字和相邻两字（bigram）切分，
+支持单词前缀匹配和多个词同时匹配
+"""
+import re
+from bisect import bisect_left, insort
+from .base import RecordIndex
+
+# 中日韩文字（统一表意文字、扩展A、兼容表意文字、假名、谚文）
+CJK_CHARS = '぀-ヿ㐀-䶿一-鿿가-힯豈-﫿'
+# 连续的中日韩文字，或连续的字母数字（不含中日韩文字和下划线）
+TOKEN_RE = re.compile(f'([{CJK_CHARS}]+)|([^\\W_{CJK_CHARS}]+)')
+
+
+def _cjk_terms(run):
+    """中日韩文字串切分为单字和相邻两字"""
+    terms = set(run)
+    terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def tokenize(text):
+    """
+    将描述切分为索引词
+    :param text: 描述文字
+    :return: 索引词集合（已转为小写）
+    """
+    terms = set()
+    for cjk, word in TOKEN_RE.findall((text or '').casefold()):
+        if cjk:
+            terms.update(_cjk_terms(cjk))
+        else:
+            terms.add(word)
+    return terms
+
+
+class TextIndex(RecordIndex):
+    """倒排索引：索引词 -> 包含该词的日期序号集合"""
+    
+    def __init__(self):
+        self.postings = {}
+        # 有序的索引词列表，用于前缀查找
+        self.terms = []
+    
+    def clear(self):
+        """清空索引"""
+        self.__init__()
+    
+    def rebuild(self, data):
+        """根据全部数据重建索引（最后一次性排序索引词）"""
+        self.clear()
+        postings = self.postings
+        for ordinal, record in data.items():
+            for term in tokenize(record.get('desc')):
+                postings.setdefault(term, set()).add(ordinal)
+        self.terms = sorted(postings)
+    
+    def add(self, ordinal, record):
+        """加入一条记录"""
+        for term in tokenize(record.get('desc')):
+            dates = self.postings.get(term)
+            if dates is None:
+                dates = self.postings[term] = set()
+                insort(self.terms, term)
+            dates.add(ordinal)
+    
+    def remove(self, ordinal, record):
+        """移除一条记录"""
+        for term in tokenize(record.get('desc')):
+            dates = self.postings.get(term)
+            if dates is None:
+                continue
+            dates.discard(ordinal)
+            if not dates:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+    
+    def _prefix(self, prefix):
+        """
+        以prefix开头的所有单词对应的日期序号
+        :return: 只有一个单词匹配时直接返回其倒排集合（调用方不得修改），否则为合并后的新集合
+        """
+        i = j = bisect_left(self.terms, prefix)
+        while j < len(self.terms) and self.terms[j].startswith(prefix):
+            j += 1
+        matches = [self.postings[term] for term in self.terms[i:j]]
+        if len(matches) == 1:
+            return matches[0]
+        return set().union(*matches)
+    
+    def search(self, query):
+        """
+        搜索描述
+        查询按空格分为多个词，所有词都须匹配；英文和数字按单词前缀匹配（如exa匹配exam），
+        中日韩文字须在描述中连续出现（由单字和相邻两字的交集得到候选）
+        :param query: 查询文字
+        :return: 匹配的日期序号集合（不含需要逐条校验的中日韩短语时已是准确结果）
+        """
+        groups = []
+        for cjk, word in TOKEN_RE.findall((query or '').casefold()):
+            if cjk:
+                terms = [cjk] if len(cjk) == 1 else [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+                groups.extend(self.postings.get(term, set()) for term in terms)
+            else:
+                groups.append(self._prefix(word))
+        if not groups:
+            return set()
+        # 从最小的集合开始求交集（结果为新集合，不会修改索引）
+        groups.sort(key=len)
+        return groups[0].intersection(*groups[1:])
+    
+    @staticmethod
+    def phrases(query):
+        """
+        查询中长于两个字的中日韩短语（相邻两字的交集可能误判，需要用原文校验）
+        :return: 短语列表（已转为小写）
+        """
+        return [cjk for cjk, _ in TOKEN_RE.findall((query or '').casefold()) if len(cjk) > 2]
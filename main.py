@@ -3,11 +3,13 @@
 只包含应用启动相关的代码
 """
 from kivy.app import App
+from kivy.clock import Clock
 from data_manager import DataManager
 from pages.home_page import HomePage
 from pages.history_page import HistoryPage
 from pages.edit_history_page import EditHistoryPage
 from widgets.ui_utils import show_message_popup
+from utils.config import get_text
 
 
 class ScoreApp(App):
@@ -15,21 +17,28 @@ class ScoreApp(App):
     
     def build(self):
         """构建应用界面"""
-        self.data_manager = DataManager()
+        # 使用日志模式：每次保存只追加一条记录，避免重写整个数据文件
+        # 延迟写入：按钮回调只修改内存数据，由后台线程合并写入磁盘
+        # 数据文件在工作线程中加载，异步接口的回调通过Clock投递回主线程
+        self.data_manager = DataManager(
+            backend='journal',
+            write_behind=True,
+            on_save_complete=self.on_save_complete,
+            dispatch=lambda callback: Clock.schedule_once(lambda dt: callback()),
+            defer_load=True
+        )
         
         # 初始化页面管理器
+        # 各页面订阅DataManager的数据变更事件，只刷新受影响的部分
         self.history_page = HistoryPage(
             self.data_manager,
             self.show_popup,
-            self.show_edit_record,
-            self.update_home_display
+            self.show_edit_record
         )
         
         self.edit_history_page = EditHistoryPage(
             self.data_manager,
-            self.show_popup,
-            self.update_home_display,
-            self.refresh_history
+            self.show_popup
         )
         
         # 创建首页
@@ -43,8 +52,44 @@ class ScoreApp(App):
         # 保存home_page引用，用于更新显示
         self.home_page = home_page
         
+        # 开始后台加载，加载期间首页显示进度（加载完成后首页由bulk_changed事件刷新）
+        self.data_manager.load_async(
+            progress=home_page.show_load_progress,
+            on_error=self.on_load_failed
+        )
+        
+        # 定时检查数据文件是否被其他进程（命令行脚本、同步任务等）修改
+        Clock.schedule_interval(self.check_external_changes, 5)
+        
         return home_page
     
+    def on_pause(self):
+        """应用进入后台时写入所有未保存的修改"""
+        self.data_manager.flush()
+        return True
+    
+    def on_resume(self):
+        """应用回到前台时合并其他进程的修改"""
+        self.check_external_changes()
+    
+    def check_external_changes(self, *args):
+        """数据文件被其他进程修改时，在工作线程中合并修改（各页面由数据变更事件刷新）"""
+        self.data_manager.run_async(self.data_manager.reload_if_changed)
+    
+    def on_stop(self):
+        """应用退出时写入所有未保存的修改并关闭存储"""
+        self.data_manager.close()
+    
+    def on_save_complete(self, success):
+        """后台写入完成的回调（在工作线程中调用）"""
+        if not success:
+            Clock.schedule_once(lambda dt: self.show_popup(get_text('error'), get_text('save_failed')))
+    
+    def on_load_failed(self, error):
+        """后台加载失败的回调（在主线程中调用）"""
+        self.home_page.update_display()
+        self.show_popup(get_text('error'), f'{get_text("load_failed")}: {str(error)}')
+    
     def show_popup(self, title, message):
         """显示弹窗"""
         show_message_popup(title, message)
@@ -57,24 +102,9 @@ class ScoreApp(App):
         """显示编辑历史记录界面"""
         self.edit_history_page.show_edit_record()
     
-    def show_edit_record(self, date_str):
-        """显示编辑指定日期的记录界面"""
-        self.edit_history_page.show_edit_record(date_str)
-    
-    def update_home_display(self):
-        """更新首页显示"""
-        if hasattr(self, 'home_page'):
-            self.home_page.update_display()
-    
-    def refresh_history(self):
-        """刷新历史记录（如果打开的话）"""
-        if hasattr(self.history_page, 'history_popup') and self.history_page.history_popup:
-            try:
-                from kivy.clock import Clock
-                self.history_page.history_popup.dismiss()
-                Clock.schedule_once(lambda dt: self.history_page.show_history(), 0.2)
-            except:
-                pass
+    def show_edit_record(self, ordinal):
+        """显示编辑指定日期（日期序号）的记录界面"""
+        self.edit_history_page.show_edit_record(ordinal)
 
 
 if __name__ == '__main__':
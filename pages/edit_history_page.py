@@ -7,50 +7,64 @@ from kivy.uix.spinner import Spinner
 from kivy.graphics import Color, Rectangle
 from kivy.clock import Clock
 import calendar
-from datetime import datetime
+from datetime import date
 from utils.config import get_text, is_android, CHINESE_FONT
-from widgets.ui_utils import create_label, create_text_input, create_button, create_popup
+from widgets.ui_utils import (
+    create_text_input, create_popup, acquire_label, acquire_button, release_widget
+)
 from data_manager import DataManager
+from indexes import is_valid_score
 
 
 class EditHistoryPage:
     """编辑历史记录页面管理类"""
     
-    def __init__(self, data_manager, show_popup_callback, update_display_callback, refresh_history_callback):
+    def __init__(self, data_manager, show_popup_callback):
         self.data_manager = data_manager
         self.show_popup = show_popup_callback
-        self.update_display_callback = update_display_callback
-        self.refresh_history_callback = refresh_history_callback
         self.edit_popup = None
         self.year_spinner = None
         self.month_spinner = None
         self.day_spinner = None
         self.edit_score_input = None
         self.edit_desc_input = None
+        # 最近一次从数据中载入输入框的(分数, 描述)文字，用于判断用户是否已修改
+        self._loaded_text = None
+        # 弹窗中从控件池取出的Label和Button
+        self._pooled_widgets = []
     
-    def show_edit_record(self, date_str=None):
-        """显示编辑指定日期的记录界面"""
+    def _pooled(self, widget):
+        """记录从控件池取出的控件，下次打开弹窗时放回"""
+        self._pooled_widgets.append(widget)
+        return widget
+    
+    def release_pooled(self):
+        """将弹窗中的Label和Button放回控件池（解除事件绑定并恢复属性）"""
+        for widget in self._pooled_widgets:
+            release_widget(widget)
+        self._pooled_widgets = []
+    
+    def show_edit_record(self, ordinal=None):
+        """
+        显示编辑指定日期的记录界面
+        :param ordinal: 日期序号（date.toordinal()），为None时使用当前日期
+        """
         android = is_android()
+        # 上一次打开的弹窗早已关闭，把其中的控件放回控件池，本次重新取出使用
+        self.release_pooled()
         
-        # 如果提供了日期字符串，解析它；否则使用当前日期
-        if date_str:
+        # 如果提供了日期序号，直接得到年月日；否则使用当前日期
+        if ordinal is not None:
             try:
-                date_parts = date_str.split('-')
-                if len(date_parts) != 3:
-                    self.show_popup(get_text('error'), get_text('invalid_date'))
-                    return
-                year = int(date_parts[0])
-                month = int(date_parts[1])
-                day = int(date_parts[2])
-            except (ValueError, IndexError):
+                selected = date.fromordinal(ordinal)
+            except (ValueError, OverflowError, TypeError):
                 self.show_popup(get_text('error'), get_text('invalid_date'))
                 return
         else:
-            # 使用当前日期
-            now = datetime.now()
-            year = now.year
-            month = now.month
-            day = now.day
+            selected = date.today()
+        year = selected.year
+        month = selected.month
+        day = selected.day
         
         # 创建修改历史记录界面
         padding_val = 8 if android else 10
@@ -74,27 +88,27 @@ class EditHistoryPage:
         edit_layout.bind(pos=update_edit_rect, size=update_edit_rect)
         
         # 标题
-        title_label = create_label(
+        title_label = self._pooled(acquire_label(
             get_text('edit_title'),
             size_hint_y=None,
             height=48 if android else 45,
             font_size=30 if android else 24,
             bold=True,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         edit_layout.add_widget(title_label)
         
         # 日期选择区域 - 年、月、日三级选择器
         date_select_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=spacing_val)
         
         # 日期标签
-        date_label = create_label(
+        date_label = self._pooled(acquire_label(
             f'{get_text("select_date")}:',
             size_hint_y=None,
             height=38 if android else 35,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         date_select_layout.add_widget(date_label)
         
         # 年、月、日选择器布局
@@ -107,12 +121,12 @@ class EditHistoryPage:
         
         # 年份选择器
         year_values = [str(i) for i in range(year - 10, year + 11)]
-        year_label = create_label(
+        year_label = self._pooled(acquire_label(
             f'{get_text("year")}:',
             size_hint_x=0.15,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         date_picker_layout.add_widget(year_label)
         
         self.year_spinner = Spinner(
@@ -128,12 +142,12 @@ class EditHistoryPage:
         
         # 月份选择器
         month_values = [str(i) for i in range(1, 13)]
-        month_label = create_label(
+        month_label = self._pooled(acquire_label(
             f'{get_text("month")}:',
             size_hint_x=0.15,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         date_picker_layout.add_widget(month_label)
         
         self.month_spinner = Spinner(
@@ -148,12 +162,12 @@ class EditHistoryPage:
         date_picker_layout.add_widget(self.month_spinner)
         
         # 日期选择器
-        day_label = create_label(
+        day_label = self._pooled(acquire_label(
             f'{get_text("day")}:',
             size_hint_x=0.15,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         date_picker_layout.add_widget(day_label)
         
         days = self.get_days_in_month(year, month)
@@ -179,12 +193,12 @@ class EditHistoryPage:
             height=55 if android else 50,
             spacing=spacing_val
         )
-        score_edit_label = create_label(
+        score_edit_label = self._pooled(acquire_label(
             f'{get_text("score")}:',
             size_hint_x=0.3,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         score_edit_layout.add_widget(score_edit_label)
         
         self.edit_score_input = create_text_input(
@@ -204,12 +218,12 @@ class EditHistoryPage:
             height=70 if android else 60,
             spacing=spacing_val
         )
-        desc_edit_label = create_label(
+        desc_edit_label = self._pooled(acquire_label(
             f'{get_text("desc")}:',
             size_hint_x=0.3,
             font_size=20 if android else 16,
             color=(0.2, 0.2, 0.2, 1)
-        )
+        ))
         desc_edit_layout.add_widget(desc_edit_label)
         
         self.edit_desc_input = create_text_input(
@@ -231,21 +245,21 @@ class EditHistoryPage:
         )
         
         # 保存修改按钮
-        save_edit_button = create_button(
+        save_edit_button = self._pooled(acquire_button(
             get_text('save_edit'),
             size_hint_x=0.5,
             font_size=20 if android else 16,
             on_press=self.save_edit
-        )
+        ))
         button_edit_layout.add_widget(save_edit_button)
         
         # 关闭按钮
-        close_edit_button = create_button(
+        close_edit_button = self._pooled(acquire_button(
             get_text('close'),
             size_hint_x=0.5,
             font_size=20 if android else 16,
             on_press=lambda x: self.edit_popup.dismiss()
-        )
+        ))
         button_edit_layout.add_widget(close_edit_button)
         
         edit_layout.add_widget(button_edit_layout)
@@ -258,11 +272,29 @@ class EditHistoryPage:
             title_size=18 if android else 20
         )
         
+        # 弹窗打开期间，所选日期的记录被其他操作修改时同步刷新
+        self.data_manager.subscribe(self.on_data_changed)
+        self.edit_popup.bind(on_dismiss=lambda x: self.data_manager.unsubscribe(self.on_data_changed))
+        
         # 加载该日期的数据
         Clock.schedule_once(lambda dt: self.on_date_components_selected(), 0.1)
         
         self.edit_popup.open()
     
+    def on_data_changed(self, event):
+        """
+        数据变更事件：所选日期受影响且用户尚未修改输入框时，重新载入该日期的记录
+        :param event: change_events.ChangeEvent
+        """
+        try:
+            ordinal = self.selected_ordinal()
+        except ValueError:
+            return
+        if ordinal is None or ordinal not in event:
+            return
+        if (self.edit_score_input.text, self.edit_desc_input.text) == self._loaded_text:
+            self.on_date_components_selected()
+    
     def get_days_in_month(self, year, month):
         """获取指定年月的天数"""
         return calendar.monthrange(int(year), int(month))[1]
@@ -285,47 +317,56 @@ class EditHistoryPage:
                 # 触发日期选择事件
                 self.on_date_components_selected()
     
+    def selected_ordinal(self):
+        """
+        获取年、月、日选择器对应的日期序号
+        :return: 日期序号，未选择完整时返回None
+        :raises ValueError: 日期无效
+        """
+        if not (self.year_spinner and self.month_spinner and self.day_spinner):
+            return None
+        year = self.year_spinner.text
+        month = self.month_spinner.text
+        day = self.day_spinner.text
+        if not year or not month or not day:
+            return None
+        return date(int(year), int(month), int(day)).toordinal()
+    
     def on_date_components_selected(self, *args):
         """当年、月、日都选择后，加载该日期的数据"""
-        if self.year_spinner and self.month_spinner and self.day_spinner:
-            year = self.year_spinner.text
-            month = self.month_spinner.text
-            day = self.day_spinner.text
-            if year and month and day:
-                # 格式化日期为 YYYY-MM-DD
-                try:
-                    date_str = f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
-                    score_data = self.data_manager.get_score(date_str)
-                    if score_data:
-                        # 如果有记录，加载数据
-                        self.edit_score_input.text = str(score_data.get('score', ''))
-                        self.edit_desc_input.text = score_data.get('desc', '')
-                    else:
-                        # 如果没有记录，清空输入框
-                        self.edit_score_input.text = ''
-                        self.edit_desc_input.text = ''
-                except ValueError:
-                    pass
+        try:
+            ordinal = self.selected_ordinal()
+        except ValueError:
+            return
+        if ordinal is None:
+            return
+        score_data = self.data_manager.get_score(ordinal)
+        if score_data:
+            # 如果有记录，加载数据
+            self.edit_score_input.text = str(score_data.get('score', ''))
+            self.edit_desc_input.text = score_data.get('desc', '')
+        else:
+            # 如果没有记录，清空输入框
+            self.edit_score_input.text = ''
+            self.edit_desc_input.text = ''
+        self._loaded_text = (self.edit_score_input.text, self.edit_desc_input.text)
     
     def save_edit(self, instance):
         """保存修改的历史记录"""
         try:
-            # 从年、月、日选择器获取日期
-            year = self.year_spinner.text
-            month = self.month_spinner.text
-            day = self.day_spinner.text
-            
-            if not year or not month or not day:
-                self.show_popup(get_text('error'), get_text('select_complete_date'))
-                return
-            
-            # 格式化日期为 YYYY-MM-DD
+            # 从年、月、日选择器获取日期序号
             try:
-                selected_date = f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+                ordinal = self.selected_ordinal()
             except ValueError:
                 self.show_popup(get_text('error'), get_text('invalid_date'))
                 return
             
+            if ordinal is None:
+                self.show_popup(get_text('error'), get_text('select_complete_date'))
+                return
+            # 只在提示信息中转换为字符串
+            selected_date = date.fromordinal(ordinal).isoformat()
+            
             score_text = self.edit_score_input.text.strip()
             desc_text = self.edit_desc_input.text.strip()
             
@@ -334,27 +375,34 @@ class EditHistoryPage:
                 return
             
             score = int(score_text)
-            if score < 0 or score > 100:
+            if not is_valid_score(score):
                 self.show_popup(get_text('tip'), get_text('score_range'))
                 return
             
-            # 保存或更新数据（save_score会自动创建或更新）
-            self.data_manager.save_score(selected_date, score, desc_text)
+            if self.data_manager.loading:
+                self.show_popup(get_text('tip'), get_text('loading'))
+                return
+            
+            # 保存前检查是新建还是更新
+            existed = self.data_manager.exists(ordinal)
             
-            # 更新显示
-            self.update_display_callback()
-            self.edit_popup.dismiss()
+            def on_saved(result):
+                instance.disabled = False
+                # 首页和打开的历史记录由数据变更事件更新
+                self.edit_popup.dismiss()
+                
+                if existed:
+                    self.show_popup(get_text('success'), f'{selected_date}{get_text("record_updated")}')
+                else:
+                    self.show_popup(get_text('success'), f'{selected_date}{get_text("record_created")}')
             
-            # 如果历史记录弹窗还打开，刷新内容
-            if self.refresh_history_callback:
-                self.refresh_history_callback()
+            def on_failed(error):
+                instance.disabled = False
+                self.show_popup(get_text('error'), f'{get_text("save_failed")}: {str(error)}')
             
-            # 检查是新建还是更新
-            all_scores = self.data_manager.get_all_scores()
-            if selected_date in all_scores:
-                self.show_popup(get_text('success'), f'{selected_date}{get_text("record_updated")}')
-            else:
-                self.show_popup(get_text('success'), f'{selected_date}{get_text("record_created")}')
+            # 在工作线程中保存或更新数据（save_score会自动创建或更新），保存期间禁用按钮
+            instance.disabled = True
+            self.data_manager.save_score_async(ordinal, score, desc_text, callback=on_saved, on_error=on_failed)
         except ValueError:
             self.show_popup(get_text('error'), get_text('invalid_number'))
         except Exception as e:
@@ -3,32 +3,70 @@
 包含历史记录查看和删除功能
 """
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.spinner import Spinner
 from kivy.graphics import Color, Rectangle
 from kivy.clock import Clock
+from itertools import islice
+from time import perf_counter
 from utils.config import get_text, is_android, CHINESE_FONT
-from widgets.ui_utils import create_label, create_button, create_popup
+from widgets.ui_utils import create_label, create_text_input, create_button, create_popup, show_confirm_popup
+from widgets.history_list import HistoryList
 from data_manager import DataManager
 
 
+# 排序方式：(显示文字key, DataManager.query的sort参数)
+SORT_OPTIONS = [('sort_by_date', 'date'), ('sort_by_score', 'score')]
+# 分数段筛选：(显示文字key, 最低分, 最高分)
+SCORE_BANDS = [
+    ('all_scores', None, None),
+    ('score_below_60', None, 59),
+    ('score_60_79', 60, 79),
+    ('score_80_up', 80, None),
+]
+# 打开弹窗时立即显示的记录条数（约一屏）
+FIRST_PAGE_SIZE = 20
+# 滚动到接近底部时立即追加的记录条数
+PAGE_SIZE = 50
+# 后续记录每帧最多占用的时间（秒），保证界面保持60fps
+FRAME_BUDGET = 0.006
+# 滚动位置低于该值（接近底部）时立即追加一页
+NEAR_BOTTOM = 0.1
+
+
 class HistoryPage:
     """历史记录页面管理类"""
     
-    def __init__(self, data_manager, show_popup_callback, show_edit_callback, update_display_callback):
+    def __init__(self, data_manager, show_popup_callback, show_edit_callback):
         self.data_manager = data_manager
         self.show_popup = show_popup_callback
         self.show_edit_callback = show_edit_callback
-        self.update_display_callback = update_display_callback
         self.history_popup = None
+        self.history_list = None
+        self.empty_label = None
+        self.search_input = None
+        self.sort_spinner = None
+        self.band_spinner = None
+        self.loading_more_label = None
+        # 正在逐帧读取的查询（惰性生成器）及其定时任务
+        self._stream = None
+        self._stream_event = None
     
     def show_history(self):
         """显示历史记录"""
-        android = is_android()
-        all_scores = self.data_manager.get_all_scores()
-        
-        if not all_scores:
+        if self.data_manager.loading:
+            self.show_popup(get_text('tip'), get_text('loading'))
+            return
+        if not self.data_manager.count():
             self.show_popup(get_text('history_title'), get_text('no_history'))
             return
+        self.build_history()
+    
+    def build_history(self):
+        """
+        创建并打开历史记录弹窗
+        弹窗立即打开并显示第一屏记录，其余记录在之后的帧中逐步追加
+        """
+        android = is_android()
         
         # 创建历史记录内容
         padding_val = 8 if android else 10
@@ -57,113 +95,97 @@ class HistoryPage:
         )
         history_layout.add_widget(title_label)
         
-        # 创建滚动视图
-        scroll = ScrollView(size_hint=(1, 1))
-        scroll_content = BoxLayout(
-            orientation='vertical',
-            spacing=8,
+        # 搜索栏：按描述搜索（使用全文索引）
+        search_height = 60 if android else 45
+        search_layout = BoxLayout(
+            orientation='horizontal',
             size_hint_y=None,
-            padding=[0, 10, 0, 0]
+            height=search_height,
+            spacing=8
+        )
+        self.search_input = create_text_input(
+            multiline=False,
+            hint_text=get_text('search_hint'),
+            size_hint_x=0.7,
+            font_size=22 if android else 16,
+            background_color=(1, 1, 1, 1),  # 白色背景
+            foreground_color=(0.2, 0.2, 0.2, 1)  # 深灰色文字
+        )
+        self.search_input.bind(on_text_validate=self.apply_filters)
+        search_layout.add_widget(self.search_input)
+        
+        search_button = create_button(
+            get_text('search'),
+            size_hint_x=0.3,
+            font_size=22 if android else 18,
+            background_color=(0.4, 0.7, 1.0, 1),  # 浅蓝色
+            color=(1, 1, 1, 1),  # 白色文字
+            bold=True  # 加粗
+        )
+        search_button.bind(on_press=self.apply_filters)
+        search_layout.add_widget(search_button)
+        history_layout.add_widget(search_layout)
+        
+        # 排序与分数段筛选（使用分数索引，无需对全部记录排序）
+        filter_layout = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=search_height,
+            spacing=8
+        )
+        self.sort_spinner = Spinner(
+            text=get_text(SORT_OPTIONS[0][0]),
+            values=[get_text(key) for key, _ in SORT_OPTIONS],
+            size_hint_x=0.5,
+            font_size=20 if android else 16
         )
-        scroll_content.bind(minimum_height=scroll_content.setter('height'))
+        if CHINESE_FONT:
+            self.sort_spinner.font_name = CHINESE_FONT
+        self.sort_spinner.bind(text=self.apply_filters)
+        filter_layout.add_widget(self.sort_spinner)
         
-        # 按日期排序（最新的在前）
-        sorted_dates = sorted(all_scores.keys(), reverse=True)
+        self.band_spinner = Spinner(
+            text=get_text(SCORE_BANDS[0][0]),
+            values=[get_text(key) for key, _, _ in SCORE_BANDS],
+            size_hint_x=0.5,
+            font_size=20 if android else 16
+        )
+        if CHINESE_FONT:
+            self.band_spinner.font_name = CHINESE_FONT
+        self.band_spinner.bind(text=self.apply_filters)
+        filter_layout.add_widget(self.band_spinner)
+        history_layout.add_widget(filter_layout)
         
-        for date in sorted_dates:
-            score_data = all_scores[date]
-            score = score_data.get('score', 0)
-            desc = score_data.get('desc', get_text('none'))
-            
-            # 创建单条记录布局
-            record_height = 165 if android else 150
-            record_layout = BoxLayout(
-                orientation='vertical',
-                size_hint_y=None,
-                height=record_height,
-                padding=8
-            )
-            
-            # 信息区域
-            info_layout = BoxLayout(orientation='vertical', size_hint_y=None)
-            label_height = 38 if android else 30
-            
-            date_label = create_label(
-                f'{get_text("date")}: {date}',
-                size_hint_y=None,
-                height=label_height,
-                font_size=24 if android else 18,
-                color=(0.2, 0.2, 0.2, 1)
-            )
-            info_layout.add_widget(date_label)
-            
-            score_label = create_label(
-                f'{get_text("score")}: {score}',
-                size_hint_y=None,
-                height=label_height,
-                font_size=22 if android else 16,
-                color=(0.2, 0.2, 0.2, 1)
-            )
-            info_layout.add_widget(score_label)
-            
-            desc_label = create_label(
-                f'{get_text("desc")}: {desc}',
-                size_hint_y=None,
-                height=label_height,
-                font_size=22 if android else 16,
-                color=(0.2, 0.2, 0.2, 1)
-            )
-            info_layout.add_widget(desc_label)
-            record_layout.add_widget(info_layout)
-            
-            # 按钮区域
-            button_height = 70 if android else 55
-            button_layout = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height=button_height,
-                spacing=8
-            )
-            
-            # 编辑按钮
-            edit_btn = create_button(
-                get_text('edit'),
-                size_hint_x=0.5,
-                font_size=22 if android else 18,
-                background_color=(0.4, 0.7, 1.0, 1),  # 浅蓝色
-                color=(1, 1, 1, 1),  # 白色文字
-                bold=True  # 加粗
-            )
-            edit_btn.bind(on_press=lambda x, d=date: self.edit_record_from_history(d))
-            button_layout.add_widget(edit_btn)
-            
-            # 删除按钮
-            delete_btn = create_button(
-                get_text('delete'),
-                size_hint_x=0.5,
-                font_size=22 if android else 18,
-                background_color=(1.0, 0.5, 0.5, 1),  # 浅红色
-                color=(1, 1, 1, 1),  # 白色文字
-                bold=True  # 加粗
-            )
-            delete_btn.bind(on_press=lambda x, d=date: self.delete_record_from_history(d))
-            button_layout.add_widget(delete_btn)
-            
-            record_layout.add_widget(button_layout)
-            
-            # 添加分隔线
-            separator = create_label(
-                '─' * 20,
-                size_hint_y=None,
-                height=4,
-                font_size=8,
-                color=(0.2, 0.2, 0.2, 1)
-            )
-            scroll_content.add_widget(record_layout)
-            scroll_content.add_widget(separator)
+        # 没有匹配记录时的提示（有记录时高度为0）
+        self.empty_label = create_label(
+            get_text('no_results'),
+            size_hint_y=None,
+            height=0,
+            opacity=0,
+            font_size=22 if android else 16,
+            color=(0.2, 0.2, 0.2, 1)
+        )
+        history_layout.add_widget(self.empty_label)
         
-        scroll.add_widget(scroll_content)
-        history_layout.add_widget(scroll)
+        # 虚拟化列表：只为可见的行创建控件
+        self.history_list = HistoryList(
+            self.edit_record_from_history,
+            self.delete_record_from_history,
+            size_hint=(1, 1)
+        )
+        self.history_list.bind(scroll_y=self.on_list_scroll)
+        history_layout.add_widget(self.history_list)
+        
+        # 正在追加后续记录时的提示（追加完成后高度为0）
+        self.loading_more_label = create_label(
+            get_text('loading_more'),
+            size_hint_y=None,
+            height=0,
+            opacity=0,
+            font_size=20 if android else 14,
+            color=(0.4, 0.4, 0.4, 1)
+        )
+        history_layout.add_widget(self.loading_more_label)
         
         # 关闭按钮
         close_button = create_button(
@@ -183,81 +205,161 @@ class HistoryPage:
             size_hint=(0.95 if android else 0.8, 0.9 if android else 0.8),
             title_size=22 if android else 20
         )
+        self.history_popup.bind(on_dismiss=self.on_history_dismiss)
+        # 弹窗打开期间监听数据变更，只修改受影响的行
+        self.data_manager.subscribe(self.on_data_changed)
+        self.start_stream()
         self.history_popup.open()
     
-    def delete_record_from_history(self, date):
-        """从历史记录中删除一条记录"""
-        android = is_android()
-        from kivy.uix.boxlayout import BoxLayout as BL
-        
-        # 显示确认对话框
-        confirm_layout = BL(orientation='vertical', padding=10, spacing=10)
-        
-        confirm_label = create_label(
-            get_text('delete_confirm'),
-            size_hint_y=1,
-            font_size=20 if android else 16
-        )
-        confirm_layout.add_widget(confirm_label)
-        
-        button_layout = BL(
-            orientation='horizontal',
-            size_hint_y=None,
-            height=55 if android else 40,
-            spacing=10
-        )
-        
-        # 确认按钮
-        yes_button = create_button(
-            get_text('confirm'),
-            size_hint_x=0.5,
-            font_size=20 if android else 16
-        )
-        button_layout.add_widget(yes_button)
-        
-        # 取消按钮
-        no_button = create_button(
-            get_text('close'),
-            size_hint_x=0.5,
-            font_size=20 if android else 16
-        )
-        button_layout.add_widget(no_button)
-        
-        confirm_layout.add_widget(button_layout)
+    def on_history_dismiss(self, instance):
+        """弹窗关闭时停止追加记录和监听数据变更"""
+        self.stop_stream()
+        self.data_manager.unsubscribe(self.on_data_changed)
+        self.history_popup = None
+    
+    def fill_records(self, records):
+        """
+        用记录列表替换弹窗中显示的记录
+        :param records: (日期序号, 记录)的列表，已按当前的排序方式排好
+        """
+        if self.query_options()['sort'] == 'score':
+            sort_key = lambda row: (row['score'], row['ordinal'])
+        else:
+            sort_key = lambda row: row['ordinal']
+        self.history_list.set_records(records, sort_key)
+        self._update_empty_label()
+    
+    def _update_empty_label(self):
+        """没有匹配的记录时显示提示"""
+        empty = not self.history_list.data and self._stream is None
+        self.empty_label.height = (60 if is_android() else 45) if empty else 0
+        self.empty_label.opacity = 1 if empty else 0
+    
+    def on_data_changed(self, event):
+        """
+        数据变更事件：只修改受影响的行，不重建列表（保留滚动位置）；大批量变更时重新显示
+        :param event: change_events.ChangeEvent
+        """
+        if self.history_popup is None:
+            return
+        if event.dates is None:
+            self.start_stream()
+            return
+        options = self.query_options()
+        filters = {key: options[key] for key in ('text', 'min_score', 'max_score')}
+        for ordinal in event.dates:
+            # 按当前的搜索和筛选条件重新查询这一天（读取的是最新数据，通知晚到也不会显示旧内容）
+            match = next(self.data_manager.query(start=ordinal, end=ordinal, **filters), None)
+            if match is None:
+                self.history_list.remove_record(ordinal)
+            else:
+                self.history_list.update_record(ordinal, match[1], append=self._stream is None)
+        self._update_empty_label()
+    
+    def start_stream(self):
+        """
+        按当前的搜索和筛选条件重新显示记录：立即显示第一屏，其余记录每帧在时间预算内追加
+        """
+        self.stop_stream()
+        self._stream = self.data_manager.query(**self.query_options())
+        records = list(islice(self._stream, FIRST_PAGE_SIZE))
+        if len(records) < FIRST_PAGE_SIZE:
+            self._stream = None
+        self.fill_records(records)
+        if self._stream is None:
+            return
+        self._set_loading_more(True)
+        self._stream_event = Clock.schedule_interval(self._load_more, 0)
+    
+    def stop_stream(self):
+        """停止追加记录"""
+        if self._stream_event is not None:
+            self._stream_event.cancel()
+            self._stream_event = None
+        self._stream = None
+        if self.loading_more_label is not None:
+            self._set_loading_more(False)
+    
+    def _load_more(self, dt):
+        """每帧追加记录，直到用完本帧的时间预算"""
+        if self._stream is None:
+            return False
+        deadline = perf_counter() + FRAME_BUDGET
+        records = []
+        for item in self._stream:
+            records.append(item)
+            if perf_counter() >= deadline:
+                break
+        else:
+            # 查询已遍历完
+            self.history_list.append_records(records)
+            self.stop_stream()
+            return False
+        self.history_list.append_records(records)
+    
+    def on_list_scroll(self, instance, scroll_y):
+        """滚动到接近底部时不等下一帧，立即追加一页"""
+        if self._stream is None or scroll_y > NEAR_BOTTOM:
+            return
+        records = list(islice(self._stream, PAGE_SIZE))
+        self.history_list.append_records(records)
+        if len(records) < PAGE_SIZE:
+            self.stop_stream()
+    
+    def _set_loading_more(self, visible):
+        """显示或隐藏“加载更多”提示"""
+        self.loading_more_label.height = (40 if is_android() else 30) if visible else 0
+        self.loading_more_label.opacity = 1 if visible else 0
+    
+    def query_options(self):
+        """
+        根据搜索框和筛选条件生成查询参数
+        :return: DataManager.query的关键字参数字典
+        """
+        sort = {get_text(key): value for key, value in SORT_OPTIONS}.get(self.sort_spinner.text, 'date')
+        band = {get_text(key): (low, high) for key, low, high in SCORE_BANDS}.get(self.band_spinner.text, (None, None))
+        return {
+            'text': self.search_input.text.strip() or None,
+            'min_score': band[0],
+            'max_score': band[1],
+            'sort': sort,
+            'order': 'desc',
+        }
+    
+    def apply_filters(self, *args):
+        """按搜索框和筛选条件刷新历史记录（全文索引与分数索引的查询很快，直接在主线程中进行）"""
+        self.start_stream()
+    
+    def delete_record_from_history(self, ordinal):
+        """
+        从历史记录中删除一条记录
+        :param ordinal: 日期序号
+        """
+        def on_deleted(deleted):
+            confirm_popup.dismiss()
+            if deleted:
+                # 删除成功（首页和历史记录列表由数据变更事件更新）
+                self.show_popup(get_text('success'), get_text('record_deleted'))
+            else:
+                self.show_popup(get_text('error'), get_text('delete_failed'))
         
-        confirm_popup = create_popup(
-            get_text('tip'),
-            confirm_layout,
-            size_hint=(0.7 if android else 0.5, 0.3 if android else 0.25),
-            title_size=16 if android else 18
-        )
+        def on_failed(error):
+            confirm_popup.dismiss()
+            self.show_popup(get_text('error'), f'{get_text("delete_failed")}: {str(error)}')
         
         def confirm_delete(instance):
-            try:
-                if self.data_manager.delete_score(date):
-                    # 删除成功
-                    confirm_popup.dismiss()
-                    self.history_popup.dismiss()
-                    self.update_display_callback()  # 更新主界面显示
-                    self.show_popup(get_text('success'), get_text('record_deleted'))
-                    # 重新打开历史记录
-                    Clock.schedule_once(lambda dt: self.show_history(), 0.1)
-                else:
-                    confirm_popup.dismiss()
-                    self.show_popup(get_text('error'), get_text('delete_failed'))
-            except Exception as e:
-                confirm_popup.dismiss()
-                self.show_popup(get_text('error'), f'{get_text("delete_failed")}: {str(e)}')
-        
-        def cancel_delete(instance):
-            confirm_popup.dismiss()
+            # 在工作线程中删除，完成前禁用按钮防止重复提交
+            instance.disabled = True
+            self.data_manager.delete_score_async(ordinal, callback=on_deleted, on_error=on_failed)
         
-        yes_button.bind(on_press=confirm_delete)
-        no_button.bind(on_press=cancel_delete)
-        confirm_popup.open()
+        # 显示确认对话框（复用已创建的确认弹窗）
+        confirm_popup = show_confirm_popup(get_text('tip'), get_text('delete_confirm'), confirm_delete)
     
-    def edit_record_from_history(self, date):
-        """从历史记录中编辑一条记录"""
+    def edit_record_from_history(self, ordinal):
+        """
+        从历史记录中编辑一条记录
+        :param ordinal: 日期序号
+        """
         # 打开编辑界面，并设置日期
-        self.show_edit_callback(date)
+        self.show_edit_callback(ordinal)
 
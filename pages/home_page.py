@@ -6,10 +6,11 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.graphics import Color, Rectangle
 from kivy.clock import Clock
-from datetime import datetime
+from datetime import date
 from utils.config import get_text, is_android, CHINESE_FONT
 from widgets.ui_utils import create_label, create_text_input, create_button
 from data_manager import DataManager
+from indexes import is_valid_score
 
 
 class HomePage(BoxLayout):
@@ -21,6 +22,8 @@ class HomePage(BoxLayout):
         self.on_view_history = on_view_history
         self.on_edit_history = on_edit_history
         self.show_popup = show_popup_callback
+        # 当前日期的日期序号，只在显示时转换为字符串
+        self.today = date.today().toordinal()
         
         # 设置浅蓝色背景
         with self.canvas.before:
@@ -79,7 +82,7 @@ class HomePage(BoxLayout):
         
         # 日期显示
         self.date_label = create_label(
-            f'{get_text("date")}: {datetime.now().strftime("%Y-%m-%d")}',
+            f'{get_text("date")}: {date.fromordinal(self.today).isoformat()}',
             size_hint_y=None,
             height=label_height,
             font_size=normal_font_size,
@@ -197,6 +200,26 @@ class HomePage(BoxLayout):
         )
         main_layout.add_widget(self.avg_score_label)
         
+        # 中位数显示
+        self.median_score_label = create_label(
+            f'{get_text("median_score")}: {get_text("none")}',
+            size_hint_y=None,
+            height=label_height,
+            font_size=normal_font_size,
+            color=(0.2, 0.2, 0.2, 1)
+        )
+        main_layout.add_widget(self.median_score_label)
+        
+        # 四分位数显示
+        self.quartiles_label = create_label(
+            f'{get_text("quartiles")}: {get_text("none")}',
+            size_hint_y=None,
+            height=label_height,
+            font_size=normal_font_size,
+            color=(0.3, 0.3, 0.3, 1)
+        )
+        main_layout.add_widget(self.quartiles_label)
+        
         # 按钮布局（查看历史记录和修改历史记录）
         button_layout = BoxLayout(
             orientation='horizontal',
@@ -233,14 +256,19 @@ class HomePage(BoxLayout):
         
         # 更新显示
         self.update_display()
+        # 数据变更时只刷新受影响的部分
+        self.data_manager.subscribe(self.on_data_changed)
         
         # 定时更新日期（每天更新）
         Clock.schedule_interval(self.update_date, 60)  # 每分钟检查一次
     
     def update_date(self, dt):
-        """更新日期显示"""
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        self.date_label.text = f'{get_text("date")}: {current_date}'
+        """更新日期显示（只在日期变化时刷新）"""
+        today = date.today().toordinal()
+        if today == self.today:
+            return
+        self.today = today
+        self.date_label.text = f'{get_text("date")}: {date.fromordinal(today).isoformat()}'
         self.update_display()
     
     def save_score(self, instance):
@@ -254,33 +282,73 @@ class HomePage(BoxLayout):
                 return
             
             score = int(score_text)
-            if score < 0 or score > 100:
+            if not is_valid_score(score):
                 self.show_popup(get_text('tip'), get_text('score_range'))
                 return
             
-            # 保存数据
-            today = datetime.now().strftime("%Y-%m-%d")
-            self.data_manager.save_score(today, score, desc_text)
+            if self.data_manager.loading:
+                self.show_popup(get_text('tip'), get_text('loading'))
+                return
             
-            # 清空输入框
-            self.score_input.text = ''
-            self.desc_input.text = ''
+            def on_saved(result):
+                instance.disabled = False
+                # 清空输入框
+                self.score_input.text = ''
+                self.desc_input.text = ''
+                # 显示由数据变更事件更新
+                self.show_popup(get_text('success'), get_text('score_saved'))
             
-            # 更新显示
-            self.update_display()
+            def on_failed(error):
+                instance.disabled = False
+                self.show_popup(get_text('error'), f'{get_text("save_failed")}: {str(error)}')
             
-            self.show_popup(get_text('success'), get_text('score_saved'))
+            # 在工作线程中保存数据，保存期间禁用按钮防止重复提交
+            instance.disabled = True
+            today = date.today().toordinal()
+            self.data_manager.save_score_async(today, score, desc_text, callback=on_saved, on_error=on_failed)
         except ValueError:
             self.show_popup(get_text('error'), get_text('invalid_number'))
         except Exception as e:
             self.show_popup(get_text('error'), f'{get_text("save_failed")}: {str(e)}')
     
+    def show_load_progress(self, done, total):
+        """
+        显示数据文件的加载进度
+        :param done: 已读取字节数
+        :param total: 文件总字节数
+        """
+        percent = done * 100 // total if total else 100
+        self.today_score_label.text = f'{get_text("loading")} {percent}%'
+    
+    def on_data_changed(self, event):
+        """
+        数据变更事件：统计总是刷新（增量维护，代价为O(1)），今天的记录只在今天受影响时刷新
+        :param event: change_events.ChangeEvent
+        """
+        if self.data_manager.loading:
+            return
+        if date.today().toordinal() in event:
+            self.update_today()
+        self.update_stats()
+    
     def update_display(self):
         """更新所有显示"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # 获取今天的数据
-        today_data = self.data_manager.get_score(today)
+        if self.data_manager.loading:
+            # 数据仍在后台加载，加载完成后会再次调用
+            self.today_score_label.text = get_text('loading')
+            self.today_desc_label.text = get_text('loading')
+            if not self.data_manager.stats_ready:
+                for label in (self.total_score_label, self.avg_score_label,
+                              self.median_score_label, self.quartiles_label):
+                    label.text = get_text('loading')
+                return
+        else:
+            self.update_today()
+        self.update_stats()
+    
+    def update_today(self):
+        """更新今天的分数和描述"""
+        today_data = self.data_manager.get_score(date.today().toordinal())
         if today_data:
             score_value = today_data["score"]
             self.today_score_label.text = f'{get_text("today_score_label")}: {score_value}'
@@ -289,13 +357,20 @@ class HomePage(BoxLayout):
         else:
             self.today_score_label.text = f'{get_text("today_score_label")}: {get_text("not_recorded")}'
             self.today_desc_label.text = f'{get_text("today_desc_label")}: {get_text("none")}'
+    
+    def update_stats(self):
+        """更新总分、平均分、中位数和四分位数"""
+        # 总分和平均分（由DataManager增量维护，统计缓存有效时加载完成前即可显示）
+        stats = self.data_manager.stats()
+        self.total_score_label.text = f'{get_text("total_score")}: {stats["total"]}'
+        self.avg_score_label.text = f'{get_text("avg_score")}: {stats["average"]:.2f}'
         
-        # 计算总分和平均分
-        all_scores = self.data_manager.get_all_scores()
-        total = sum(data['score'] for data in all_scores.values())
-        count = len(all_scores)
-        avg = total / count if count > 0 else 0
-        
-        self.total_score_label.text = f'{get_text("total_score")}: {total}'
-        self.avg_score_label.text = f'{get_text("avg_score")}: {avg:.2f}'
+        # 中位数和四分位数（由分数直方图直接得到，无需排序）
+        if stats['count'] > 0:
+            q1, median, q3 = self.data_manager.quartiles()
+            self.median_score_label.text = f'{get_text("median_score")}: {median:g}'
+            self.quartiles_label.text = f'{get_text("quartiles")}: {q1:g} / {median:g} / {q3:g}'
+        else:
+            self.median_score_label.text = f'{get_text("median_score")}: {get_text("none")}'
+            self.quartiles_label.text = f'{get_text("quartiles")}: {get_text("none")}'
 
@@ -0,0 +1,57 @@
+# Storage package
+from .base import StorageBackend
+from .file_lock import FileLock
+from .columnar import ColumnarStore, ScoreRecord
+from .json_storage import JsonStorage
+from .json_stream import iter_json_records
+from .csv_io import iter_csv_records, write_csv
+from .journal_storage import JournalStorage
+from .sqlite_storage import SqliteStorage
+from .binary_storage import BinaryStorage, LazyBinaryStore
+from .sharded_storage import ShardedStorage, ShardedStore
+from .write_behind import WriteBehindQueue
+from .stats_sidecar import read_sidecar, sidecar_file, write_sidecar
+
+# 可在构造DataManager时按名称选择的存储后端
+BACKENDS = {
+    'json': JsonStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteStorage,
+    'binary': BinaryStorage,
+    'sharded': ShardedStorage,
+}
+
+
+def create_storage(name, data_file=None, **options):
+    """
+    按名称创建存储后端
+    :param name: 后端名称（json / journal / sqlite / binary / sharded）
+    :param data_file: 数据文件路径，为None时使用后端默认文件名
+    """
+    if name not in BACKENDS:
+        raise ValueError(f'未知的存储后端: {name}')
+    return BACKENDS[name](data_file, **options)
+
+
+__all__ = [
+    'StorageBackend',
+    'FileLock',
+    'ColumnarStore',
+    'ScoreRecord',
+    'JsonStorage',
+    'JournalStorage',
+    'SqliteStorage',
+    'BinaryStorage',
+    'LazyBinaryStore',
+    'ShardedStorage',
+    'ShardedStore',
+    'WriteBehindQueue',
+    'iter_json_records',
+    'iter_csv_records',
+    'read_sidecar',
+    'write_sidecar',
+    'sidecar_file',
+    'write_csv',
+    'BACKENDS',
+    'create_storage',
+]
@@ -0,0 +1,124 @@
+"""
+存储后端基类模块
+定义DataManager与具体存储格式之间的接口
+"""
+from contextlib import contextmanager
+from .file_lock import FileLock, file_stamp
+
+
+class StorageBackend:
+    """存储后端基类"""
+    
+    # 未指定数据文件时使用的默认文件名
+    default_file = 'scores.json'
+    # load_range是否由索引直接支持（无需读取全部数据）
+    indexed_range = False
+    
+    def __init__(self, data_file=None):
+        """
+        初始化存储后端
+        :param data_file: 数据文件路径，为None时使用default_file
+        """
+        self.data_file = data_file or self.default_file
+        # 加载时无法识别的记录另存到这里（与scores.json格式相同，修正后可用import_json导入）
+        self.rejected_file = self.data_file + '.invalid.json'
+        # 写入时持有的跨进程文件锁
+        self.lock = FileLock(self.data_file + '.lock')
+        # 本进程最后一次读取或写入后数据文件的指纹，None表示未知
+        self._fingerprint = None
+    
+    def watched_files(self):
+        """判断数据是否被其他进程修改时需要检查的文件"""
+        return [self.data_file]
+    
+    def file_fingerprint(self):
+        """
+        数据文件的指纹（各文件的大小和修改时间，只需stat而不读取内容），可跨进程、跨启动比较
+        :return: 元组，文件不存在的项为None
+        """
+        return tuple(file_stamp(path) for path in self.watched_files())
+    
+    def fingerprint(self):
+        """用于判断其他进程修改的指纹，默认为文件指纹"""
+        return self.file_fingerprint()
+    
+    def changed(self):
+        """数据文件在本进程最后一次读取或写入之后是否被其他进程修改过"""
+        return self._fingerprint is None or self.fingerprint() != self._fingerprint
+    
+    def mark_synced(self):
+        """记录当前指纹：本进程的内存数据与数据文件一致"""
+        self._fingerprint = self.fingerprint()
+    
+    @contextmanager
+    def locked_write(self):
+        """
+        持有文件锁进行写入
+        写入前文件未被其他进程修改时，写入成功后更新指纹；
+        否则保持指纹不一致，DataManager下次检查时会合并其他进程的修改
+        :return: 上下文中得到写入前文件是否未被其他进程修改
+        """
+        with self.lock:
+            synced = not self.changed()
+            yield synced
+            if synced:
+                self.mark_synced()
+    
+    def load(self, progress=None):
+        """
+        加载全部数据（数据文件中的YYYY-MM-DD在此转换为日期序号）
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)；不按块读取文件的后端忽略
+        :return: 字典，key为日期序号，value为包含score和desc的字典
+        """
+        raise NotImplementedError
+    
+    def save(self, data, changes):
+        """
+        持久化一组修改
+        文件被其他进程修改过时，以文件中的最新数据为基础只写入这组修改，避免覆盖其他进程的写入
+        :param data: 修改后的完整数据（整体重写的后端使用；needs_full_data为False时可能为None）
+        :param changes: 字典，key为被修改的日期序号，value为新记录，删除时为None
+        :return: 是否保存成功
+        """
+        with self.lock:
+            if not self.changed():
+                return self.save_all(data)
+            merged = self.load()
+            for date, record in changes.items():
+                if record is None:
+                    merged.pop(date, None)
+                else:
+                    merged[date] = record
+            result = self.save_all(merged)
+            # 内存数据还缺少其他进程的修改，保持指纹不一致以便DataManager合并
+            self._fingerprint = None
+            return result
+    
+    def needs_full_data(self, changes):
+        """
+        保存这组修改时是否会用到完整数据（延迟写入队列据此决定是否复制完整数据）
+        默认的save整体重写数据文件，总是需要
+        :param changes: 即将传给save的修改
+        """
+        return True
+    
+    def save_all(self, data):
+        """
+        整体保存全部数据
+        :param data: 完整数据
+        :return: 是否保存成功
+        """
+        raise NotImplementedError
+    
+    def load_range(self, start, end):
+        """
+        读取日期范围内的数据（包含两端）
+        :param start: 开始日期序号
+        :param end: 结束日期序号
+        :return: 字典，key为日期序号，value为包含score和desc的字典
+        """
+        return {ordinal: record for ordinal, record in self.load().items() if start <= ordinal <= end}
+    
+    def close(self):
+        """释放后端持有的资源"""
+        pass
@@ -0,0 +1,469 @@
+"""
+二进制快照存储后端模块
+定长列 + 描述字符串区的二进制格式，一次读取即可加载，也可内存映射后按需读取
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from indexes.score_stats import ScoreStats
+from .base import StorageBackend
+from .columnar import ColumnarStore, ScoreRecord, StringTable, split_compact
+from .json_storage import JsonStorage, quarantine_records, remove_file
+
+# 文件头：魔数、版本、标志位、记录数、字符串数、字符串区字节数、校验和（小端）
+MAGIC = b'SCOR'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIII')
+# 紧跟文件头的统计区：总分、最低分、最高分、0-100分直方图
+STATS = struct.Struct('<qii101I')
+
+
+def _to_bytes(values):
+    """数组转为小端字节"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, buffer, offset, count):
+    """
+    从缓冲区读取小端数组
+    :return: (数组, 读取后的偏移)
+    """
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(buffer[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+
+def encode_snapshot(data):
+    """
+    将数据编码为二进制快照
+    :param data: 字典、ColumnarStore或LazyBinaryStore
+    :return: 字节串
+    :raises ValueError: 数据无法以二进制格式保存（分数超出0-255）
+    """
+    if isinstance(data, LazyBinaryStore):
+        data = data.materialize()
+    if not isinstance(data, ColumnarStore):
+        data = ColumnarStore(data)
+    ordinals, scores, table, desc_ids = data.ordinals, data.scores, data.strings, data.desc_ids
+    
+    # 只写入仍被引用的字符串，重新编号使字符串区紧凑
+    remap = {}
+    strings = []
+    ids = array('I')
+    for string_id in desc_ids:
+        new_id = remap.get(string_id)
+        if new_id is None:
+            new_id = remap[string_id] = len(strings)
+            strings.append(table.strings[string_id])
+        ids.append(new_id)
+    
+    offsets = array('I', [0])
+    blob = bytearray()
+    for text in strings:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+    
+    stats = ScoreStats()
+    stats.rebuild(data)
+    body = b''.join((
+        STATS.pack(stats.total, stats.min or 0, stats.max or 0, *stats.histogram),
+        _to_bytes(ordinals),
+        _to_bytes(ids),
+        _to_bytes(offsets),
+        scores.tobytes(),
+        bytes(blob),
+    ))
+    header = HEADER.pack(MAGIC, VERSION, 0, len(ordinals), len(strings), len(blob), zlib.crc32(body))
+    return header + body
+
+
+def _read_header(buffer):
+    """
+    读取并检查文件头
+    :return: (记录数, 字符串数, 字符串区字节数, 校验和, 列数据起始偏移)
+    :raises ValueError: 文件不完整或格式不支持
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError('二进制快照不完整')
+    magic, version, _flags, count, string_count, blob_size, checksum = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('不支持的二进制快照格式')
+    offset = HEADER.size + STATS.size
+    expected = offset + count * 9 + (string_count + 1) * 4 + blob_size
+    if len(buffer) < expected:
+        raise ValueError('二进制快照不完整')
+    return count, string_count, blob_size, checksum, offset
+
+
+def decode_snapshot(buffer, verify=True):
+    """
+    解码二进制快照为ColumnarStore
+    :param buffer: 快照字节（bytes或mmap）
+    :param verify: 是否校验整个文件的校验和
+    :raises ValueError: 文件头、版本或校验和不正确
+    """
+    count, string_count, blob_size, checksum, offset = _read_header(buffer)
+    view = memoryview(buffer)
+    if verify and zlib.crc32(view[HEADER.size:]) != checksum:
+        raise ValueError('二进制快照校验失败')
+    
+    ordinals, offset = _from_bytes('i', view, offset, count)
+    ids, offset = _from_bytes('I', view, offset, count)
+    offsets, offset = _from_bytes('I', view, offset, string_count + 1)
+    scores, offset = _from_bytes('B', view, offset, count)
+    blob = bytes(view[offset:offset + blob_size])
+    
+    # 文件中的字符串编号映射到字符串表编号（空字符串固定为0号）
+    table = StringTable()
+    table_ids = []
+    for i in range(string_count):
+        text = blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+        string_id = table.ids.get(text)
+        if string_id is None:
+            string_id = len(table.strings)
+            table.strings.append(text)
+            table.refs.append(0)
+            table.ids[text] = string_id
+        table_ids.append(string_id)
+    desc_ids = array('I', [table_ids[file_id] for file_id in ids])
+    for string_id in desc_ids:
+        table.refs[string_id] += 1
+    
+    store = ColumnarStore()
+    store.ordinals = ordinals
+    store.scores = scores
+    store.desc_ids = desc_ids
+    store.strings = table
+    return store
+
+
+class MappedSnapshot:
+    """
+    内存映射的二进制快照
+    打开时只解析文件头和统计区，记录在被访问时才从映射中读取
+    """
+    
+    def __init__(self, path):
+        """
+        :param path: 快照文件路径
+        :raises ValueError: 文件格式不支持
+        """
+        self._file = open(path, 'rb')
+        try:
+            if os.name == 'nt':
+                # Windows上被映射的文件无法被新快照替换，改为一次读入内存
+                self.buffer = self._file.read()
+            else:
+                self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            count, string_count, blob_size, _checksum, offset = _read_header(self.buffer)
+        except (ValueError, OSError):
+            self.close()
+            raise
+        total, minimum, maximum, *histogram = STATS.unpack_from(self.buffer, HEADER.size)
+        self.stats = (total, count, minimum, maximum, histogram)
+        self.count = count
+        
+        view = memoryview(self.buffer)
+        self.ordinals = view[offset:offset + count * 4].cast('i')
+        offset += count * 4
+        self.desc_ids = view[offset:offset + count * 4].cast('I')
+        offset += count * 4
+        self.offsets = view[offset:offset + (string_count + 1) * 4].cast('I')
+        offset += (string_count + 1) * 4
+        self.scores = view[offset:offset + count]
+        offset += count
+        self.blob = view[offset:offset + blob_size]
+    
+    def find(self, ordinal):
+        """
+        二分查找日期序号
+        :return: 记录位置，不存在时为-1
+        """
+        i = bisect_left(self.ordinals, ordinal)
+        if i < self.count and self.ordinals[i] == ordinal:
+            return i
+        return -1
+    
+    def record(self, i):
+        """读取第i条记录"""
+        string_id = self.desc_ids[i]
+        desc = bytes(self.blob[self.offsets[string_id]:self.offsets[string_id + 1]]).decode('utf-8')
+        return ScoreRecord(self.scores[i], desc)
+    
+    def decode(self):
+        """一次性解码全部记录为ColumnarStore（不再校验校验和）"""
+        return decode_snapshot(self.buffer, verify=False)
+    
+    def close(self):
+        """关闭映射和文件"""
+        for name in ('ordinals', 'desc_ids', 'offsets', 'scores', 'blob'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        buffer = getattr(self, 'buffer', None)
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+        self._file.close()
+
+
+class LazyBinaryStore(MutableMapping):
+    """
+    按需加载的记录存储
+    未修改的记录直接从内存映射的快照读取，修改保存在覆盖层中；对外表现为以日期序号为key的字典
+    """
+    
+    def __init__(self, snapshot):
+        """
+        :param snapshot: MappedSnapshot
+        """
+        self.snapshot = snapshot
+        # 覆盖层：key为日期序号，value为新记录，删除时为None
+        self.overlay = {}
+        self._size = snapshot.count
+    
+    def summary(self):
+        """
+        快照文件头中的统计（仅在尚未修改时有效）
+        :return: (总分, 记录数, 最低分, 最高分, 直方图)，已有修改时为None
+        """
+        return None if self.overlay else self.snapshot.stats
+    
+    def _base_get(self, ordinal):
+        """从快照中读取记录，不存在时返回None"""
+        if not isinstance(ordinal, int):
+            return None
+        i = self.snapshot.find(ordinal)
+        return self.snapshot.record(i) if i >= 0 else None
+    
+    def __getitem__(self, ordinal):
+        if ordinal in self.overlay:
+            record = self.overlay[ordinal]
+        else:
+            record = self._base_get(ordinal)
+        if record is None:
+            raise KeyError(ordinal)
+        return record
+    
+    def __setitem__(self, ordinal, record):
+        if not isinstance(ordinal, int):
+            raise ValueError(f'无效的日期序号: {ordinal!r}')
+        if ordinal not in self:
+            self._size += 1
+        self.overlay[ordinal] = record
+    
+    def __delitem__(self, ordinal):
+        if ordinal not in self:
+            raise KeyError(ordinal)
+        self.overlay[ordinal] = None
+        self._size -= 1
+    
+    def __contains__(self, ordinal):
+        if ordinal in self.overlay:
+            return self.overlay[ordinal] is not None
+        return self._base_get(ordinal) is not None
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        overlay = self.overlay
+        for ordinal in self.snapshot.ordinals:
+            if ordinal not in overlay:
+                yield ordinal
+        for ordinal, record in overlay.items():
+            if record is not None:
+                yield ordinal
+    
+    def items(self):
+        """遍历(日期序号, 记录)"""
+        for ordinal in self:
+            yield ordinal, self[ordinal]
+    
+    def materialize(self):
+        """将快照与覆盖层合并为ColumnarStore"""
+        store = self.snapshot.decode()
+        for ordinal, record in self.overlay.items():
+            if record is None:
+                store.pop(ordinal, None)
+            else:
+                store[ordinal] = record
+        return store
+    
+    def columns(self):
+        """
+        日期序号列和分数列，供索引快速重建
+        直接读取映射中的两列并按日期合并覆盖层，不解码描述字符串
+        :return: (日期序号数组, 分数序列)，均按日期升序
+        """
+        snapshot = self.snapshot
+        overlay = self.overlay
+        if not overlay:
+            return snapshot.ordinals, snapshot.scores
+        added = sorted((ordinal, record['score']) for ordinal, record in overlay.items() if record is not None)
+        ordinals = array('i')
+        scores = []
+        j = 0
+        for ordinal, score in zip(snapshot.ordinals, snapshot.scores):
+            while j < len(added) and added[j][0] < ordinal:
+                ordinals.append(added[j][0])
+                scores.append(added[j][1])
+                j += 1
+            # 被修改或删除的记录以覆盖层为准
+            if ordinal not in overlay:
+                ordinals.append(ordinal)
+                scores.append(score)
+        for ordinal, score in added[j:]:
+            ordinals.append(ordinal)
+            scores.append(score)
+        return ordinals, scores
+    
+    def items_range(self, start, end):
+        """
+        日期序号范围内的记录（包含两端）
+        在映射的日期序号列上二分查找，只读取范围内的记录
+        :param start: 开始日期序号
+        :param end: 结束日期序号
+        :return: (日期序号, 记录)的列表，按日期升序
+        """
+        snapshot = self.snapshot
+        low = bisect_left(snapshot.ordinals, start)
+        high = bisect_right(snapshot.ordinals, end)
+        records = {snapshot.ordinals[i]: snapshot.record(i) for i in range(low, high)}
+        for ordinal, record in self.overlay.items():
+            if start <= ordinal <= end:
+                if record is None:
+                    records.pop(ordinal, None)
+                else:
+                    records[ordinal] = record
+        return sorted(records.items())
+    
+    def copy(self):
+        """复制存储（快照共享，只复制覆盖层）"""
+        store = LazyBinaryStore(self.snapshot)
+        store.overlay = dict(self.overlay)
+        store._size = self._size
+        return store
+
+
+class BinaryStorage(StorageBackend):
+    """二进制快照存储后端"""
+    
+    default_file = 'scores.bin'
+    
+    def __init__(self, data_file=None, legacy_file=None):
+        """
+        初始化二进制存储后端
+        :param data_file: 二进制快照文件路径
+        :param legacy_file: 旧的JSON数据文件，快照不存在时自动从它迁移；
+                            为None时使用快照所在目录下的scores.json（不使用当前工作目录中的文件）
+        """
+        super().__init__(data_file)
+        if legacy_file is None:
+            legacy_file = os.path.join(os.path.dirname(self.data_file), JsonStorage.default_file)
+        self.legacy_file = legacy_file
+        self._snapshots = []
+    
+    def load_columnar(self, progress=None):
+        """
+        一次读取加载为ColumnarStore
+        首次运行时如果只有旧的JSON文件，迁移为二进制快照（JSON文件保留作为备份）
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        """
+        with self.lock:
+            data = self._read_columnar(progress)
+            self.mark_synced()
+        return data
+    
+    def _read_columnar(self, progress=None):
+        """读取快照文件（调用时已持有文件锁）"""
+        if not os.path.exists(self.data_file):
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                # 无法识别的日期和超出范围的分数另存，不能让整个快照无法写入
+                legacy = JsonStorage(self.legacy_file)
+                legacy.rejected_file = self.rejected_file
+                store, rejected = split_compact(legacy.load())
+                if rejected:
+                    quarantine_records(self.rejected_file, rejected)
+                self.save_all(store)
+                return store
+            return ColumnarStore()
+        try:
+            with open(self.data_file, 'rb') as f:
+                content = f.read()
+            if progress:
+                progress(len(content), len(content))
+            return decode_snapshot(content)
+        except IOError:
+            return ColumnarStore()
+        except ValueError:
+            # 快照损坏：保留原文件以便恢复，避免下次保存时被覆盖
+            try:
+                os.replace(self.data_file, self.data_file + '.corrupt')
+            except OSError:
+                pass
+            return ColumnarStore()
+    
+    def load_lazy(self):
+        """
+        按需加载：只读取文件头和统计区，记录在访问时从内存映射中读取
+        快照不存在、格式不支持或在大端平台上时退回一次性加载
+        """
+        if sys.byteorder == 'little' and os.path.exists(self.data_file):
+            try:
+                with self.lock:
+                    snapshot = MappedSnapshot(self.data_file)
+                    self.mark_synced()
+            except (ValueError, OSError):
+                pass
+            else:
+                self._snapshots.append(snapshot)
+                return LazyBinaryStore(snapshot)
+        return self.load_columnar()
+    
+    def load(self, progress=None):
+        """加载全部数据"""
+        return {ordinal: record.to_dict() for ordinal, record in self.load_columnar(progress).items()}
+    
+    def save_all(self, data):
+        """
+        原子地写入二进制快照
+        无法以二进制格式保存的记录（分数不是0-255的整数）另存到rejected_file，其余记录照常写入，
+        不能因为一条记录让之后的所有写入都失败
+        """
+        try:
+            snapshot = encode_snapshot(data)
+        except ValueError:
+            data, rejected = split_compact(data)
+            if not quarantine_records(self.rejected_file, rejected):
+                return False
+            snapshot = encode_snapshot(data)
+        tmp_file = self.data_file + '.tmp'
+        with self.lock:
+            try:
+                with open(tmp_file, 'wb') as f:
+                    f.write(snapshot)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.data_file)
+            except (IOError, OSError):
+                remove_file(tmp_file)
+                return False
+            self.mark_synced()
+            return True
+    
+    def close(self):
+        """关闭按需加载时打开的内存映射"""
+        for snapshot in self._snapshots:
+            snapshot.close()
+        self._snapshots = []
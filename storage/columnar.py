@@ -0,0 +1,239 @@
+"""
+列式内存存储模块
+用紧凑数组代替每天一个小字典，长历史记录也只占用很少的内存
+"""
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+
+
+class ScoreRecord:
+    """单条记录的只读视图，兼容页面中record['score']、record.get('desc')的用法"""
+    
+    __slots__ = ('score', 'desc')
+    
+    def __init__(self, score, desc=''):
+        self.score = score
+        self.desc = desc
+    
+    def __getitem__(self, key):
+        if key == 'score':
+            return self.score
+        if key == 'desc':
+            return self.desc
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        """与dict.get相同"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        """字段名，使dict(record)可用"""
+        return ('score', 'desc')
+    
+    def __contains__(self, key):
+        return key in ('score', 'desc')
+    
+    def to_dict(self):
+        """转换为普通字典"""
+        return {'score': self.score, 'desc': self.desc}
+    
+    def __eq__(self, other):
+        if isinstance(other, ScoreRecord):
+            return self.score == other.score and self.desc == other.desc
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+    
+    def __repr__(self):
+        return f'ScoreRecord(score={self.score!r}, desc={self.desc!r})'
+
+
+class StringTable:
+    """去重字符串表：相同的描述只保存一份，按引用计数回收"""
+    
+    def __init__(self):
+        # 0号始终为空字符串
+        self.strings = ['']
+        self.ids = {'': 0}
+        self.refs = array('I', [0])
+        self.free = []
+    
+    def acquire(self, text):
+        """获取字符串的编号并增加引用计数"""
+        if not text:
+            return 0
+        string_id = self.ids.get(text)
+        if string_id is None:
+            if self.free:
+                string_id = self.free.pop()
+                self.strings[string_id] = text
+                self.refs[string_id] = 0
+            else:
+                string_id = len(self.strings)
+                self.strings.append(text)
+                self.refs.append(0)
+            self.ids[text] = string_id
+        self.refs[string_id] += 1
+        return string_id
+    
+    def release(self, string_id):
+        """减少引用计数，不再被引用的字符串回收其编号"""
+        if string_id == 0:
+            return
+        self.refs[string_id] -= 1
+        if self.refs[string_id] == 0:
+            del self.ids[self.strings[string_id]]
+            self.strings[string_id] = ''
+            self.free.append(string_id)
+    
+    def copy(self):
+        """复制字符串表"""
+        table = StringTable.__new__(StringTable)
+        table.strings = list(self.strings)
+        table.ids = dict(self.ids)
+        table.refs = array('I', self.refs)
+        table.free = list(self.free)
+        return table
+
+
+def _compact_record(record):
+    """记录能否以紧凑格式保存（分数为0-255的整数，描述为字符串）"""
+    try:
+        score = record['score']
+        desc = record.get('desc', '')
+    except (TypeError, KeyError, AttributeError):
+        return False
+    return isinstance(score, int) and 0 <= score <= 255 and isinstance(desc or '', str)
+
+
+def split_compact(data):
+    """
+    将旧数据转换为列式存储，分数不在0-255之间等无法以紧凑格式保存的记录单独返回
+    :param data: 字典，key为日期序号，value为记录
+    :return: (ColumnarStore, 被剔除的记录字典)
+    """
+    records = {}
+    rejected = {}
+    for ordinal, record in data.items():
+        if _compact_record(record):
+            records[ordinal] = record
+        else:
+            rejected[ordinal] = record
+    return ColumnarStore(records), rejected
+
+
+class ColumnarStore(MutableMapping):
+    """
+    列式记录存储
+    日期序号保存在有序的array('i')中，分数保存在array('B')中，
+    描述保存为字符串表中的编号；对外表现为以日期序号为key的字典
+    """
+    
+    def __init__(self, data=None):
+        """
+        初始化列式存储
+        :param data: 初始数据字典，key为日期序号，value为包含score和desc的记录
+        :raises ValueError: 日期序号不是整数或分数不在0-255之间
+        """
+        self.ordinals = array('i')
+        self.scores = array('B')
+        self.desc_ids = array('I')
+        self.strings = StringTable()
+        if data:
+            rows = sorted(
+                (ordinal, record['score'], record.get('desc', ''))
+                for ordinal, record in data.items()
+            )
+            for ordinal, score, desc in rows:
+                self.ordinals.append(self._check_ordinal(ordinal))
+                self.scores.append(self._check_score(score))
+                self.desc_ids.append(self.strings.acquire(desc))
+    
+    @staticmethod
+    def _check_score(score):
+        """分数必须是能放进一个字节的整数"""
+        if not isinstance(score, int) or not 0 <= score <= 255:
+            raise ValueError(f'无法以紧凑格式保存的分数: {score!r}')
+        return score
+    
+    @staticmethod
+    def _check_ordinal(ordinal):
+        """日期序号必须是整数"""
+        if not isinstance(ordinal, int):
+            raise ValueError(f'无效的日期序号: {ordinal!r}')
+        return ordinal
+    
+    def _find(self, ordinal):
+        """
+        查找日期序号所在的位置
+        :return: (位置, 是否存在)
+        """
+        ordinals = self.ordinals
+        if not isinstance(ordinal, int):
+            return len(ordinals), False
+        i = bisect_left(ordinals, ordinal)
+        return i, i < len(ordinals) and ordinals[i] == ordinal
+    
+    def __getitem__(self, ordinal):
+        i, found = self._find(ordinal)
+        if not found:
+            raise KeyError(ordinal)
+        return ScoreRecord(self.scores[i], self.strings.strings[self.desc_ids[i]])
+    
+    def __setitem__(self, ordinal, record):
+        self._check_ordinal(ordinal)
+        score = self._check_score(record['score'])
+        desc_id = self.strings.acquire(record.get('desc', ''))
+        i, found = self._find(ordinal)
+        if found:
+            self.strings.release(self.desc_ids[i])
+            self.scores[i] = score
+            self.desc_ids[i] = desc_id
+        else:
+            self.ordinals.insert(i, ordinal)
+            self.scores.insert(i, score)
+            self.desc_ids.insert(i, desc_id)
+    
+    def __delitem__(self, ordinal):
+        i, found = self._find(ordinal)
+        if not found:
+            raise KeyError(ordinal)
+        self.strings.release(self.desc_ids[i])
+        del self.ordinals[i]
+        del self.scores[i]
+        del self.desc_ids[i]
+    
+    def __contains__(self, ordinal):
+        return self._find(ordinal)[1]
+    
+    def __iter__(self):
+        return iter(self.ordinals)
+    
+    def __len__(self):
+        return len(self.ordinals)
+    
+    def items(self):
+        """按日期升序遍历(日期序号, 记录)"""
+        strings = self.strings.strings
+        for ordinal, score, desc_id in zip(self.ordinals, self.scores, self.desc_ids):
+            yield ordinal, ScoreRecord(score, strings[desc_id])
+    
+    def columns(self):
+        """
+        直接访问日期序号列和分数列（按日期升序），供索引快速重建
+        :return: (日期序号数组, 分数数组)
+        """
+        return self.ordinals, self.scores
+    
+    def copy(self):
+        """复制存储（数组整体复制，开销远小于逐条复制字典）"""
+        store = ColumnarStore()
+        store.ordinals = array('i', self.ordinals)
+        store.scores = array('B', self.scores)
+        store.desc_ids = array('I', self.desc_ids)
+        store.strings = self.strings.copy()
+        return store
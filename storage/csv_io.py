@@ -0,0 +1,69 @@
+"""
+CSV导入导出模块
+基于生成器逐行读写，内存占用与文件大小无关
+"""
+import csv
+from datetime import date as date_type
+from indexes.date_index import from_ordinal
+from indexes.score_stats import is_valid_score
+
+# CSV表头
+CSV_FIELDS = ('date', 'score', 'desc')
+
+
+def parse_csv_row(row):
+    """
+    解析并校验一行CSV
+    :param row: 字段列表（日期, 分数[, 描述]）
+    :return: (日期序号, 分数, 描述)
+    :raises ValueError: 日期格式无效或分数不在0-100之间
+    """
+    if len(row) < 2:
+        raise ValueError('缺少日期或分数')
+    # 转换为日期序号（同时校验日期是否存在）
+    ordinal = date_type.fromisoformat(row[0].strip()).toordinal()
+    try:
+        score = int(row[1].strip())
+    except ValueError:
+        raise ValueError(f'分数不是整数: {row[1]!r}')
+    if not is_valid_score(score):
+        raise ValueError(f'分数超出0-100范围: {score}')
+    desc = row[2].strip() if len(row) > 2 else ''
+    return ordinal, score, desc
+
+
+def iter_csv_records(path, on_error=None):
+    """
+    流式读取CSV文件（可带date,score,desc表头）
+    :param path: 文件路径
+    :param on_error: 无效行的回调，参数为(行号, 字段列表, 错误信息)；为None时忽略无效行
+    :return: 生成器，逐条产生(日期序号, 分数, 描述)
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for line_no, row in enumerate(csv.reader(f), 1):
+            if not row or not any(field.strip() for field in row):
+                continue
+            if line_no == 1 and row[0].strip().lower() == CSV_FIELDS[0]:
+                continue
+            try:
+                yield parse_csv_row(row)
+            except ValueError as e:
+                if on_error:
+                    on_error(line_no, row, str(e))
+
+
+def write_csv(path, records):
+    """
+    流式写出CSV文件
+    :param path: 文件路径
+    :param records: (日期序号, 记录)的可迭代对象，记录包含score和desc
+    :return: 写出的记录数
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for ordinal, record in records:
+            writer.writerow((from_ordinal(ordinal), record['score'], record.get('desc', '')))
+            count += 1
+    return count
@@ -0,0 +1,109 @@
+"""
+文件锁模块
+用建议性文件锁协调多个进程（命令行脚本、同步任务、桌面上的第二个实例）对数据文件的写入
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class FileLock:
+    """
+    跨进程的建议性文件锁（POSIX上使用flock，Windows上使用msvcrt.locking）
+    同一进程内可重入，也可以同时用作线程锁；平台都不支持时只作为线程锁
+    """
+    
+    def __init__(self, path):
+        """
+        :param path: 锁文件路径
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+    
+    def acquire(self):
+        """获取锁，其他进程持有时阻塞等待"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+    
+    def release(self):
+        """释放锁"""
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            self._unlock_file(self._file)
+            self._file = None
+        self._thread_lock.release()
+    
+    def _lock_file(self):
+        """
+        打开锁文件并加锁
+        :return: 已加锁的文件对象，无法创建锁文件时为None（退化为只在进程内加锁）
+        """
+        try:
+            f = open(self.path, 'a+b')
+        except OSError:
+            return None
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                f.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK约10秒后仍未获得锁会抛出OSError，继续等待
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            f.close()
+            raise
+        return f
+    
+    @staticmethod
+    def _unlock_file(f):
+        """解锁并关闭锁文件"""
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        finally:
+            f.close()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def file_stamp(path):
+    """
+    文件的大小和修改时间
+    :return: (大小, 修改时间纳秒)，文件不存在时为None
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,130 @@
+"""
+日志存储后端模块
+每次修改只向日志文件追加一条记录，定期在后台压缩为快照
+"""
+import json
+import os
+import threading
+from indexes.date_index import from_ordinal
+from .json_storage import (JsonStorage, atomic_write_json, encode_records, journal_files, replay_log,
+                           remove_file)
+
+
+class JournalStorage(JsonStorage):
+    """追加日志 + 快照的存储后端"""
+    
+    def __init__(self, data_file=None, compact_threshold=200):
+        """
+        初始化日志存储后端
+        :param data_file: 快照文件路径
+        :param compact_threshold: 日志条数超过该值时在后台压缩为快照
+        """
+        super().__init__(data_file)
+        self.compact_threshold = compact_threshold
+        self.pending_log_file, self.log_file = journal_files(self.data_file)
+        self._log_count = 0
+        self._compact_thread = None
+    
+    def replay_journal(self, data):
+        """回放日志：先回放压缩中断遗留的旧日志，再回放当前日志"""
+        replay_log(self.pending_log_file, data)
+        self._log_count = replay_log(self.log_file, data)
+    
+    def save(self, data, changes):
+        """
+        将每条修改以紧凑格式追加到日志文件
+        data为None时（延迟写入且needs_full_data为False）只追加，不压缩
+        """
+        lines = []
+        for ordinal, record in changes.items():
+            if record is None:
+                entry = [from_ordinal(ordinal), None]
+            else:
+                entry = [from_ordinal(ordinal), record['score'], record.get('desc', '')]
+            lines.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        try:
+            # 追加写入不会覆盖其他进程的修改，只需在文件锁内进行
+            with self.locked_write():
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._log_count += len(lines)
+        except IOError:
+            return False
+        
+        if self._log_count >= self.compact_threshold and data is not None:
+            self.compact(data)
+        return True
+    
+    def needs_full_data(self, changes):
+        """只有这次追加后日志达到压缩阈值、需要写入快照时才需要完整数据"""
+        return self._log_count + len(changes) >= self.compact_threshold
+    
+    def save_all(self, data):
+        """整体保存：同步压缩为快照"""
+        self.compact(data, wait=True, overwrite=True)
+        return not os.path.exists(self.pending_log_file)
+    
+    def compact(self, data, wait=False, overwrite=False):
+        """
+        将日志压缩进快照
+        当前日志先被轮转为旧日志，快照在后台线程写入，完成后删除旧日志
+        :param data: 当前完整数据
+        :param wait: 是否等待压缩完成
+        :param overwrite: 是否以data整体覆盖快照；否则文件被其他进程修改过时，以文件中的快照和旧日志重新生成
+        :return: 是否启动了压缩
+        """
+        if self._compact_thread and self._compact_thread.is_alive():
+            if not wait:
+                return False
+            self._compact_thread.join()
+        
+        with self.lock:
+            synced = not self.changed()
+            if os.path.exists(self.log_file):
+                if os.path.exists(self.pending_log_file):
+                    # 上次压缩未完成，先把新日志接到旧日志后面
+                    with open(self.log_file, 'r', encoding='utf-8') as src, \
+                            open(self.pending_log_file, 'a', encoding='utf-8') as dst:
+                        dst.write(src.read())
+                    os.remove(self.log_file)
+                else:
+                    os.replace(self.log_file, self.pending_log_file)
+            self._log_count = 0
+            snapshot = None
+            if synced or overwrite:
+                snapshot = {from_ordinal(ordinal): dict(record) for ordinal, record in data.items()}
+            if synced:
+                self.mark_synced()
+        
+        self._compact_thread = threading.Thread(
+            target=self._write_snapshot, args=(snapshot, overwrite), daemon=True
+        )
+        self._compact_thread.start()
+        if wait:
+            self._compact_thread.join()
+        return True
+    
+    def _write_snapshot(self, snapshot, overwrite=False):
+        """
+        在后台线程中写入快照，写入成功后删除已合并的旧日志
+        整个过程持有文件锁，避免其他进程在此期间追加到旧日志的内容被删除
+        """
+        with self.lock:
+            synced = not self.changed()
+            if not overwrite and (snapshot is None or not synced):
+                # 其他进程修改过文件：快照和旧日志中已包含本进程的全部修改，以文件内容为准
+                records = self.load_records()
+                replay_log(self.pending_log_file, records)
+                snapshot = encode_records(records)
+            if atomic_write_json(self.data_file, snapshot, separators=(',', ':')):
+                remove_file(self.pending_log_file)
+            # 写入失败时保留旧日志，下次启动时回放
+            if synced:
+                self.mark_synced()
+    
+    def close(self):
+        """等待正在进行的压缩完成"""
+        if self._compact_thread and self._compact_thread.is_alive():
+            self._compact_thread.join()
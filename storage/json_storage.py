@@ -0,0 +1,276 @@
+"""
+JSON文件存储后端模块
+每次保存整体重写scores.json
+"""
+import json
+import os
+from collections.abc import Mapping
+from datetime import date as date_type
+from indexes.date_index import from_ordinal
+from .base import StorageBackend
+from .columnar import ColumnarStore
+from .json_stream import iter_json_records
+
+
+# 读取数据文件时每块的字节数（每读完一块报告一次进度）
+READ_CHUNK_SIZE = 65536
+
+
+def journal_files(data_file):
+    """
+    获取数据文件对应的日志文件路径
+    :return: (旧日志, 当前日志)，旧日志为压缩过程中被轮转出来、尚未合并进快照的日志
+    """
+    return data_file + '.log.1', data_file + '.log'
+
+
+def date_ordinal(value):
+    """
+    将数据文件中的日期字符串转换为日期序号（内存中记录的key）
+    兼容手工编辑产生的不补零写法（如2024-1-2）和首尾空白
+    :return: 日期序号，无法识别时为None
+    """
+    if not isinstance(value, str):
+        return None
+    parts = value.strip().split('-')
+    if len(parts) != 3:
+        return None
+    try:
+        return date_type(*(int(part) for part in parts)).toordinal()
+    except ValueError:
+        return None
+
+
+def encode_records(data):
+    """
+    将以日期序号为key的记录转换为数据文件中以YYYY-MM-DD为key的字典（记录本身不复制）
+    :param data: 字典或记录存储，key为日期序号；无法识别的记录另存时key可能已是字符串
+    """
+    return {
+        date if isinstance(date, str) else from_ordinal(date): record
+        for date, record in data.items()
+    }
+
+
+def quarantine_records(path, rejected):
+    """
+    将无法识别的记录合并写入另存文件（文件中已有的记录保留）
+    :param path: 另存文件路径（与scores.json格式相同，修正后可用import_json导入）
+    :param rejected: 字典，key为日期字符串或日期序号
+    :return: 是否写入成功
+    """
+    merged = JsonStorage(path).load_snapshot()
+    if not isinstance(merged, dict):
+        merged = {}
+    merged.update(encode_records(rejected))
+    return atomic_write_json(path, merged, indent=2)
+
+
+def _valid_record(record):
+    """记录能否读入内存（分数为整数，描述为字符串或空；超出0-100的历史分数保留）"""
+    if not isinstance(record, dict) or 'score' not in record:
+        return False
+    score = record['score']
+    desc = record.get('desc')
+    return isinstance(score, int) and not isinstance(score, bool) and (desc is None or isinstance(desc, str))
+
+
+def decode_records(raw, rejected_file=None):
+    """
+    将数据文件中以YYYY-MM-DD为key的字典转换为以日期序号为key
+    日期无法识别、规范后与其他日期重复（规范写法的优先），或记录不含分数、分数不是整数的另存到rejected_file
+    :param raw: 从数据文件读取的字典
+    :param rejected_file: 另存无法识别的记录的文件，为None时丢弃
+    :return: 字典，key为日期序号
+    """
+    records = {}
+    rejected = {}
+    # 不补零等写法的日期：日期序号 -> 文件中的写法
+    aliases = {}
+    for key, record in raw.items():
+        ordinal = date_ordinal(key)
+        if ordinal is None or not _valid_record(record):
+            rejected[key] = record
+            continue
+        canonical = from_ordinal(ordinal) == key
+        if ordinal in records:
+            if not canonical or ordinal not in aliases:
+                rejected[key] = record
+                continue
+            rejected[aliases.pop(ordinal)] = records[ordinal]
+        elif not canonical:
+            aliases[ordinal] = key
+        records[ordinal] = record
+    if rejected and rejected_file:
+        quarantine_records(rejected_file, rejected)
+    return records
+
+
+def replay_log(path, data):
+    """
+    将日志文件中的修改依次应用到data
+    :param data: 以日期序号为key的记录
+    :return: 成功回放的条数
+    """
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    ordinal, score = date_ordinal(entry[0]), entry[1]
+                except (ValueError, IndexError, TypeError, KeyError):
+                    # 写入中断产生的残缺行，跳过
+                    continue
+                if ordinal is None:
+                    continue
+                if score is None:
+                    data.pop(ordinal, None)
+                else:
+                    record = {'score': score, 'desc': entry[2] if len(entry) > 2 else ''}
+                    if not _valid_record(record):
+                        # 手工编辑产生的无效行，跳过
+                        continue
+                    data[ordinal] = record
+                count += 1
+    except IOError:
+        pass
+    return count
+
+
+def encode_record(obj):
+    """json.dump的default钩子：序列化列式存储及其记录视图"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f'无法序列化的对象: {type(obj).__name__}')
+
+
+def atomic_write_json(path, data, **dump_options):
+    """
+    原子地写入JSON文件：先写临时文件并fsync，再重命名覆盖目标文件
+    :return: 是否写入成功
+    """
+    tmp_file = path + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=encode_record, **dump_options)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+        return True
+    except (IOError, OSError):
+        remove_file(tmp_file)
+        return False
+
+
+def remove_file(path):
+    """删除文件（不存在时忽略）"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class JsonStorage(StorageBackend):
+    """JSON文件存储后端"""
+    
+    def watched_files(self):
+        """数据文件及之前以日志模式运行时可能遗留的日志"""
+        return [self.data_file, *journal_files(self.data_file)]
+    
+    def load_snapshot(self, progress=None):
+        """
+        读取数据文件本身（不含日志，key为文件中的日期字符串）
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)，按块读取时逐块报告
+        """
+        if os.path.exists(self.data_file):
+            try:
+                with open(self.data_file, 'rb') as f:
+                    total = os.fstat(f.fileno()).st_size
+                    chunks = []
+                    done = 0
+                    while True:
+                        chunk = f.read(READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, total)
+                return json.loads(b''.join(chunks).decode('utf-8'))
+            except (ValueError, IOError):
+                return {}
+        return {}
+    
+    def load_records(self, progress=None):
+        """
+        读取数据文件本身并转换为以日期序号为key（无法识别的记录另存到rejected_file）
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        """
+        snapshot = self.load_snapshot(progress)
+        return decode_records(snapshot if isinstance(snapshot, dict) else {}, self.rejected_file)
+    
+    def replay_journal(self, data):
+        """之前以日志模式运行时遗留的日志，合并进数据文件后清除"""
+        log_paths = journal_files(self.data_file)
+        replayed = sum(replay_log(path, data) for path in log_paths)
+        if replayed and self.save_all(data):
+            for path in log_paths:
+                remove_file(path)
+    
+    def load(self, progress=None):
+        """
+        加载数据文件
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        """
+        with self.lock:
+            data = self.load_records(progress)
+            self.replay_journal(data)
+            self.mark_synced()
+        return data
+    
+    def load_columnar(self, progress=None):
+        """
+        流式加载为ColumnarStore，不构建完整的JSON对象树
+        :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+        :raises ValueError: 文件格式无效，或数据无法以紧凑格式保存
+        """
+        store = ColumnarStore()
+        rejected = {}
+        aliases = {}
+        with self.lock:
+            if os.path.exists(self.data_file):
+                # 与decode_records相同：无法识别或重复的日期另存，规范写法的优先
+                records = iter_json_records(self.data_file, progress=progress, on_invalid=rejected.__setitem__)
+                for date, score, desc in records:
+                    ordinal = date_ordinal(date)
+                    record = {'score': score, 'desc': desc}
+                    if ordinal is None or not _valid_record(record):
+                        rejected[date] = record
+                        continue
+                    canonical = from_ordinal(ordinal) == date
+                    if ordinal in store:
+                        if not canonical or ordinal not in aliases:
+                            rejected[date] = record
+                            continue
+                        rejected[aliases.pop(ordinal)] = store[ordinal].to_dict()
+                    elif not canonical:
+                        aliases[ordinal] = date
+                    store[ordinal] = record
+            if rejected:
+                quarantine_records(self.rejected_file, rejected)
+            self.replay_journal(store)
+            self.mark_synced()
+        return store
+    
+    def save_all(self, data):
+        """保存数据到文件"""
+        with self.lock:
+            result = atomic_write_json(self.data_file, encode_records(data), indent=2)
+            if result:
+                self.mark_synced()
+            return result
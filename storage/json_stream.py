@@ -0,0 +1,110 @@
+"""
+流式JSON读取模块
+逐条解析scores.json格式的文件，内存占用与文件大小无关
+"""
+import codecs
+import json
+import os
+import re
+
+# JSON允许的空白字符
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _StreamBuffer:
+    """按块读取文件并维护当前解析位置的缓冲区"""
+    
+    def __init__(self, f, chunk_size, total, progress):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.total = total
+        self.progress = progress
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.text = ''
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+    
+    def fill(self):
+        """
+        读取下一块，丢弃已解析的部分
+        :return: 是否读到了新数据
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+            self.text += self.decoder.decode(b'', final=True)
+            return False
+        self.bytes_read += len(chunk)
+        self.text += self.decoder.decode(chunk)
+        if self.progress:
+            self.progress(self.bytes_read, self.total)
+        return True
+    
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+    
+    def expect(self, char):
+        """读取指定字符"""
+        if self.peek() != char:
+            raise ValueError(f'JSON格式错误：位置{self.bytes_read}附近应为{char!r}')
+        self.pos += 1
+    
+    def value(self, decoder):
+        """解码一个完整的JSON值，缓冲区不够时继续读取"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise ValueError('JSON文件不完整')
+                continue
+            # 值恰好结束在缓冲区末尾时可能被截断（如数字），读取更多后重新解码
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_records(path, chunk_size=65536, progress=None, on_invalid=None):
+    """
+    流式读取scores.json格式的文件
+    :param path: 文件路径
+    :param chunk_size: 每次读取的字节数
+    :param progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+    :param on_invalid: 不含分数的记录的回调，参数为(日期, 原记录)；为None时忽略这些记录
+    :return: 生成器，逐条产生(日期, 分数, 描述)
+    :raises ValueError: 文件不是以日期为key的JSON对象
+    """
+    decoder = json.JSONDecoder()
+    total = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        buffer = _StreamBuffer(f, chunk_size, total, progress)
+        buffer.expect('{')
+        if buffer.peek() == '}':
+            return
+        while True:
+            date = buffer.value(decoder)
+            if not isinstance(date, str):
+                raise ValueError('JSON格式错误：日期必须是字符串')
+            buffer.expect(':')
+            record = buffer.value(decoder)
+            if isinstance(record, dict) and 'score' in record:
+                yield date, record['score'], record.get('desc', '') or ''
+            elif on_invalid:
+                on_invalid(date, record)
+            separator = buffer.peek()
+            if separator == '}':
+                return
+            buffer.expect(',')
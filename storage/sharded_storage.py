@@ -0,0 +1,378 @@
+"""
+按年分片的存储后端模块
+每年的记录保存在数据目录下单独的JSON文件中（如scores/2024.json），
+修改某一天只重写该年的分片；manifest.json保存各分片的统计，无需读取分片即可得到总体统计
+"""
+import json
+import os
+from collections.abc import MutableMapping
+from datetime import date as date_type
+from indexes.score_stats import ScoreStats
+from .base import StorageBackend
+from .file_lock import file_stamp
+from .json_storage import JsonStorage, atomic_write_json, decode_records, encode_records, remove_file
+
+# 分片统计清单的文件名与格式版本
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def shard_key(ordinal):
+    """
+    获取日期所属的分片名
+    :param ordinal: 日期序号
+    :return: 四位年份字符串（字符串顺序即年份顺序）
+    """
+    return f'{date_type.fromordinal(ordinal).year:04d}'
+
+
+def group_by_shard(items, keys=None):
+    """
+    一次遍历将记录按分片分组
+    :param items: (日期序号, 记录)的可迭代对象
+    :param keys: 只保留这些分片，为None时保留全部
+    :return: 字典，key为分片名，value为该分片的记录字典
+    """
+    shards = {key: {} for key in keys} if keys is not None else {}
+    for ordinal, record in items:
+        key = shard_key(ordinal)
+        records = shards.get(key)
+        if records is None:
+            if keys is not None:
+                continue
+            records = shards[key] = {}
+        records[ordinal] = record
+    return shards
+
+
+def shard_summary(records):
+    """
+    计算一个分片的统计
+    :param records: 分片中的记录字典
+    :return: 可写入manifest的字典
+    """
+    stats = ScoreStats()
+    stats.rebuild(records)
+    return {
+        'count': stats.count,
+        'total': stats.total,
+        'min': stats.min,
+        'max': stats.max,
+        'histogram': stats.histogram,
+    }
+
+
+class ShardedStore(MutableMapping):
+    """
+    按需加载分片的记录存储
+    分片在其中的日期首次被访问时才读取；对外表现为以日期序号为key的字典
+    """
+    
+    def __init__(self, storage, manifest):
+        """
+        :param storage: ShardedStorage
+        :param manifest: 字典，key为分片名，value为该分片的统计
+        """
+        self.storage = storage
+        self.manifest = manifest
+        # 已读取的分片：key为分片名，value为该分片的记录字典（key为日期序号）
+        self.shards = {}
+        self._size = sum(entry['count'] for entry in manifest.values())
+    
+    def shard(self, key):
+        """
+        获取分片的记录字典（首次访问时读取分片文件）
+        :param key: 分片名
+        """
+        records = self.shards.get(key)
+        if records is None:
+            records = self.storage.load_shard(key) if key in self.manifest else {}
+            self.shards[key] = records
+        return records
+    
+    def shard_keys(self):
+        """所有非空分片名（升序）"""
+        keys = set(self.manifest)
+        keys.update(key for key, records in self.shards.items() if records)
+        return sorted(keys)
+    
+    def summary(self):
+        """
+        合并各分片的统计：未读取的分片使用manifest中的统计，已读取的分片重新计算
+        :return: (总分, 记录数, 最低分, 最高分, 直方图)
+        """
+        stats = ScoreStats()
+        for key in self.shard_keys():
+            if key in self.shards:
+                entry = shard_summary(self.shards[key])
+            else:
+                entry = self.manifest[key]
+            if not entry['count']:
+                continue
+            stats.total += entry['total']
+            stats.count += entry['count']
+            stats.min = entry['min'] if stats.min is None else min(stats.min, entry['min'])
+            stats.max = entry['max'] if stats.max is None else max(stats.max, entry['max'])
+            for i, n in enumerate(entry['histogram']):
+                stats.histogram[i] += n
+        return stats.total, stats.count, stats.min, stats.max, stats.histogram
+    
+    def __getitem__(self, ordinal):
+        if not isinstance(ordinal, int):
+            raise KeyError(ordinal)
+        return self.shard(shard_key(ordinal))[ordinal]
+    
+    def __setitem__(self, ordinal, record):
+        if not isinstance(ordinal, int):
+            raise ValueError(f'无效的日期序号: {ordinal!r}')
+        records = self.shard(shard_key(ordinal))
+        if ordinal not in records:
+            self._size += 1
+        records[ordinal] = record
+    
+    def __delitem__(self, ordinal):
+        if not isinstance(ordinal, int):
+            raise KeyError(ordinal)
+        del self.shard(shard_key(ordinal))[ordinal]
+        self._size -= 1
+    
+    def __contains__(self, ordinal):
+        return isinstance(ordinal, int) and ordinal in self.shard(shard_key(ordinal))
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        for key in self.shard_keys():
+            yield from sorted(self.shard(key))
+    
+    def items(self):
+        """按日期升序遍历(日期序号, 记录)"""
+        for key in self.shard_keys():
+            records = self.shard(key)
+            for ordinal in sorted(records):
+                yield ordinal, records[ordinal]
+    
+    def copy(self):
+        """复制存储（只复制已读取的分片，未读取的分片仍从文件读取）"""
+        store = ShardedStore(self.storage, self.manifest)
+        store.shards = {key: dict(records) for key, records in dict(self.shards).items()}
+        store._size = self._size
+        return store
+
+
+class ShardedStorage(StorageBackend):
+    """按年分片的JSON存储后端"""
+    
+    # 数据目录
+    default_file = 'scores'
+    
+    def __init__(self, data_file=None, legacy_file=None):
+        """
+        初始化分片存储后端
+        :param data_file: 数据目录路径
+        :param legacy_file: 旧的JSON数据文件，数据目录不存在时自动从它迁移；
+                            为None时使用数据目录的上级目录中的scores.json（不使用当前工作目录中的文件）
+        """
+        super().__init__(data_file)
+        if legacy_file is None:
+            parent = os.path.dirname(os.path.normpath(self.data_file))
+            legacy_file = os.path.join(parent, JsonStorage.default_file)
+        self.legacy_file = legacy_file
+        self.manifest_file = os.path.join(self.data_file, MANIFEST_FILE)
+        # 当前已写入的各分片统计
+        self.manifest = {}
+    
+    def shard_file(self, key):
+        """分片文件路径"""
+        return os.path.join(self.data_file, f'{key}.json')
+    
+    def load_shard(self, key):
+        """
+        读取一个分片（无法识别的日期另存到rejected_file）
+        :param key: 分片名
+        :return: 该分片的记录字典，key为日期序号，文件不存在或损坏时为空字典
+        """
+        snapshot = JsonStorage(self.shard_file(key)).load_snapshot()
+        return decode_records(snapshot if isinstance(snapshot, dict) else {}, self.rejected_file)
+    
+    def _scan_shards(self):
+        """列出数据目录中已有的分片名"""
+        try:
+            names = os.listdir(self.data_file)
+        except OSError:
+            return []
+        return sorted(
+            name[:-len('.json')] for name in names
+            if name.endswith('.json') and name != MANIFEST_FILE
+        )
+    
+    def _shard_stamp(self, key):
+        """
+        分片文件的大小和修改时间，用于判断manifest中的统计是否仍然有效
+        :return: (大小, 修改时间纳秒)，文件不存在时为None
+        """
+        return file_stamp(self.shard_file(key))
+    
+    def watched_files(self):
+        """每次写入都会更新分片统计清单，只需检查它"""
+        return [self.manifest_file]
+    
+    def _load_manifest(self):
+        """
+        读取分片统计清单
+        清单缺失或版本不符时读取全部分片重新生成；
+        分片文件在清单写入后被改动（如写入中断、手工编辑）时只重新统计该分片
+        """
+        manifest = {}
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    content = json.load(f)
+                if content.get('version') == MANIFEST_VERSION:
+                    manifest = dict(content['shards'])
+            except (ValueError, KeyError, AttributeError, TypeError, IOError):
+                manifest = {}
+        stale = False
+        keys = self._scan_shards()
+        for key in set(manifest) - set(keys):
+            del manifest[key]
+            stale = True
+        for key in keys:
+            entry = manifest.get(key)
+            stamp = self._shard_stamp(key)
+            if entry is not None and stamp is not None and [entry.get('size'), entry.get('mtime')] == list(stamp):
+                continue
+            stale = True
+            records = self.load_shard(key)
+            if records:
+                manifest[key] = self._stamped_summary(key, records)
+            else:
+                manifest.pop(key, None)
+        if stale:
+            self._write_manifest(manifest)
+        self.manifest = manifest
+        return manifest
+    
+    def _stamped_summary(self, key, records):
+        """计算分片统计并附上分片文件当前的大小和修改时间"""
+        entry = shard_summary(records)
+        stamp = self._shard_stamp(key)
+        if stamp is not None:
+            entry['size'], entry['mtime'] = stamp
+        return entry
+    
+    def _write_manifest(self, manifest):
+        """原子地写入分片统计清单"""
+        return atomic_write_json(self.manifest_file, {'version': MANIFEST_VERSION, 'shards': manifest})
+    
+    def _migrate(self):
+        """
+        首次运行时如果只有旧的JSON文件，将其按年拆分为分片（JSON文件保留作为备份）
+        """
+        if os.path.isdir(self.data_file):
+            return
+        try:
+            os.makedirs(self.data_file, exist_ok=True)
+        except OSError:
+            return
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            legacy = JsonStorage(self.legacy_file)
+            # 迁移时无法识别的记录与分片中的放在一起
+            legacy.rejected_file = self.rejected_file
+            self.save_all(legacy.load())
+    
+    def load_lazy(self):
+        """
+        按需加载：只读取分片统计清单，分片在首次访问时读取
+        """
+        with self.lock:
+            self._migrate()
+            manifest = dict(self._load_manifest())
+            self.mark_synced()
+        return ShardedStore(self, manifest)
+    
+    def load(self, progress=None):
+        """加载全部分片（分片各自很小，不报告进度）"""
+        data = {}
+        with self.lock:
+            self._migrate()
+            for key in self._load_manifest():
+                data.update(self.load_shard(key))
+            self.mark_synced()
+        return data
+    
+    def _write_shard(self, key, records):
+        """
+        写入一个分片并更新其统计，分片为空时删除分片文件
+        :return: 是否写入成功
+        """
+        if not records:
+            remove_file(self.shard_file(key))
+            self.manifest.pop(key, None)
+            return True
+        if not atomic_write_json(self.shard_file(key), encode_records(records), indent=2):
+            return False
+        self.manifest[key] = self._stamped_summary(key, records)
+        return True
+    
+    def save(self, data, changes):
+        """
+        只重写被修改日期所在年份的分片
+        分片被其他进程修改过时，以文件中的分片为基础只写入这组修改
+        """
+        ok = True
+        with self.lock:
+            synced = not self.changed()
+            if not synced:
+                self._load_manifest()
+            changed = group_by_shard(changes.items())
+            if synced and not hasattr(data, 'shard'):
+                # 普通字典只遍历一次，按年份取出被修改的分片
+                shards = group_by_shard(data.items(), changed)
+            for key in sorted(changed):
+                if not synced:
+                    records = self.load_shard(key)
+                    for ordinal, record in changed[key].items():
+                        if record is None:
+                            records.pop(ordinal, None)
+                        else:
+                            records[ordinal] = record
+                elif hasattr(data, 'shard'):
+                    records = data.shard(key)
+                else:
+                    records = shards[key]
+                ok = self._write_shard(key, records) and ok
+            ok = self._write_manifest(self.manifest) and ok
+            if synced:
+                self.mark_synced()
+            else:
+                # 内存数据还缺少其他进程的修改，保持指纹不一致以便DataManager合并
+                self._fingerprint = None
+        return ok
+    
+    def save_all(self, data):
+        """重写全部分片，并删除已没有记录的分片"""
+        shards = group_by_shard(data.items())
+        try:
+            os.makedirs(self.data_file, exist_ok=True)
+        except OSError:
+            return False
+        ok = True
+        with self.lock:
+            for key in set(self._scan_shards()) | set(shards):
+                ok = self._write_shard(key, shards.get(key, {})) and ok
+            ok = self._write_manifest(self.manifest) and ok
+            self.mark_synced()
+        return ok
+    
+    def load_range(self, start, end):
+        """只读取日期范围所涉及年份的分片"""
+        result = {}
+        for key in self._scan_shards():
+            if shard_key(start) <= key <= shard_key(end):
+                result.update(
+                    (ordinal, record) for ordinal, record in self.load_shard(key).items()
+                    if start <= ordinal <= end
+                )
+        return result
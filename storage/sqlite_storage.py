@@ -0,0 +1,121 @@
+"""
+SQLite存储后端模块
+以日期为主键逐行写入，单条修改和日期范围读取与历史长度无关
+"""
+import threading
+from indexes.date_index import from_ordinal
+from .base import StorageBackend
+from .file_lock import file_stamp
+from .json_storage import decode_records
+
+# 预编译语句（sqlite3模块按SQL文本缓存prepared statement，因此这里保持为常量）
+CREATE_TABLE_SQL = (
+    'CREATE TABLE IF NOT EXISTS scores ('
+    'date TEXT PRIMARY KEY, '
+    'score INTEGER NOT NULL, '
+    "description TEXT NOT NULL DEFAULT ''"
+    ') WITHOUT ROWID'
+)
+SELECT_ALL_SQL = 'SELECT date, score, description FROM scores'
+SELECT_RANGE_SQL = 'SELECT date, score, description FROM scores WHERE date BETWEEN ? AND ?'
+UPSERT_SQL = 'INSERT OR REPLACE INTO scores (date, score, description) VALUES (?, ?, ?)'
+DELETE_SQL = 'DELETE FROM scores WHERE date = ?'
+DELETE_ALL_SQL = 'DELETE FROM scores'
+DATA_VERSION_SQL = 'PRAGMA data_version'
+
+
+class SqliteStorage(StorageBackend):
+    """SQLite存储后端"""
+    
+    default_file = 'scores.db'
+    indexed_range = True
+    
+    def __init__(self, data_file=None):
+        """
+        初始化SQLite存储后端
+        :param data_file: 数据库文件路径
+        """
+        super().__init__(data_file)
+        # 打包时未包含sqlite3时，只有选择该后端才会报错
+        import sqlite3
+        self._error = sqlite3.Error
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.data_file, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(CREATE_TABLE_SQL)
+        self.conn.commit()
+    
+    def file_fingerprint(self):
+        """数据库文件及其-wal文件的大小和修改时间（连接打开时创建的空-wal文件视为不存在）"""
+        wal = file_stamp(self.data_file + '-wal')
+        return file_stamp(self.data_file), wal if wal and wal[0] else None
+    
+    def fingerprint(self):
+        """
+        数据库的数据版本号（其他连接提交修改后会变化，本连接的提交不会）
+        比检查文件修改时间更可靠：WAL模式下提交可能只写入-wal文件
+        """
+        with self._lock:
+            return self.conn.execute(DATA_VERSION_SQL).fetchone()[0]
+    
+    def load(self, progress=None):
+        """加载全部数据（由SQLite读取，不报告进度）"""
+        with self._lock:
+            rows = self.conn.execute(SELECT_ALL_SQL).fetchall()
+            self.mark_synced()
+        return self._decode(rows)
+    
+    def load_range(self, start, end):
+        """通过主键索引读取日期范围内的数据（表中的日期为YYYY-MM-DD，字符串顺序即日期顺序）"""
+        with self._lock:
+            rows = self.conn.execute(SELECT_RANGE_SQL, (from_ordinal(start), from_ordinal(end))).fetchall()
+        return self._decode(rows)
+    
+    def _decode(self, rows):
+        """查询结果转换为以日期序号为key的字典（无法识别的日期另存到rejected_file）"""
+        return decode_records(
+            {date: {'score': score, 'desc': desc} for date, score, desc in rows}, self.rejected_file
+        )
+    
+    def save(self, data, changes):
+        """在一个事务中逐行写入修改"""
+        upserts = []
+        deletes = []
+        for ordinal, record in changes.items():
+            if record is None:
+                deletes.append((from_ordinal(ordinal),))
+            else:
+                upserts.append((from_ordinal(ordinal), record['score'], record.get('desc', '')))
+        try:
+            with self._lock, self.conn:
+                if upserts:
+                    self.conn.executemany(UPSERT_SQL, upserts)
+                if deletes:
+                    self.conn.executemany(DELETE_SQL, deletes)
+            return True
+        except self._error:
+            return False
+    
+    def needs_full_data(self, changes):
+        """逐行写入修改，不需要完整数据"""
+        return False
+    
+    def save_all(self, data):
+        """整体替换表中的数据"""
+        rows = [
+            (from_ordinal(ordinal), record['score'], record.get('desc', ''))
+            for ordinal, record in data.items()
+        ]
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(DELETE_ALL_SQL)
+                self.conn.executemany(UPSERT_SQL, rows)
+            return True
+        except self._error:
+            return False
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
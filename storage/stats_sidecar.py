@@ -0,0 +1,65 @@
+"""
+统计缓存文件模块
+在数据文件旁保存总分、记录数、直方图和月度统计，启动时无需读取全部记录即可显示统计；
+缓存记录写入时数据文件的指纹（大小和修改时间）以及自身内容的校验和，任一不符即视为失效
+"""
+import json
+import zlib
+from .json_storage import atomic_write_json
+
+# 缓存文件格式版本
+SIDECAR_VERSION = 1
+
+
+def sidecar_file(data_file):
+    """数据文件对应的统计缓存文件路径"""
+    return data_file + '.stats'
+
+
+def _normalize(fingerprint):
+    """将指纹转换为与JSON往返后相同的形式（元组转为列表）"""
+    return [list(stamp) if stamp is not None else None for stamp in fingerprint]
+
+
+def _checksum(payload):
+    """统计内容的CRC32校验和（按key排序序列化，与写入顺序无关）"""
+    text = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def read_sidecar(path, fingerprint):
+    """
+    读取统计缓存
+    :param path: 缓存文件路径
+    :param fingerprint: 数据文件当前的指纹
+    :return: 统计内容字典，缓存不存在、已损坏或与数据文件不符时为None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        if content.get('version') != SIDECAR_VERSION:
+            return None
+        if content.get('fingerprint') != _normalize(fingerprint):
+            return None
+        payload = content['payload']
+        if content.get('checksum') != _checksum(payload):
+            return None
+        return payload
+    except (ValueError, KeyError, AttributeError, TypeError, IOError):
+        return None
+
+
+def write_sidecar(path, fingerprint, payload):
+    """
+    原子地写入统计缓存
+    :param path: 缓存文件路径
+    :param fingerprint: 数据文件当前的指纹
+    :param payload: 统计内容字典（可序列化为JSON）
+    :return: 是否写入成功
+    """
+    return atomic_write_json(path, {
+        'version': SIDECAR_VERSION,
+        'fingerprint': _normalize(fingerprint),
+        'checksum': _checksum(payload),
+        'payload': payload,
+    })
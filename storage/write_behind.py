@@ -0,0 +1,139 @@
+"""
+延迟写入模块
+在后台线程中合并一段时间内的多次修改，一次性写入存储后端
+"""
+import threading
+
+
+class WriteBehindQueue:
+    """延迟写入队列：标记脏数据，防抖后在工作线程中合并写入"""
+    
+    def __init__(self, storage, snapshot, delay=0.5, on_complete=None):
+        """
+        初始化延迟写入队列
+        :param storage: 存储后端
+        :param snapshot: 返回当前完整数据快照的函数（调用时已持有锁；
+                         只在存储后端的needs_full_data为True时调用，逐条写入的后端不复制完整数据）
+        :param delay: 防抖时间（秒），最后一次修改后等待该时间再写入
+        :param on_complete: 每次写入完成后的回调，参数为是否成功（在工作线程中调用）
+        """
+        self.storage = storage
+        self.snapshot = snapshot
+        self.delay = delay
+        self.on_complete = on_complete
+        self.lock = threading.RLock()
+        self._cond = threading.Condition(self.lock)
+        self._pending = {}
+        # 正在写入（已取出但尚未写完）的修改
+        self._writing = {}
+        self._flush_requested = False
+        self._flush_callbacks = []
+        self._generation = 0
+        self._written_generation = 0
+        self._last_result = True
+        self._failed = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    @property
+    def dirty(self):
+        """是否有尚未写入的修改"""
+        with self.lock:
+            return bool(self._pending)
+    
+    def unsaved_dates(self):
+        """尚未写入存储后端的日期（包括等待写入和正在写入的修改）"""
+        with self.lock:
+            return set(self._pending) | set(self._writing)
+    
+    def mark_dirty(self, date, record):
+        """
+        记录一条待写入的修改（同一日期的多次修改只保留最后一次）
+        :param date: 日期序号
+        :param record: 新记录，删除时为None
+        """
+        with self.lock:
+            self._pending[date] = record
+            self._generation += 1
+            self._failed = False
+            self._cond.notify_all()
+    
+    def flush(self, callback=None):
+        """
+        立即写入所有待写入的修改
+        :param callback: 为None时阻塞直到写入完成并返回是否成功；
+                         否则立即返回，写入完成后以是否成功为参数调用callback
+        """
+        with self.lock:
+            if not self._pending and self._written_generation == self._generation:
+                result = self._last_result
+                if callback is None:
+                    return result
+                callback(result)
+                return None
+            if self._pending and self._written_generation == self._generation:
+                # 上次写入失败遗留的修改，强制重试
+                self._generation += 1
+            target = self._generation
+            if callback is not None:
+                self._flush_callbacks.append(callback)
+            self._flush_requested = True
+            self._cond.notify_all()
+            if callback is not None:
+                return None
+            while self._written_generation < target and not self._closed:
+                self._cond.wait()
+            return self._last_result
+    
+    def close(self):
+        """写入剩余修改并停止工作线程"""
+        self.flush()
+        with self.lock:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+    
+    def _run(self):
+        """工作线程：等待修改，防抖后合并写入"""
+        while True:
+            with self.lock:
+                # 写入失败后不自动重试，等到有新修改或被要求立即写入时再写
+                while (not self._pending or self._failed) and not self._closed \
+                        and not self._flush_requested:
+                    self._cond.wait()
+                if self._closed and (not self._pending or self._failed):
+                    return
+                # 防抖：直到delay时间内不再有新修改，或被要求立即写入
+                while not self._flush_requested and not self._closed:
+                    generation = self._generation
+                    self._cond.wait(self.delay)
+                    if generation == self._generation:
+                        break
+                changes = self._pending
+                self._pending = {}
+                self._writing = changes
+                target = self._generation
+                self._flush_requested = False
+                callbacks = self._flush_callbacks
+                self._flush_callbacks = []
+                data = self.snapshot() if self.storage.needs_full_data(changes) else None
+            
+            # 在锁外写入，不阻塞主线程继续修改数据
+            result = self.storage.save(data, changes)
+            
+            with self.lock:
+                self._writing = {}
+                if not result:
+                    # 写入失败：放回队列，较新的修改优先
+                    for date, record in changes.items():
+                        self._pending.setdefault(date, record)
+                self._failed = not result
+                self._last_result = result
+                self._written_generation = target
+                self._cond.notify_all()
+            
+            for callback in callbacks:
+                callback(result)
+            if self.on_complete:
+                self.on_complete(result)
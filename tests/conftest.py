@@ -0,0 +1,38 @@
+"""
+测试公共设置：将项目根目录加入导入路径，并提供在另一个进程中运行代码的工具
+"""
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from indexes.date_index import from_ordinal  # noqa: E402（需先将项目根目录加入导入路径）
+
+# 各存储后端使用的数据文件名
+BACKENDS = {
+    'json': 'scores.json',
+    'journal': 'scores.json',
+    'sqlite': 'scores.db',
+    'binary': 'scores.bin',
+    'sharded': 'scores',
+}
+
+
+def scores(dm):
+    """全部记录的分数，key为YYYY-MM-DD"""
+    return {from_ordinal(ordinal): record['score'] for ordinal, record in dm.get_all_scores().items()}
+
+
+@pytest.fixture
+def other_process():
+    """
+    在另一个Python进程中执行代码（模拟同时打开数据文件的另一个应用实例或脚本）
+    :return: 函数，参数为(代码, *命令行参数)，进程失败时抛出CalledProcessError
+    """
+    def run(code, *args):
+        subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT, check=True, timeout=60)
+    return run
@@ -0,0 +1,88 @@
+"""
+批量事务测试：事务中途失败时回滚内存数据、全部索引和统计，且不写入数据文件
+"""
+import pytest
+from data_manager import DataManager
+from indexes.date_index import from_ordinal
+
+
+def snapshot(dm):
+    """收集回滚后需要恢复的全部可观察状态"""
+    return {
+        'records': dict(dm.get_all_scores()),
+        'stats': dm.stats(),
+        'distribution': dm.distribution(),
+        'months': dm.monthly_totals(),
+        'january': dm.month_summary('2024-01'),
+        'range_sum': dm.range_sum('2024-01-01', '2024-01-31'),
+        'count': dm.count('2024-01-01', '2024-12-31'),
+        'text': [ordinal for ordinal, _ in dm.query(text='day')],
+        'by_score': [ordinal for ordinal, _ in dm.query(sort='score')],
+        'score_range': [ordinal for ordinal, _ in dm.query(min_score=20, max_score=40)],
+    }
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_rollback_restores_indexes_and_stats(tmp_path, bulk):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path)
+    dm.save_many({f'2024-01-{day:02d}': {'score': day * 10, 'desc': f'day {day}'} for day in range(1, 6)})
+    before = snapshot(dm)
+    events = []
+    dm.subscribe(events.append)
+    
+    with pytest.raises(RuntimeError):
+        with dm.batch(bulk=bulk):
+            dm.save_score('2024-02-10', 100, 'new day')
+            dm.update_score('2024-01-01', 99, 'changed')
+            dm.delete_score('2024-01-02')
+            raise RuntimeError('中途失败')
+    
+    assert snapshot(dm) == before
+    assert events == []
+    dm.close()
+    # 回滚的修改未写入数据文件
+    fresh = DataManager(path, stats_cache=False)
+    assert snapshot(fresh) == before
+    fresh.close()
+
+
+def test_commit_applies_all_changes(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path)
+    dm.save_score('2024-01-01', 10, 'day one')
+    with dm.batch():
+        dm.save_score('2024-01-02', 20, 'day two')
+        dm.delete_score('2024-01-01')
+    assert [from_ordinal(ordinal) for ordinal, _ in dm.query(text='day')] == ['2024-01-02']
+    assert dm.stats()['total'] == 20
+    dm.close()
+
+
+def test_rollback_when_commit_rebuild_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path)
+    dm.save_many({f'2024-01-{day:02d}': {'score': day * 10, 'desc': f'day {day}'} for day in range(1, 6)})
+    before = snapshot(dm)
+    
+    # 大批量事务中不逐条更新索引，提交时第一次重建索引失败
+    rebuild = dm._rebuild_indexes
+    calls = []
+    
+    def failing_rebuild(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise MemoryError('重建失败')
+        rebuild(*args)
+    
+    monkeypatch.setattr(dm, '_rebuild_indexes', failing_rebuild)
+    with pytest.raises(MemoryError):
+        dm.save_many([('2024-02-01', 50), ('2024-02-02', 60)], bulk=True)
+    monkeypatch.undo()
+    
+    assert snapshot(dm) == before
+    assert dm._batch is None and not dm._bulk
+    dm.close()
+    fresh = DataManager(path, stats_cache=False)
+    assert snapshot(fresh) == before
+    fresh.close()
@@ -0,0 +1,30 @@
+"""
+二进制快照测试：无法以二进制格式保存的记录在写入时另存，其余记录照常写入
+"""
+import json
+from storage.binary_storage import BinaryStorage
+from storage.json_storage import date_ordinal
+
+
+def test_save_quarantines_unencodable_records(tmp_path):
+    storage = BinaryStorage(str(tmp_path / 'scores.bin'))
+    bad, good = date_ordinal('2024-01-01'), date_ordinal('2024-01-02')
+    assert storage.save_all({bad: {'score': 300, 'desc': ''}, good: {'score': 30, 'desc': 'ok'}})
+    # 之后的写入不受影响
+    later = date_ordinal('2024-01-03')
+    assert storage.save({good: {'score': 30, 'desc': 'ok'}, later: {'score': 40, 'desc': ''}},
+                        {later: {'score': 40, 'desc': ''}})
+    storage.close()
+    
+    fresh = BinaryStorage(str(tmp_path / 'scores.bin'))
+    assert fresh.load() == {good: {'score': 30, 'desc': 'ok'}, later: {'score': 40, 'desc': ''}}
+    with open(fresh.rejected_file, 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'2024-01-01': {'score': 300, 'desc': ''}}
+    fresh.close()
+
+
+def test_round_trip(tmp_path):
+    storage = BinaryStorage(str(tmp_path / 'scores.bin'))
+    data = {date_ordinal(f'2024-02-{day:02d}'): {'score': day, 'desc': '同一描述' if day % 2 else ''} for day in range(1, 29)}
+    assert storage.save_all(data)
+    assert BinaryStorage(str(tmp_path / 'scores.bin')).load() == data
@@ -0,0 +1,100 @@
+"""
+变更事件测试：同一帧内的变更合并为一批，事件按类型分组并带有总分和记录数的增量
+"""
+from change_events import BULK_CHANGED, RECORD_ADDED, RECORD_DELETED, RECORD_UPDATED, ChangeEventBus
+from data_manager import DataManager
+from indexes.date_index import to_ordinal
+
+
+class FrameDispatch:
+    """模拟Clock.schedule_once：投递的函数在调用run_frame时才执行"""
+    
+    def __init__(self):
+        self.queued = []
+    
+    def __call__(self, func):
+        self.queued.append(func)
+    
+    def run_frame(self):
+        queued, self.queued = self.queued, []
+        for func in queued:
+            func()
+
+
+def summary(events):
+    return [(event.type, event.dates, event.total_delta, event.count_delta) for event in events]
+
+
+def test_coalesces_changes_within_a_frame(tmp_path):
+    dispatch = FrameDispatch()
+    dm = DataManager(str(tmp_path / 'scores.json'), dispatch=dispatch)
+    dm.save_score('2024-01-01', 10)
+    dm.save_score('2024-01-02', 20)
+    dispatch.run_frame()
+    events = []
+    dm.subscribe(events.append)
+    
+    dm.save_score('2024-01-03', 30)
+    dm.update_score('2024-01-03', 35)
+    dm.update_score('2024-01-01', 15)
+    dm.delete_score('2024-01-02')
+    # 同一帧内新增后又删除、修改后又改回：不发出事件
+    dm.save_score('2024-01-04', 40)
+    dm.delete_score('2024-01-04')
+    dm.update_score('2024-01-01', 99)
+    dm.update_score('2024-01-01', 15)
+    assert len(dispatch.queued) == 1
+    dispatch.run_frame()
+    
+    day = to_ordinal
+    assert summary(events) == [
+        (RECORD_ADDED, [day('2024-01-03')], 35, 1),
+        (RECORD_UPDATED, [day('2024-01-01')], 5, 0),
+        (RECORD_DELETED, [day('2024-01-02')], -20, -1),
+    ]
+    assert day('2024-01-03') in events[0] and day('2024-01-01') not in events[0]
+    assert events[2].records == {day('2024-01-02'): None}
+    assert sum(event.total_delta for event in events) == dm.stats()['total'] - 30
+    dm.close()
+
+
+def test_subscribe_by_type_and_unsubscribe():
+    bus = ChangeEventBus()
+    added, everything = [], []
+    bus.subscribe(added.append, RECORD_ADDED)
+    bus.subscribe(everything.append)
+    bus.emit({1: (None, {'score': 5})})
+    bus.emit({1: ({'score': 5}, None)})
+    assert [event.type for event in added] == [RECORD_ADDED]
+    assert [event.type for event in everything] == [RECORD_ADDED, RECORD_DELETED]
+    bus.unsubscribe(everything.append)
+    bus.emit({2: (None, {'score': 1})})
+    assert len(everything) == 2 and len(added) == 2
+
+
+def test_bulk_change_reports_totals(tmp_path):
+    dispatch = FrameDispatch()
+    dm = DataManager(str(tmp_path / 'scores.json'), dispatch=dispatch)
+    dm.save_score('2024-01-01', 10)
+    dispatch.run_frame()
+    events = []
+    dm.subscribe(events.append)
+    
+    dm.save_many([('2024-02-01', 20), ('2024-02-02', 30), ('2024-01-01', 5)], bulk=True)
+    dm.save_score('2024-03-01', 1)
+    dispatch.run_frame()
+    assert summary(events) == [(BULK_CHANGED, None, 46, 3)]
+    assert 12345 in events[0]
+    dm.close()
+
+
+def test_batch_emits_once_after_commit(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    events = []
+    dm.subscribe(events.append)
+    with dm.batch():
+        dm.save_score('2024-01-01', 10)
+        dm.save_score('2024-01-02', 20)
+        assert events == []
+    assert summary(events) == [(RECORD_ADDED, [to_ordinal('2024-01-01'), to_ordinal('2024-01-02')], 30, 2)]
+    dm.close()
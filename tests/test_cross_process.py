@@ -0,0 +1,51 @@
+"""
+跨进程合并测试：另一个进程写入数据文件后，本进程的写入和重新加载不能丢失对方的修改
+"""
+import pytest
+from conftest import BACKENDS, scores
+from data_manager import DataManager
+
+# 另一个进程：新增一天并删除一天
+WRITER = '''
+import sys
+from data_manager import DataManager
+path, backend, added, removed = sys.argv[1:]
+dm = DataManager(path, backend=backend, stats_cache=False)
+dm.save_score(added, 20, 'other')
+dm.delete_score(removed)
+dm.close()
+'''
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_merges_other_process_writes(tmp_path, other_process, backend):
+    path = str(tmp_path / BACKENDS[backend])
+    dm = DataManager(path, backend=backend, stats_cache=False)
+    dm.save_score('2024-01-01', 10, 'mine')
+    dm.save_score('2024-01-02', 5, 'removed by other')
+    
+    other_process(WRITER, path, backend, '2025-03-01', '2024-01-02')
+    # 本进程在察觉之前写入：以文件中的数据为基础合并，不能覆盖对方的修改
+    dm.save_score('2024-01-03', 30, 'mine')
+    assert dm.reload_if_changed()
+    
+    expected = {'2024-01-01': 10, '2024-01-03': 30, '2025-03-01': 20}
+    assert scores(dm) == expected
+    assert dm.stats()['total'] == 60
+    assert dm.stats()['count'] == 3
+    assert dm.month_summary('2025-03')['total'] == 20
+    assert dm.month_summary('2024-01')['count'] == 2
+    dm.close()
+    
+    fresh = DataManager(path, backend=backend, stats_cache=False)
+    assert scores(fresh) == expected
+    fresh.close()
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_reload_without_other_writes_is_noop(tmp_path, backend):
+    path = str(tmp_path / BACKENDS[backend])
+    dm = DataManager(path, backend=backend, stats_cache=False)
+    dm.save_score('2024-01-01', 10)
+    assert not dm.reload_if_changed()
+    dm.close()
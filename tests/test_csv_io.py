@@ -0,0 +1,81 @@
+"""
+CSV导入导出测试：重复日期的各种处理方式、无效行的报告，以及导出后再导入结果不变
+"""
+import pytest
+from conftest import scores
+from data_manager import DataManager
+
+
+def write_csv(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_score('2024-01-01', 50, 'old')
+    dm.save_score('2024-01-02', 50, 'old')
+    yield dm
+    dm.close()
+
+
+@pytest.mark.parametrize('policy, expected, imported, skipped', [
+    ('overwrite', {'2024-01-01': 30, '2024-01-02': 70, '2024-01-03': 10}, 3, 0),
+    ('skip', {'2024-01-01': 50, '2024-01-02': 50, '2024-01-03': 10}, 1, 2),
+    ('max', {'2024-01-01': 50, '2024-01-02': 70, '2024-01-03': 10}, 2, 1),
+])
+def test_duplicate_policies(tmp_path, dm, policy, expected, imported, skipped):
+    path = str(tmp_path / 'import.csv')
+    write_csv(path, 'date,score,desc\n2024-01-01,30,a\n2024-01-02,70,b\n2024-01-03,10,c\n')
+    result = dm.import_csv(path, on_duplicate=policy)
+    assert result == {'imported': imported, 'skipped': skipped, 'invalid': 0}
+    assert scores(dm) == expected
+    assert dm.stats()['total'] == sum(expected.values())
+
+
+def test_duplicate_error_rolls_back(tmp_path, dm):
+    path = str(tmp_path / 'import.csv')
+    write_csv(path, '2024-01-03,10,c\n2024-01-01,30,a\n')
+    with pytest.raises(ValueError):
+        dm.import_csv(path, on_duplicate='error')
+    assert scores(dm) == {'2024-01-01': 50, '2024-01-02': 50}
+    assert dm.stats()['total'] == 100
+
+
+def test_unknown_policy(tmp_path, dm):
+    with pytest.raises(ValueError):
+        dm.import_csv(str(tmp_path / 'missing.csv'), on_duplicate='merge')
+
+
+def test_reports_invalid_rows(tmp_path, dm):
+    path = str(tmp_path / 'import.csv')
+    write_csv(path, (
+        '\ufeffdate,score,desc\n'
+        '2024-02-01,80,ok\n'
+        '2024-02-30,80,no such day\n'
+        '2024-02-02,abc\n'
+        '2024-02-03,101\n'
+        '2024-02-04\n'
+        '\n'
+        '2024-02-05, 5 , spaced \n'
+    ))
+    errors = []
+    result = dm.import_csv(path, on_error=lambda line_no, row, message: errors.append(line_no))
+    assert result == {'imported': 2, 'skipped': 0, 'invalid': 4}
+    assert errors == [3, 4, 5, 6]
+    assert dm.get_score('2024-02-05') == {'score': 5, 'desc': 'spaced'}
+
+
+def test_export_then_import_round_trip(tmp_path, dm):
+    dm.save_score('2023-12-31', 7, 'comma, "quote"\nnewline')
+    path = str(tmp_path / 'export.csv')
+    assert dm.export_csv(path) == 3
+    with open(path, 'r', encoding='utf-8') as f:
+        assert f.readline().strip() == 'date,score,desc'
+        assert f.readline().startswith('2023-12-31,')
+    
+    other = DataManager(str(tmp_path / 'other.json'))
+    assert other.import_csv(path)['imported'] == 3
+    assert other.get_all_scores() == dm.get_all_scores()
+    other.close()
@@ -0,0 +1,102 @@
+"""
+日期索引测试：树状数组的前缀和，以及日期范围的总分、记录数和平均分与逐条计算一致
+"""
+import random
+import pytest
+from data_manager import DataManager
+from indexes.date_index import DateIndex, FenwickTree, to_ordinal
+
+
+def test_fenwick_prefix_sums():
+    rng = random.Random(6)
+    values = [rng.randint(-5, 20) for _ in range(100)]
+    tree = FenwickTree.from_values(values)
+    for i in range(len(values) + 5):
+        assert tree.prefix(i) == sum(values[:i])
+    for _ in range(200):
+        i, delta = rng.randrange(len(values)), rng.randint(-10, 10)
+        values[i] += delta
+        tree.add(i, delta)
+    assert [tree.prefix(i) for i in range(len(values) + 1)] == [sum(values[:i]) for i in range(len(values) + 1)]
+
+
+def test_fenwick_append_and_pop():
+    rng = random.Random(16)
+    values = []
+    tree = FenwickTree(0)
+    for _ in range(300):
+        if values and rng.random() < 0.3:
+            values.pop()
+            tree.pop()
+        else:
+            values.append(rng.randint(0, 100))
+            tree.append(values[-1])
+        assert tree.prefix(len(values)) == sum(values)
+    assert [tree.prefix(i) for i in range(len(values) + 1)] == [sum(values[:i]) for i in range(len(values) + 1)]
+
+
+def test_size_follows_record_count_not_date_span():
+    index = DateIndex()
+    # 日期跨度两千多年（如CSV中把年份写错），树的大小仍只与记录数有关
+    index.add(to_ordinal('2024-01-01'), {'score': 10})
+    index.add(to_ordinal('0001-01-01'), {'score': 20})
+    index.add(to_ordinal('9999-12-31'), {'score': 30})
+    assert index._sum.size == 3
+    assert index.range_sum('0001-01-01', '2024-01-01') == 30
+    assert index.range_count('0001-01-02', '9999-12-31') == 2
+    index.remove(to_ordinal('9999-12-31'), {'score': 30})
+    index.remove(to_ordinal('0001-01-01'), {'score': 20})
+    assert index._sum.size == 1
+    assert index.range_avg('0001-01-01', '9999-12-31') == 10
+
+
+def brute_force(records, start, end):
+    scores = [record['score'] for ordinal, record in records.items() if start <= ordinal <= end]
+    return sum(scores), len(scores)
+
+
+def test_range_queries_after_growth_and_removal():
+    rng = random.Random(60)
+    index = DateIndex()
+    records = {}
+    base = to_ordinal('2024-01-01')
+    # 在两端和中间插入、修改和删除日期
+    for _ in range(500):
+        ordinal = base + rng.randint(-3000, 3000)
+        record = {'score': rng.randint(0, 100)}
+        if ordinal in records:
+            index.remove(ordinal, records[ordinal])
+        records[ordinal] = record
+        index.add(ordinal, record)
+    for ordinal in rng.sample(sorted(records), 100):
+        index.remove(ordinal, records.pop(ordinal))
+    
+    for _ in range(200):
+        start = base + rng.randint(-3500, 3500)
+        end = start + rng.randint(-10, 2000)
+        total, count = brute_force(records, start, end)
+        assert index.range_sum(start, end) == total
+        assert index.range_count(start, end) == count
+        assert index.range_avg(start, end) == (total / count if count else 0)
+    assert index.ordinals == sorted(records)
+
+
+def test_empty_index():
+    index = DateIndex()
+    assert index.range_sum('2024-01-01', '2024-12-31') == 0
+    assert index.range_avg('2024-01-01', '2024-12-31') == 0
+
+
+def test_data_manager_range_queries(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_many([('2024-01-30', 10), ('2024-01-31', 20), ('2024-02-01', 30), ('2024-02-29', 40)])
+    assert dm.range_sum('2024-01-31', '2024-02-29') == 90
+    assert dm.range_count('2024-02-01', '2024-02-29') == 2
+    assert dm.range_avg('2024-01-01', '2024-01-31') == 15
+    assert dm.count('2024-02-01', None) == 2
+    assert sorted(dm.get_scores_in_range('2024-01-31', '2024-02-01')) == [
+        to_ordinal('2024-01-31'), to_ordinal('2024-02-01')
+    ]
+    with pytest.raises(ValueError):
+        dm.range_sum('2024-02-30', '2024-03-01')
+    dm.close()
@@ -0,0 +1,61 @@
+"""
+日志存储恢复测试：压缩中断后遗留的旧日志需在下次启动时回放，并在下次压缩成功后删除
+"""
+import json
+import os
+from conftest import scores
+from data_manager import DataManager
+from storage import journal_storage
+from storage.json_storage import JsonStorage
+
+
+def test_replays_pending_log_after_failed_compaction(tmp_path, monkeypatch):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path, backend='journal', compact_threshold=3, stats_cache=False)
+    # 快照写入失败：日志已被轮转为旧日志，快照仍是旧的
+    monkeypatch.setattr(journal_storage, 'atomic_write_json', lambda *args, **kwargs: False)
+    for day in range(1, 8):
+        dm.save_score(f'2024-01-{day:02d}', day * 10)
+    dm.close()
+    monkeypatch.undo()
+    assert os.path.exists(path + '.log.1')
+    
+    expected = {f'2024-01-{day:02d}': day * 10 for day in range(1, 8)}
+    fresh = DataManager(path, backend='journal', compact_threshold=3, stats_cache=False)
+    assert scores(fresh) == expected
+    assert fresh.stats()['total'] == 280
+    
+    # 下次压缩成功后旧日志被删除，快照包含全部记录
+    fresh.storage.compact(fresh.data, wait=True)
+    fresh.close()
+    assert not os.path.exists(path + '.log.1')
+    assert not os.path.exists(path + '.log')
+    assert {date: record['score'] for date, record in JsonStorage(path).load_snapshot().items()} == expected
+
+
+def test_replays_pending_log_before_current_log(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    # 进程在压缩过程中退出：旧日志之后又追加了新日志，同一天以新日志为准
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'2024-01-01': {'score': 1, 'desc': ''}}, f)
+    with open(path + '.log.1', 'w', encoding='utf-8') as f:
+        f.write('["2024-01-01",2,"old"]\n["2024-01-02",5,""]\n')
+    with open(path + '.log', 'w', encoding='utf-8') as f:
+        f.write('["2024-01-01",3,"new"]\n["2024-01-02",null]\n')
+    
+    dm = DataManager(path, backend='journal', stats_cache=False)
+    assert scores(dm) == {'2024-01-01': 3}
+    assert dm.get_score('2024-01-01')['desc'] == 'new'
+    assert dm.stats()['total'] == 3
+    dm.close()
+
+
+def test_ignores_truncated_last_log_line(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    # 追加时断电：最后一行不完整
+    with open(path + '.log', 'w', encoding='utf-8') as f:
+        f.write('["2024-01-01",7,""]\n["2024-01-02",8')
+    
+    dm = DataManager(path, backend='journal', stats_cache=False)
+    assert scores(dm) == {'2024-01-01': 7}
+    dm.close()
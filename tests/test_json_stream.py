@@ -0,0 +1,77 @@
+"""
+流式JSON读取测试：记录、多字节字符和数字跨越读取块边界时解析结果不变，导入时校验分数
+"""
+import json
+import pytest
+from data_manager import DataManager
+from indexes.date_index import from_ordinal
+from storage.json_stream import iter_json_records
+
+RECORDS = {
+    '2024-01-01': {'score': 100, 'desc': '跑步 5km'},
+    '2024-01-02': {'score': 7, 'desc': ''},
+    '2024-01-03': {'score': 42, 'desc': 'line\n"quoted" \\ 😀'},
+    '2024-01-04': {'score': 0},
+}
+
+
+def write_json(path, records, **kwargs):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, **kwargs)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64, 65536])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_chunk_boundaries(tmp_path, chunk_size, indent):
+    path = str(tmp_path / 'scores.json')
+    write_json(path, RECORDS, indent=indent)
+    expected = [(date, record['score'], record.get('desc', '')) for date, record in RECORDS.items()]
+    assert list(iter_json_records(path, chunk_size=chunk_size)) == expected
+
+
+def test_bom_and_progress(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    with open(path, 'w', encoding='utf-8-sig') as f:
+        json.dump({'2024-01-01': {'score': 1, 'desc': '中文'}}, f, ensure_ascii=False)
+    reported = []
+    records = list(iter_json_records(path, chunk_size=4, progress=lambda done, total: reported.append((done, total))))
+    assert records == [('2024-01-01', 1, '中文')]
+    assert reported[-1][0] == reported[-1][1]
+
+
+@pytest.mark.parametrize('text', ['', '[]', '{"2024-01-01": {"score": 1}', '{"2024-01-01" {"score": 1}}', '{1: 2}'])
+def test_rejects_malformed_files(tmp_path, text):
+    path = str(tmp_path / 'scores.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    with pytest.raises(ValueError):
+        list(iter_json_records(path, chunk_size=3))
+
+
+@pytest.mark.parametrize('score', [500, -1, 'abc', None, 50.5, True])
+def test_import_rejects_invalid_score(tmp_path, score):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path)
+    dm.save_score('2024-01-01', 30)
+    source = str(tmp_path / 'import.json')
+    write_json(source, {'2024-02-01': {'score': 60}, '2024-02-02': {'score': score}})
+    
+    with pytest.raises(ValueError):
+        dm.import_json(source)
+    
+    # 已导入的记录被回滚
+    assert [from_ordinal(ordinal) for ordinal in dm.get_all_scores()] == ['2024-01-01']
+    assert dm.stats()['total'] == 30
+    assert dm.median() == 30
+    dm.close()
+
+
+def test_import_overwrites_existing(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_score('2024-01-01', 30, 'old')
+    source = str(tmp_path / 'import.json')
+    write_json(source, RECORDS)
+    assert dm.import_json(source) == len(RECORDS)
+    assert dm.get_score('2024-01-01') == {'score': 100, 'desc': '跑步 5km'}
+    assert dm.stats()['total'] == 149
+    dm.close()
@@ -0,0 +1,117 @@
+"""
+按需加载测试：内存映射的快照与覆盖层合并后的列、范围读取，以及按需加载后修改并保存
+"""
+import random
+import pytest
+from data_manager import DataManager
+from storage.binary_storage import BinaryStorage, LazyBinaryStore
+from storage.json_storage import date_ordinal
+
+START = date_ordinal('2024-01-01')
+
+
+@pytest.fixture
+def base_records():
+    rng = random.Random(9)
+    return {
+        START + day: {'score': rng.randint(0, 100), 'desc': rng.choice(['', 'run', '跑步'])}
+        for day in range(0, 300, 3)
+    }
+
+
+@pytest.fixture
+def storage(tmp_path, base_records):
+    storage = BinaryStorage(str(tmp_path / 'scores.bin'))
+    assert storage.save_all(base_records)
+    yield storage
+    storage.close()
+
+
+def modify(store, expected):
+    """在快照之前、之间、之后新增记录，修改和删除快照中的记录（两边同样修改）"""
+    changes = {
+        START - 10: {'score': 1, 'desc': 'before'},
+        START + 4: {'score': 2, 'desc': 'between'},
+        START + 3: {'score': 3, 'desc': 'changed'},
+        START + 1000: {'score': 4, 'desc': 'after'},
+    }
+    for ordinal, record in changes.items():
+        store[ordinal] = record
+        expected[ordinal] = record
+    for ordinal in (START, START + 6, START + 297):
+        del store[ordinal]
+        del expected[ordinal]
+    # 删除后又重新加入
+    store[START + 6] = expected[START + 6] = {'score': 5, 'desc': ''}
+
+
+def as_dicts(items):
+    return {ordinal: {'score': record['score'], 'desc': record['desc']} for ordinal, record in items}
+
+
+def test_unmodified_store_reads_snapshot(storage, base_records):
+    store = storage.load_lazy()
+    assert isinstance(store, LazyBinaryStore)
+    assert len(store) == len(base_records)
+    assert as_dicts(store.items()) == base_records
+    assert store.summary()[0] == sum(record['score'] for record in base_records.values())
+    assert START + 1 not in store and 'x' not in store
+
+
+def test_columns_merge_overlay_in_date_order(storage, base_records):
+    store = storage.load_lazy()
+    expected = dict(base_records)
+    modify(store, expected)
+    assert store.summary() is None
+    ordinals, scores = store.columns()
+    assert list(ordinals) == sorted(expected)
+    assert list(scores) == [expected[ordinal]['score'] for ordinal in sorted(expected)]
+    assert len(store) == len(expected)
+    assert as_dicts(store.items()) == expected
+    assert as_dicts(store.materialize().items()) == expected
+
+
+@pytest.mark.parametrize('start, end', [(-20, -1), (-10, 4), (0, 6), (5, 296), (290, 2000), (301, 999)])
+def test_items_range(storage, base_records, start, end):
+    store = storage.load_lazy()
+    expected = dict(base_records)
+    modify(store, expected)
+    low, high = START + start, START + end
+    assert [ordinal for ordinal, _ in store.items_range(low, high)] == \
+        sorted(ordinal for ordinal in expected if low <= ordinal <= high)
+    assert as_dicts(store.items_range(low, high)) == {
+        ordinal: record for ordinal, record in expected.items() if low <= ordinal <= high
+    }
+
+
+def test_copy_shares_snapshot_not_overlay(storage, base_records):
+    store = storage.load_lazy()
+    copy = store.copy()
+    store[START] = {'score': 99, 'desc': ''}
+    assert copy[START]['score'] == base_records[START]['score']
+
+
+def test_save_after_lazy_load(tmp_path, storage, base_records):
+    path = storage.data_file
+    dm = DataManager(path, backend='binary', lazy=True, stats_cache=False)
+    assert isinstance(dm.data, LazyBinaryStore)
+    assert dm.stats()['count'] == len(base_records)
+    assert dm.get_scores_in_range(START, START + 9) == {
+        ordinal: record for ordinal, record in base_records.items() if ordinal <= START + 9
+    }
+    expected = dict(base_records)
+    dm.save_score(START + 1, 50, 'new')
+    dm.update_score(START + 3, 60, 'edited')
+    dm.delete_score(START + 6)
+    expected[START + 1] = {'score': 50, 'desc': 'new'}
+    expected[START + 3] = {'score': 60, 'desc': 'edited'}
+    del expected[START + 6]
+    assert dm.range_sum(START, START + 9) == sum(
+        record['score'] for ordinal, record in expected.items() if ordinal <= START + 9
+    )
+    dm.close()
+    
+    fresh = DataManager(path, backend='binary', lazy=True, stats_cache=False)
+    assert as_dicts(fresh.get_all_scores().items()) == expected
+    assert fresh.stats()['total'] == sum(record['score'] for record in expected.values())
+    fresh.close()
@@ -0,0 +1,51 @@
+"""
+旧数据读取测试：手工编辑产生的无效记录在各存储后端中都另存到rejected_file，不影响启动
+"""
+import json
+import pytest
+from conftest import BACKENDS, scores
+from data_manager import DataManager
+from indexes.date_index import from_ordinal
+
+# 读取scores.json的后端（binary和sharded从同目录的scores.json迁移，sqlite不迁移）
+LEGACY_BACKENDS = sorted(set(BACKENDS) - {'sqlite'})
+
+LEGACY = {
+    '2024-01-01': {'score': 10, 'desc': 'ok'},
+    '2024-1-2': {'score': 20},
+    '2024-01-03': {'score': '50', 'desc': 'string score'},
+    '2024-01-04': {'score': None},
+    '2024-01-05': {'score': 12.5},
+    '2024-01-06': {'score': True},
+    '2024-01-07': {'score': 30, 'desc': 7},
+    '2024-01-08': {'desc': 'no score'},
+    'someday': {'score': 40},
+}
+REJECTED = {'2024-01-03', '2024-01-04', '2024-01-05', '2024-01-06', '2024-01-07', '2024-01-08', 'someday'}
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('backend', LEGACY_BACKENDS)
+def test_quarantines_invalid_records(tmp_path, backend, compact):
+    with open(tmp_path / 'scores.json', 'w', encoding='utf-8') as f:
+        json.dump(LEGACY, f)
+    
+    dm = DataManager(str(tmp_path / BACKENDS[backend]), backend=backend, compact=compact, stats_cache=False)
+    assert scores(dm) == {
+        '2024-01-01': 10,
+        '2024-01-02': 20,
+    }
+    assert dm.stats()['total'] == 30
+    with open(dm.storage.rejected_file, 'r', encoding='utf-8') as f:
+        assert set(json.load(f)) == REJECTED
+    dm.close()
+
+
+def test_skips_invalid_journal_entries(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    with open(path + '.log', 'w', encoding='utf-8') as f:
+        f.write('["2024-01-01",7,""]\n["2024-01-02","8",""]\n["2024-01-03",9,3]\n')
+    
+    dm = DataManager(path, backend='journal', stats_cache=False)
+    assert [from_ordinal(ordinal) for ordinal in dm.get_all_scores()] == ['2024-01-01']
+    dm.close()
@@ -0,0 +1,72 @@
+"""
+分数索引测试：分数段内按日期合并的顺序、按分数排序时同分按日期，以及遍历中途修改索引
+"""
+import random
+import pytest
+from data_manager import DataManager
+from indexes.base import iter_sorted
+from indexes.date_index import from_ordinal, to_ordinal
+from indexes.score_index import ScoreIndex
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(20)
+    start = to_ordinal('2024-01-01')
+    return {start + day: {'score': rng.randint(0, 100), 'desc': ''} for day in rng.sample(range(400), 200)}
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_iter_by_date_merges_score_band_in_date_order(records, reverse):
+    index = ScoreIndex()
+    index.rebuild(records)
+    low, high = to_ordinal('2024-03-01'), to_ordinal('2024-11-30')
+    expected = sorted(
+        (ordinal for ordinal, record in records.items() if 20 <= record['score'] <= 60 and low <= ordinal <= high),
+        reverse=reverse
+    )
+    assert list(index.iter_by_date(20, 60, low, high, reverse=reverse)) == expected
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_iter_by_score_orders_ties_by_date(records, reverse):
+    index = ScoreIndex()
+    index.rebuild(records)
+    expected = sorted(records, key=lambda ordinal: (records[ordinal]['score'], ordinal), reverse=reverse)
+    assert list(index.iter_by_score(reverse=reverse)) == expected
+
+
+def test_incremental_updates_match_rebuild(records):
+    index = ScoreIndex()
+    for ordinal, record in records.items():
+        index.add(ordinal, record)
+    for ordinal in list(records)[::3]:
+        index.remove(ordinal, records.pop(ordinal))
+    rebuilt = ScoreIndex()
+    rebuilt.rebuild(records)
+    assert index.buckets == rebuilt.buckets
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_iter_sorted_survives_concurrent_changes(reverse):
+    seq = [1, 3, 5, 7, 9]
+    seen = []
+    for item in iter_sorted(seq, 2, 8, reverse=reverse):
+        seen.append(item)
+        if item == 5:
+            # 遍历中途删除当前元素并插入已遍历过的位置：不跳过、不重复
+            seq.remove(5)
+            seq.insert(0, 0)
+    assert seen == ([3, 5, 7] if not reverse else [7, 5, 3])
+
+
+def test_query_score_band(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_many([('2024-01-01', 90), ('2024-01-02', 40), ('2024-01-03', 55), ('2024-01-04', 10), ('2024-01-05', 50)])
+    assert [from_ordinal(ordinal) for ordinal, _ in dm.query(min_score=40, max_score=60)] == [
+        '2024-01-05', '2024-01-03', '2024-01-02'
+    ]
+    assert [from_ordinal(ordinal) for ordinal, _ in dm.query(min_score=40, sort='score', limit=2)] == [
+        '2024-01-01', '2024-01-03'
+    ]
+    dm.close()
@@ -0,0 +1,56 @@
+"""
+分数统计测试：增量维护的统计与重建一致，无效分数在修改数据前被拒绝
+"""
+import pytest
+from data_manager import DataManager
+from indexes.score_stats import ScoreStats
+
+
+def test_incremental_matches_rebuild(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    for day in range(1, 29):
+        dm.save_score(f'2024-02-{day:02d}', day * 3 % 101)
+    dm.update_score('2024-02-03', 100)
+    dm.delete_score('2024-02-04')
+    rebuilt = ScoreStats()
+    rebuilt.rebuild(dm.get_all_scores())
+    assert dm.stats() == rebuilt.as_dict()
+    assert dm.median() == rebuilt.median()
+    dm.close()
+
+
+@pytest.mark.parametrize('score', ['50', 101, -1, 50.0, None, True])
+def test_rejects_invalid_scores(tmp_path, score):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path)
+    dm.save_score('2024-01-01', 10)
+    with pytest.raises(ValueError):
+        dm.save_score('2024-01-02', score)
+    with pytest.raises(ValueError):
+        dm.update_score('2024-01-01', score)
+    
+    assert list(dm.get_all_scores().values()) == [{'score': 10, 'desc': ''}]
+    assert dm.stats()['total'] == 10 and dm.count() == 1
+    dm.close()
+    fresh = DataManager(path, stats_cache=False)
+    assert list(fresh.get_all_scores().values()) == [{'score': 10, 'desc': ''}]
+    fresh.close()
+
+
+def test_failed_index_update_leaves_data_unchanged(tmp_path, monkeypatch):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_score('2024-01-01', 10, 'first')
+    dm.save_score('2024-01-02', 20)
+    
+    def broken_add(ordinal, record):
+        raise RuntimeError('索引更新失败')
+    
+    monkeypatch.setattr(dm.date_index, 'add', broken_add)
+    with pytest.raises(RuntimeError):
+        dm.update_score('2024-01-01', 99, 'changed')
+    monkeypatch.undo()
+    
+    assert dm.get_score('2024-01-01') == {'score': 10, 'desc': 'first'}
+    assert dm.stats()['total'] == 30
+    assert dm.range_sum('2024-01-01', '2024-01-02') == 30
+    dm.close()
@@ -0,0 +1,133 @@
+"""
+统计缓存测试：数据文件指纹一致时启动即恢复统计，数据文件被改动后缓存失效
+"""
+import json
+import os
+import pytest
+from data_manager import DataManager
+from storage.json_storage import JsonStorage, date_ordinal
+from storage.stats_sidecar import read_sidecar, sidecar_file
+
+
+def write_scores(path):
+    dm = DataManager(path)
+    dm.save_score('2024-01-01', 10)
+    dm.save_score('2024-02-01', 20)
+    dm.close()
+
+
+def test_restores_stats_when_fingerprint_matches(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    assert os.path.exists(sidecar_file(path))
+    
+    dm = DataManager(path, defer_load=True)
+    assert dm._cached_stamp is not None
+    assert dm.stats_ready
+    assert dm.stats()['total'] == 30
+    assert dm.month_summary('2024-02')['total'] == 20
+    dm.load_async().result()
+    assert dm.stats()['total'] == 30
+    dm.close()
+
+
+def test_ignores_sidecar_when_data_file_changes(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    # 其他程序改写了数据文件（缓存中的指纹不再相符）
+    JsonStorage(path).save_all({
+        date_ordinal('2024-01-01'): {'score': 99, 'desc': ''},
+    })
+    
+    dm = DataManager(path, defer_load=True)
+    assert dm._cached_stamp is None
+    assert not dm.stats_ready
+    dm.load_async().result()
+    assert dm.stats()['total'] == 99
+    assert dm.month_summary('2024-02')['count'] == 0
+    dm.close()
+
+
+def test_ignores_sidecar_when_only_mtime_changes(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    # 分数改为同样位数：文件大小不变，只有修改时间不同
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text.replace('10', '40'))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    
+    dm = DataManager(path)
+    assert dm._cached_stamp is None
+    assert dm.stats()['total'] == 60
+    dm.close()
+
+
+def test_ignores_sidecar_with_bad_checksum(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    cache = sidecar_file(path)
+    with open(cache, 'r', encoding='utf-8') as f:
+        content = json.load(f)
+    content['payload']['stats']['total'] = 1000
+    with open(cache, 'w', encoding='utf-8') as f:
+        json.dump(content, f)
+    
+    dm = DataManager(path)
+    assert dm._cached_stamp is None
+    assert dm.stats()['total'] == 30
+    dm.close()
+
+
+def test_read_sidecar_rejects_other_fingerprint(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    fingerprint = JsonStorage(path).file_fingerprint()
+    assert read_sidecar(sidecar_file(path), fingerprint) is not None
+    assert read_sidecar(sidecar_file(path), [(1, 1)]) is None
+
+
+@pytest.mark.parametrize('write_behind', [False, True])
+def test_flush_and_reads_leave_sidecar_alone_when_nothing_pending(tmp_path, write_behind):
+    path = str(tmp_path / 'scores.db')
+    dm = DataManager(path, backend='sqlite', write_behind=write_behind)
+    dm.save_score('2024-01-01', 10)
+    assert dm.flush()
+    cache = sidecar_file(dm.data_file)
+    assert os.path.exists(cache)
+    written = os.stat(cache).st_mtime_ns
+    os.utime(cache, ns=(written - 10 ** 9, written - 10 ** 9))
+    
+    assert dm.flush()
+    assert len(dm.get_scores_in_range('2024-01-01', '2024-01-31')) == 1
+    assert os.stat(cache).st_mtime_ns == written - 10 ** 9
+    dm.close()
+
+
+def test_close_leaves_sidecar_alone_when_nothing_changed(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    write_scores(path)
+    cache = sidecar_file(path)
+    written = os.stat(cache).st_mtime_ns - 10 ** 9
+    os.utime(cache, ns=(written, written))
+    
+    dm = DataManager(path)
+    assert dm.stats()['total'] == 30
+    dm.close()
+    assert os.stat(cache).st_mtime_ns == written
+
+
+def test_close_rewrites_sidecar_after_journal_compaction(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    dm = DataManager(path, backend='journal')
+    dm.save_score('2024-01-01', 10)
+    assert dm.flush()
+    # 关闭时日志合并进快照，数据文件的指纹随之改变
+    dm.close()
+    
+    fresh = DataManager(path, backend='journal')
+    assert fresh._cached_stamp is not None
+    assert fresh.stats()['total'] == 10
+    fresh.close()
@@ -0,0 +1,63 @@
+"""
+全文索引测试：英文单词前缀匹配、多个词同时匹配、中文短语须连续出现，以及修改后索引同步
+"""
+from data_manager import DataManager
+from indexes.date_index import from_ordinal
+from indexes.text_index import TextIndex, tokenize
+
+
+def search(dm, text, **kwargs):
+    return [from_ordinal(ordinal) for ordinal, _ in dm.query(text=text, order='asc', **kwargs)]
+
+
+def make_manager(tmp_path):
+    dm = DataManager(str(tmp_path / 'scores.json'))
+    dm.save_many([
+        ('2024-01-01', 80, 'Math exam, example problems'),
+        ('2024-01-02', 60, 'English EXAMPLE'),
+        ('2024-01-03', 70, '今天数学考试很难'),
+        ('2024-01-04', 90, '数学很好，考试简单'),
+        ('2024-01-05', 50, '跑步5km math'),
+        ('2024-01-06', 40, '数学考，学考试'),
+    ])
+    return dm
+
+
+def test_tokenize():
+    assert tokenize('Run_5km, 跑步！') == {'run', '5km', '跑', '步', '跑步'}
+    assert tokenize(None) == set()
+
+
+def test_prefix_and_all_words(tmp_path):
+    dm = make_manager(tmp_path)
+    assert search(dm, 'exa') == ['2024-01-01', '2024-01-02']
+    assert search(dm, 'EXAM math') == ['2024-01-01']
+    assert search(dm, 'xam') == []
+    assert search(dm, 'math 跑步') == ['2024-01-05']
+    dm.close()
+
+
+def test_cjk_phrase_must_be_contiguous(tmp_path):
+    dm = make_manager(tmp_path)
+    assert search(dm, '数学') == ['2024-01-03', '2024-01-04', '2024-01-06']
+    # 01-06含有“数学”“学考”“考试”全部两字组合，但“数学考试”并未连续出现
+    assert dm.text_index.search('数学考试') == {dm.date_index.ordinals[2], dm.date_index.ordinals[5]}
+    assert search(dm, '数学考试') == ['2024-01-03']
+    assert search(dm, '数学 考试') == ['2024-01-03', '2024-01-04', '2024-01-06']
+    assert search(dm, '试') == ['2024-01-03', '2024-01-04', '2024-01-06']
+    assert search(dm, '数学', start='2024-01-04', end='2024-01-05') == ['2024-01-04']
+    dm.close()
+
+
+def test_index_follows_updates_and_deletes(tmp_path):
+    dm = make_manager(tmp_path)
+    dm.update_score('2024-01-02', 60, 'history')
+    dm.delete_score('2024-01-01')
+    assert search(dm, 'exam') == []
+    assert search(dm, 'hist') == ['2024-01-02']
+    
+    rebuilt = TextIndex()
+    rebuilt.rebuild(dm.get_all_scores())
+    assert rebuilt.postings == dm.text_index.postings
+    assert rebuilt.terms == dm.text_index.terms
+    dm.close()
@@ -0,0 +1,112 @@
+"""
+延迟写入测试：防抖合并、写入失败后放回队列、flush回调，以及写入过程中的未保存日期
+"""
+import threading
+import time
+from storage.write_behind import WriteBehindQueue
+
+
+class FakeStorage:
+    """记录每次写入的存储后端，可以让写入失败或在写入中途阻塞"""
+    
+    def __init__(self):
+        self.saves = []
+        self.fail = False
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+    
+    def needs_full_data(self, changes):
+        return False
+    
+    def save(self, data, changes):
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            return False
+        self.saves.append(dict(changes))
+        return True
+
+
+def make_queue(storage, delay=0.05, **kwargs):
+    return WriteBehindQueue(storage, lambda: None, delay=delay, **kwargs)
+
+
+def test_debounce_coalesces_changes():
+    storage = FakeStorage()
+    queue = make_queue(storage, delay=0.2)
+    queue.mark_dirty(1, {'score': 1})
+    queue.mark_dirty(2, {'score': 2})
+    queue.mark_dirty(1, {'score': 3})
+    queue.mark_dirty(2, None)
+    assert storage.saves == []
+    deadline = time.monotonic() + 5
+    while not storage.saves and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert storage.saves == [{1: {'score': 3}, 2: None}]
+    assert not queue.dirty
+    queue.close()
+
+
+def test_flush_blocks_and_returns_result():
+    storage = FakeStorage()
+    queue = make_queue(storage, delay=10)
+    queue.mark_dirty(1, {'score': 1})
+    assert queue.flush() is True
+    assert storage.saves == [{1: {'score': 1}}]
+    # 没有新修改时直接返回上次的结果，不再写入
+    assert queue.flush() is True
+    assert len(storage.saves) == 1
+    queue.close()
+
+
+def test_failed_write_is_requeued_and_newer_change_wins():
+    storage = FakeStorage()
+    results = []
+    queue = make_queue(storage, delay=10, on_complete=results.append)
+    storage.fail = True
+    queue.mark_dirty(1, {'score': 1})
+    queue.mark_dirty(2, {'score': 2})
+    assert queue.flush() is False
+    assert queue.unsaved_dates() == {1, 2}
+    # 同一天的新修改优先于放回队列的旧修改
+    queue.mark_dirty(1, {'score': 10})
+    storage.fail = False
+    assert queue.flush() is True
+    assert storage.saves == [{1: {'score': 10}, 2: {'score': 2}}]
+    assert results == [False, True]
+    assert queue.unsaved_dates() == set()
+    queue.close()
+
+
+def test_flush_callback_and_unsaved_dates_during_write():
+    storage = FakeStorage()
+    storage.release.clear()
+    queue = make_queue(storage, delay=10)
+    queue.mark_dirty(1, {'score': 1})
+    done = threading.Event()
+    results = []
+    
+    def callback(result):
+        results.append(result)
+        done.set()
+    
+    assert queue.flush(callback) is None
+    assert storage.started.wait(5)
+    # 正在写入的修改和写入期间的新修改都算未保存
+    queue.mark_dirty(2, {'score': 2})
+    assert queue.unsaved_dates() == {1, 2}
+    storage.release.set()
+    assert done.wait(5)
+    assert results == [True]
+    assert queue.unsaved_dates() == {2}
+    queue.close()
+    assert storage.saves == [{1: {'score': 1}}, {2: {'score': 2}}]
+
+
+def test_close_writes_pending_changes():
+    storage = FakeStorage()
+    queue = make_queue(storage, delay=10)
+    queue.mark_dirty(1, {'score': 1})
+    queue.close()
+    assert storage.saves == [{1: {'score': 1}}]
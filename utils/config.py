@@ -145,6 +145,8 @@ TEXTS = {
     'today_desc_label': ('今天描述', 'Today Description'),
     'total_score': ('总分', 'Total Score'),
     'avg_score': ('平均分', 'Average Score'),
+    'median_score': ('中位数', 'Median Score'),
+    'quartiles': ('四分位数', 'Quartiles'),
     'not_recorded': ('未记录', 'Not Recorded'),
     'none': ('无', 'None'),
     'view_history': ('查看历史记录', 'View History'),
@@ -180,6 +182,18 @@ TEXTS = {
     'record_deleted': ('记录已删除', 'Record Deleted'),
     'delete_failed': ('删除失败', 'Delete Failed'),
     'confirm': ('确定', 'Confirm'),
+    'loading': ('加载中...', 'Loading...'),
+    'load_failed': ('加载失败', 'Load Failed'),
+    'search': ('搜索', 'Search'),
+    'search_hint': ('搜索描述', 'Search Description'),
+    'no_results': ('没有匹配的记录', 'No Matching Records'),
+    'sort_by_date': ('按日期排序', 'Sort by Date'),
+    'sort_by_score': ('按分数排序', 'Sort by Score'),
+    'all_scores': ('全部分数', 'All Scores'),
+    'score_below_60': ('60分以下', 'Below 60'),
+    'score_60_79': ('60-79分', '60-79'),
+    'score_80_up': ('80分及以上', '80 and Above'),
+    'loading_more': ('加载更多...', 'Loading more...'),
 }
 
 def get_text(key):
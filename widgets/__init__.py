@@ -4,8 +4,14 @@ from .ui_utils import (
     create_text_input,
     create_button,
     create_popup,
-    show_message_popup
+    show_message_popup,
+    show_confirm_popup,
+    WidgetPool,
+    acquire_label,
+    acquire_button,
+    release_widget
 )
+from .history_list import HistoryList, HistoryRow
 
 __all__ = [
     'create_label',
@@ -13,5 +19,12 @@ __all__ = [
     'create_button',
     'create_popup',
     'show_message_popup',
+    'show_confirm_popup',
+    'WidgetPool',
+    'acquire_label',
+    'acquire_button',
+    'release_widget',
+    'HistoryList',
+    'HistoryRow',
 ]
 
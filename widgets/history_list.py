@@ -0,0 +1,226 @@
+"""
+历史记录列表模块
+基于RecycleView的虚拟化列表：只为可见的行创建控件，滚动时复用行控件并替换其中的文字
+"""
+from datetime import date
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from utils.config import get_text, is_android
+from widgets.ui_utils import create_label, create_button
+
+
+def record_row(ordinal, record):
+    """
+    将一条记录转换为列表的数据项（只保存显示所需的字段）
+    :param ordinal: 日期序号
+    :param record: 包含score和desc的记录
+    :return: RecycleView的数据字典
+    """
+    return {
+        'ordinal': ordinal,
+        'score': record.get('score', 0),
+        'desc': record.get('desc', get_text('none')),
+    }
+
+
+class HistoryRow(RecycleDataViewBehavior, BoxLayout):
+    """历史记录的一行：日期、分数、描述、编辑和删除按钮，控件只在创建时构建一次"""
+    
+    def __init__(self, **kwargs):
+        android = is_android()
+        super().__init__(orientation='vertical', padding=8, **kwargs)
+        self.ordinal = None
+        self.list_view = None
+        
+        # 信息区域
+        info_layout = BoxLayout(orientation='vertical')
+        label_height = 38 if android else 30
+        
+        self.date_label = create_label(
+            '',
+            size_hint_y=None,
+            height=label_height,
+            font_size=24 if android else 18,
+            color=(0.2, 0.2, 0.2, 1)
+        )
+        info_layout.add_widget(self.date_label)
+        
+        self.score_label = create_label(
+            '',
+            size_hint_y=None,
+            height=label_height,
+            font_size=22 if android else 16,
+            color=(0.2, 0.2, 0.2, 1)
+        )
+        info_layout.add_widget(self.score_label)
+        
+        self.desc_label = create_label(
+            '',
+            size_hint_y=None,
+            height=label_height,
+            font_size=22 if android else 16,
+            color=(0.2, 0.2, 0.2, 1)
+        )
+        info_layout.add_widget(self.desc_label)
+        self.add_widget(info_layout)
+        
+        # 按钮区域
+        button_layout = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=70 if android else 55,
+            spacing=8
+        )
+        
+        # 编辑按钮
+        edit_btn = create_button(
+            get_text('edit'),
+            size_hint_x=0.5,
+            font_size=22 if android else 18,
+            background_color=(0.4, 0.7, 1.0, 1),  # 浅蓝色
+            color=(1, 1, 1, 1),  # 白色文字
+            bold=True  # 加粗
+        )
+        edit_btn.bind(on_press=lambda x: self.list_view.edit_callback(self.ordinal))
+        button_layout.add_widget(edit_btn)
+        
+        # 删除按钮
+        delete_btn = create_button(
+            get_text('delete'),
+            size_hint_x=0.5,
+            font_size=22 if android else 18,
+            background_color=(1.0, 0.5, 0.5, 1),  # 浅红色
+            color=(1, 1, 1, 1),  # 白色文字
+            bold=True  # 加粗
+        )
+        delete_btn.bind(on_press=lambda x: self.list_view.delete_callback(self.ordinal))
+        button_layout.add_widget(delete_btn)
+        self.add_widget(button_layout)
+        
+        # 分隔线
+        self.add_widget(create_label(
+            '─' * 20,
+            size_hint_y=None,
+            height=4,
+            font_size=8,
+            color=(0.2, 0.2, 0.2, 1)
+        ))
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """行控件被分配给某条数据时调用：只替换文字，不重新创建控件"""
+        self.list_view = rv
+        self.ordinal = data['ordinal']
+        self.date_label.text = f'{get_text("date")}: {date.fromordinal(data["ordinal"]).isoformat()}'
+        self.score_label.text = f'{get_text("score")}: {data["score"]}'
+        self.desc_label.text = f'{get_text("desc")}: {data["desc"]}'
+        return super().refresh_view_attrs(rv, index, data)
+
+
+class HistoryList(RecycleView):
+    """
+    虚拟化的历史记录列表
+    打开时间和内存只与可见的行数有关，与历史记录的总数无关
+    """
+    
+    def __init__(self, edit_callback, delete_callback, **kwargs):
+        """
+        :param edit_callback: 点击编辑按钮的回调，参数为日期序号
+        :param delete_callback: 点击删除按钮的回调，参数为日期序号
+        """
+        super().__init__(**kwargs)
+        self.edit_callback = edit_callback
+        self.delete_callback = delete_callback
+        # 行的排序键（列表按该键从大到小排列），以及日期序号到数据项的映射
+        self.sort_key = lambda row: row['ordinal']
+        self._rows = {}
+        # 行高固定，RecycleView无需逐行测量即可计算滚动范围
+        self.row_height = (165 if is_android() else 150) + 4
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            spacing=8,
+            padding=[0, 10, 0, 0],
+            default_size=(None, self.row_height),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.viewclass = HistoryRow
+    
+    def set_records(self, records, sort_key=None):
+        """
+        替换列表中的全部记录
+        :param records: (日期序号, 记录)的列表，已按显示顺序排好
+        :param sort_key: 行的排序键函数，参数为数据项（列表按该键从大到小排列），为None时保持不变
+        """
+        if sort_key is not None:
+            self.sort_key = sort_key
+        rows = [record_row(ordinal, record) for ordinal, record in records]
+        self._rows = {row['ordinal']: row for row in rows}
+        self.data = rows
+        self.scroll_y = 1
+    
+    def append_records(self, records):
+        """
+        在列表末尾追加记录（不改变滚动位置）
+        :param records: (日期序号, 记录)的列表
+        """
+        if not records:
+            return
+        # scroll_y是相对位置，内容变高后需按新的高度换算，保持当前看到的行不动
+        layout = self.layout_manager
+        scrollable = max(layout.height - self.height, 0)
+        top_offset = (1 - self.scroll_y) * scrollable
+        rows = [record_row(ordinal, record) for ordinal, record in records]
+        self._rows.update((row['ordinal'], row) for row in rows)
+        self.data.extend(rows)
+        if top_offset > 0:
+            added = len(records) * (self.row_height + layout.spacing)
+            self.scroll_y = 1 - top_offset / max(scrollable + added, 1)
+    
+    def _bisect(self, key):
+        """二分查找第一个排序键不大于key的位置"""
+        data = self.data
+        low, high = 0, len(data)
+        while low < high:
+            mid = (low + high) // 2
+            if self.sort_key(data[mid]) > key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def remove_record(self, ordinal):
+        """
+        移除一行（其他行的控件不重建）
+        :return: 该日期是否在列表中
+        """
+        row = self._rows.pop(ordinal, None)
+        if row is None:
+            return False
+        del self.data[self._bisect(self.sort_key(row))]
+        return True
+    
+    def update_record(self, ordinal, record, append=True):
+        """
+        更新或插入一行：排序位置不变时原地替换，否则移动到新位置
+        :param ordinal: 日期序号
+        :param record: 新记录
+        :param append: 新位置在列表末尾时是否插入（后续记录仍在逐步追加时应为False，由追加过程补上）
+        """
+        row = record_row(ordinal, record)
+        key = self.sort_key(row)
+        old = self._rows.get(ordinal)
+        if old is not None:
+            if self.sort_key(old) == key:
+                self.data[self._bisect(key)] = row
+                self._rows[ordinal] = row
+                return
+            self.remove_record(ordinal)
+        i = self._bisect(key)
+        if i == len(self.data) and not append:
+            return
+        self.data.insert(i, row)
+        self._rows[ordinal] = row
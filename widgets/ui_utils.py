@@ -1,6 +1,6 @@
 """
 公共UI工具函数模块
-提供共享的UI创建函数，如Label、Popup等
+提供共享的UI创建函数，如Label、Popup等，以及可复用的控件池和缓存的消息弹窗
 """
 from kivy.uix.label import Label
 from kivy.uix.button import Button
@@ -40,7 +40,7 @@ def create_popup(title, content_layout, size_hint=None, title_size=None):
         size_hint = (0.8 if is_android() else 0.6, 0.35 if is_android() else 0.3)
     if title_size is None:
         title_size = 16 if is_android() else 18
-        
+    
     popup = Popup(
         title=title,
         content=content_layout,
@@ -57,14 +57,115 @@ def create_popup(title, content_layout, size_hint=None, title_size=None):
     return popup
 
 
-def show_message_popup(title, message):
-    """显示消息弹窗"""
+class WidgetPool:
+    """
+    可复用控件池
+    acquire取出空闲控件（没有时新建）并设置文字、属性和事件绑定；
+    release解除绑定、从父控件移除并恢复被修改过的属性，放回池中供下次使用
+    """
+    
+    def __init__(self, factory, max_size=32):
+        """
+        :param factory: 新建控件的函数（无参数）
+        :param max_size: 池中最多保留的空闲控件数
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self._free = []
+    
+    def acquire(self, text='', **kwargs):
+        """
+        取出一个控件
+        :param text: 控件文字
+        :param kwargs: 控件属性；on_开头的参数作为事件绑定（如on_press=callback）
+        :return: 控件
+        """
+        widget = self._free.pop() if self._free else self.factory()
+        # 记录被修改属性的原值和事件绑定，release时恢复
+        widget._pool = self
+        widget._pool_defaults = {'text': widget.text}
+        widget._pool_bindings = []
+        widget.text = text
+        for name, value in kwargs.items():
+            if name.startswith('on_'):
+                widget._pool_bindings.append((name, widget.fbind(name, value)))
+            else:
+                widget._pool_defaults.setdefault(name, getattr(widget, name))
+                setattr(widget, name, value)
+        return widget
+    
+    def release(self, widget):
+        """放回一个控件"""
+        for name, uid in widget._pool_bindings:
+            widget.unbind_uid(name, uid)
+        widget._pool_bindings = []
+        if widget.parent is not None:
+            widget.parent.remove_widget(widget)
+        for name, value in widget._pool_defaults.items():
+            setattr(widget, name, value)
+        widget._pool_defaults = {}
+        if len(self._free) < self.max_size and widget not in self._free:
+            self._free.append(widget)
+
+
+# Label和Button的控件池（用于反复创建和销毁的行、对话框）
+_label_pool = WidgetPool(lambda: create_label(''))
+_button_pool = WidgetPool(lambda: create_button(''))
+
+
+def acquire_label(text, **kwargs):
+    """从控件池取出带中文字体的Label（参数同create_label），用完后调用release_widget"""
+    return _label_pool.acquire(text, **kwargs)
+
+
+def acquire_button(text, **kwargs):
+    """从控件池取出带中文字体的Button（参数同create_button，可传on_press等绑定），用完后调用release_widget"""
+    return _button_pool.acquire(text, **kwargs)
+
+
+def release_widget(widget):
+    """将acquire_label / acquire_button取出的控件放回控件池（解除绑定并恢复属性）"""
+    pool = getattr(widget, '_pool', None)
+    if pool is not None:
+        pool.release(widget)
+
+
+# 消息弹窗样式：key为样式名，value为Android和其他平台上的(弹窗大小, 文字大小)
+MESSAGE_STYLES = {
+    'default': {'android': ((0.8, 0.35), 20), 'desktop': ((0.6, 0.3), 16)},
+}
+
+# 已创建的消息弹窗（每种样式一个）与确认弹窗
+_message_popups = {}
+_confirm_popup = None
+
+
+def _track_closing(popup):
+    """
+    记录弹窗是否正在播放关闭动画
+    Kivy在淡出动画结束、弹窗被移除后才认为弹窗已关闭，期间调用open()不会重新打开，需要自行记录
+    """
+    popup.closing = False
+    popup.bind(
+        on_pre_dismiss=lambda x: setattr(popup, 'closing', True),
+        on_pre_open=lambda x: setattr(popup, 'closing', False)
+    )
+
+
+def _closing(popup):
+    """弹窗是否正在播放关闭动画（此时不能重新打开，需要改用新的弹窗）"""
+    return popup.closing and popup.parent is not None
+
+
+def _create_message_popup(style):
+    """创建某种样式的消息弹窗（只在第一次显示该样式时调用）"""
+    size_hint, font_size = MESSAGE_STYLES[style]['android' if is_android() else 'desktop']
     content_layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
     
     content_label = create_label(
-        message,
+        '',
         size_hint_y=1,
-        font_size=20 if is_android() else 16
+        font_size=font_size
     )
     content_layout.add_widget(content_label)
     
@@ -72,13 +173,103 @@ def show_message_popup(title, message):
         get_text('close'),
         size_hint_y=None,
         height=55 if is_android() else 45,
-        font_size=20 if is_android() else 16
+        font_size=font_size
     )
     close_button.bind(on_press=lambda x: popup.dismiss())
     content_layout.add_widget(close_button)
     
-    popup = create_popup(title, content_layout)
-    popup.open()
+    popup = create_popup('', content_layout, size_hint=size_hint)
+    popup.message_label = content_label
+    _track_closing(popup)
+    return popup
+
+
+def show_message_popup(title, message, style='default'):
+    """
+    显示消息弹窗
+    每种样式的弹窗只创建一次，之后只替换标题和文字；该样式的弹窗已打开时直接更新其内容
+    :param style: MESSAGE_STYLES中的样式名
+    :return: 弹窗
+    """
+    popup = _message_popups.get(style)
+    if popup is None or _closing(popup):
+        popup = _message_popups[style] = _create_message_popup(style)
+    popup.title = title
+    popup.message_label.text = message
+    # 弹窗打开时父控件为窗口
+    if popup.parent is None:
+        popup.open()
+    return popup
+
+
+def _create_confirm_popup():
+    """创建确认弹窗（只在第一次显示时调用）"""
+    android = is_android()
+    confirm_layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
     
+    popup_label = create_label(
+        '',
+        size_hint_y=1,
+        font_size=20 if android else 16
+    )
+    confirm_layout.add_widget(popup_label)
+    
+    button_layout = BoxLayout(
+        orientation='horizontal',
+        size_hint_y=None,
+        height=55 if android else 40,
+        spacing=10
+    )
+    
+    # 确认按钮
+    yes_button = create_button(
+        get_text('confirm'),
+        size_hint_x=0.5,
+        font_size=20 if android else 16
+    )
+    button_layout.add_widget(yes_button)
+    
+    # 取消按钮
+    no_button = create_button(
+        get_text('close'),
+        size_hint_x=0.5,
+        font_size=20 if android else 16
+    )
+    no_button.bind(on_press=lambda x: popup.dismiss())
+    button_layout.add_widget(no_button)
+    
+    confirm_layout.add_widget(button_layout)
+    
+    popup = create_popup(
+        '',
+        confirm_layout,
+        size_hint=(0.7 if android else 0.5, 0.3 if android else 0.25),
+        title_size=16 if android else 18
+    )
+    popup.message_label = popup_label
+    popup.confirm_button = yes_button
+    popup.confirm_uid = None
+    _track_closing(popup)
     return popup
 
+
+def show_confirm_popup(title, message, on_confirm):
+    """
+    显示确认弹窗（只创建一次，之后每次重新设置文字和确认按钮的绑定）
+    :param on_confirm: 点击确认按钮的回调，参数为确认按钮；弹窗不会自动关闭，由回调决定何时关闭
+    :return: 弹窗
+    """
+    global _confirm_popup
+    if _confirm_popup is None or _closing(_confirm_popup):
+        _confirm_popup = _create_confirm_popup()
+    popup = _confirm_popup
+    # 重置上一次使用留下的状态：解除旧的确认回调，恢复按钮
+    if popup.confirm_uid is not None:
+        popup.confirm_button.unbind_uid('on_press', popup.confirm_uid)
+    popup.confirm_uid = popup.confirm_button.fbind('on_press', on_confirm)
+    popup.confirm_button.disabled = False
+    popup.title = title
+    popup.message_label.text = message
+    if popup.parent is None:
+        popup.open()
+    return popup